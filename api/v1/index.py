@@ -1,6 +1,7 @@
 # Vercel Serverless entrypoint for FastAPI app
 # This file exposes the existing FastAPI app (backend/app/main.py) to Vercel's Python runtime.
 
+import json
 import os
 import sys
 from pathlib import Path
@@ -17,8 +18,70 @@ if str(BACKEND_DIR) not in sys.path:
 DEFAULT_CFG = ROOT_DIR / "config" / "kpi_config.yaml"
 os.environ.setdefault("KPI_CONFIG_PATH", str(DEFAULT_CFG))
 
-# Import the FastAPI application from the backend
-from app.main import app as fastapi_app  # noqa: E402
+# The FastAPI application is imported lazily (see _LazyApp): importing app.main
+# pulls in FastAPI/Pydantic and the API routers, which dominates cold-start time
+# and is not needed to answer health probes.
+HEALTH_PATH = "/api/v1/health"
+
+
+class _LazyApp:
+    """
+    ASGI app that answers the health probe directly and loads the FastAPI app on
+    the first other request.
+
+    Lifespan events are acknowledged here; the FastAPI startup handlers run when the
+    app is actually loaded (and shutdown handlers only if it was).
+    """
+
+    def __init__(self):
+        self._app = None
+        self._started = False
+
+    async def _load(self):
+        if self._app is None:
+            from app.main import app as fastapi_app
+
+            self._app = fastapi_app
+        if not self._started:
+            self._started = True
+            await self._app.router.startup()
+        return self._app
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                if self._started:
+                    await self._app.router.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _health(self, send):
+        from app.core.health import health_payload
+
+        body = json.dumps(health_payload()).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode("ascii")),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope, receive, send):
+        if scope.get("type") == "lifespan":
+            return await self._lifespan(receive, send)
+        if scope.get("type") == "http" and scope.get("method") == "GET" and scope.get("path") == HEALTH_PATH:
+            return await self._health(send)
+        app = await self._load()
+        return await app(scope, receive, send)
+
+
+fastapi_app = _LazyApp()
 
 class _PrefixPathMiddleware:
     """
@@ -0,0 +1,9 @@
+"""Incremental KPI threshold alerting.
+
+Exports:
+- AlertEngine: per-rule trailing windows updated as records arrive, with debounce/cooldown
+- AlertRule / rules_from_config: rule definitions (kpi_config.yaml `alerts` section)
+- LogSink, FileSink, WebhookSink, SinkDispatcher: alert delivery
+"""
+from .engine import AlertEngine, AlertRule, rules_from_config
+from .sinks import FileSink, LogSink, SinkDispatcher, WebhookSink
@@ -0,0 +1,390 @@
+"""Incremental threshold alerting.
+
+Records are folded into per-day counters as they arrive; every rule keeps
+running totals for its trailing window, so ingesting a record is O(rules) and
+evaluating a rule is O(1). When the as-of day advances, only the days that
+enter or leave each window are added/subtracted. Only rules whose totals
+changed are re-evaluated.
+
+Rule state is debounced: a new severity must persist for `debounce`
+consecutive evaluations before it is raised, the same severity is re-notified
+at most once per `cooldown`, and a return to ok after an alert emits a
+`resolved` notification. Alerts carry aggregate values only (no PHI).
+"""
+import logging
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional
+
+from app.kpi.classification import Classifier
+from app.kpi.engine import (
+    _classify_test,
+    _record_timestamp,
+    _tat_hours,
+    _tat_status,
+    _volume_period_days,
+    _volume_status,
+)
+
+logger = logging.getLogger(__name__)
+
+RULE_KPIS = ("cytogenetics_total_volume", "total_volume", "tat")
+SEVERITY_RANK = {"unknown": 0, "ok": 0, "warning": 1, "critical": 2}
+_LATENCY_SAMPLES = 2048
+
+
+@dataclass
+class AlertRule:
+    name: str
+    kpi: str  # cytogenetics_total_volume | total_volume (lower is worse) | tat (average, higher is worse)
+    window_days: int
+    thresholds: Dict[str, Any]
+    debounce: int = 1
+    cooldown_s: float = 3600.0
+    min_count: int = 1  # tat: minimum tests with a TAT in the window before it is evaluated
+
+    def __post_init__(self) -> None:
+        if self.kpi not in RULE_KPIS:
+            raise ValueError(f"alert rule {self.name}: kpi must be one of {', '.join(RULE_KPIS)}")
+        if not 1 <= int(self.window_days) <= 366:
+            raise ValueError(f"alert rule {self.name}: window_days must be between 1 and 366")
+        self.window_days = int(self.window_days)
+        self.debounce = max(1, int(self.debounce))
+
+    def status(self, value: Optional[float]) -> str:
+        cfg = {"kpis": {self.kpi: {"thresholds": self.thresholds}}}
+        if self.kpi == "tat":
+            return _tat_status(cfg, value)
+        if value is None:
+            return "unknown"
+        return _volume_status(cfg, int(value), self.kpi)
+
+
+def rules_from_config(config: Dict[str, Any]) -> List[AlertRule]:
+    """
+    Rules from `alerts.rules`; thresholds default to kpis.<kpi>.thresholds.
+
+    Volume thresholds taken from kpis.<kpi> are per kpis.<kpi>.period_days and
+    are scaled to the rule's window (as rolling windows do); a rule's own
+    `thresholds` are absolute values for its window and are used as given.
+    """
+    acfg = config.get("alerts") or {}
+    debounce = acfg.get("debounce", 1)
+    cooldown_s = float(acfg.get("cooldown_minutes", 60)) * 60.0
+    rules = []
+    for r in acfg.get("rules") or []:
+        kpi = r.get("kpi")
+        base_kpi = "cytogenetics_total_volume" if kpi == "total_volume" else kpi
+        window_days = r.get("window_days", 30)
+        th = dict((config.get("kpis", {}).get(base_kpi, {}) or {}).get("thresholds") or {})
+        if kpi in ("cytogenetics_total_volume", "total_volume"):
+            try:
+                scale = int(window_days) / _volume_period_days(config, base_kpi)
+            except (TypeError, ValueError):
+                raise ValueError(f"alert rule {r.get('name') or kpi}: window_days must be an integer")
+            th = {k: v * scale if isinstance(v, (int, float)) else v for k, v in th.items()}
+        th.update(r.get("thresholds") or {})
+        rules.append(AlertRule(
+            name=str(r.get("name") or f"{kpi}_{r.get('window_days')}d"),
+            kpi=kpi,
+            window_days=window_days,
+            thresholds={k: th.get(k) for k in ("warning", "critical")},
+            debounce=r.get("debounce", debounce),
+            cooldown_s=float(r.get("cooldown_minutes", cooldown_s / 60.0)) * 60.0,
+            min_count=int(r.get("min_count", 1)),
+        ))
+    return rules
+
+
+@dataclass
+class RuleState:
+    status: str = "unknown"  # last raised (debounced) status
+    observed: str = "unknown"  # status of the latest evaluation
+    pending: Optional[str] = None
+    pending_count: int = 0
+    value: Optional[float] = None
+    since: Optional[str] = None
+    last_notified_at: float = 0.0
+    evaluations: int = 0
+    notifications: int = 0
+    # running window totals
+    volume: int = 0
+    cyto: int = 0
+    tat_sum: float = 0.0
+    tat_count: int = 0
+    dirty: bool = True
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "observed": self.observed,
+            "pending": self.pending,
+            "pending_count": self.pending_count,
+            "value": self.value,
+            "since": self.since,
+            "evaluations": self.evaluations,
+            "notifications": self.notifications,
+        }
+
+
+class _Latency:
+    def __init__(self) -> None:
+        self.samples: Deque[float] = deque(maxlen=_LATENCY_SAMPLES)
+        self.count = 0
+        self.max_ms = 0.0
+
+    def add(self, ms: float) -> None:
+        self.samples.append(ms)
+        self.count += 1
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def to_dict(self) -> Dict[str, Any]:
+        vals = sorted(self.samples)
+
+        def pct(p: float) -> Optional[float]:
+            if not vals:
+                return None
+            return round(vals[min(len(vals) - 1, int(p / 100.0 * len(vals)))], 4)
+
+        return {"count": self.count, "p50_ms": pct(50), "p95_ms": pct(95), "p99_ms": pct(99),
+                "max_ms": round(self.max_ms, 4)}
+
+
+@dataclass
+class _Day:
+    volume: int = 0
+    cyto: int = 0
+    tat_sum: float = 0.0
+    tat_count: int = 0
+
+
+class AlertEngine:
+    """
+    Rule windows over incrementally ingested records.
+
+    `notify` is called with each raised alert while the engine lock is held;
+    keep it non-blocking (e.g. SinkDispatcher.submit).
+    """
+
+    def __init__(
+        self,
+        rules: List[AlertRule],
+        notify: Optional[Callable[[Dict[str, Any]], None]] = None,
+        history_size: int = 200,
+        classifier: Optional[Classifier] = None,
+    ) -> None:
+        names = [r.name for r in rules]
+        if len(set(names)) != len(names):
+            raise ValueError("alert rule names must be unique")
+        self.rules = rules
+        self.notify = notify or (lambda alert: None)
+        self.classifier = classifier
+        self._lock = threading.Lock()
+        self._days: Dict[int, _Day] = {}
+        self._states: Dict[str, RuleState] = {r.name: RuleState() for r in self.rules}
+        self._max_window = max((r.window_days for r in self.rules), default=1)
+        self.as_of: Optional[int] = None  # day ordinal
+        self.records = 0
+        self.skipped = 0  # no usable timestamp
+        self.late = 0  # older than every window
+        self.future = 0  # dated after tomorrow (bad clocks/data); ignored so windows are not wiped
+        self.ingest_latency = _Latency()
+        self.eval_latency = _Latency()
+        self.history: Deque[Dict[str, Any]] = deque(maxlen=history_size)
+
+    # ---- window maintenance ----
+
+    def _in_window(self, rule: AlertRule, day: int) -> bool:
+        return self.as_of is not None and self.as_of - rule.window_days < day <= self.as_of
+
+    @staticmethod
+    def _apply(st: RuleState, d: _Day, sign: int) -> None:
+        st.volume += sign * d.volume
+        st.cyto += sign * d.cyto
+        st.tat_sum += sign * d.tat_sum
+        st.tat_count += sign * d.tat_count
+        if not st.tat_count:
+            st.tat_sum = 0.0  # drop float residue once the window has no TATs
+        st.dirty = True
+
+    def _advance(self, new_as_of: int) -> None:
+        old = self.as_of
+        self.as_of = new_as_of
+        for rule in self.rules:
+            st = self._states[rule.name]
+            w = rule.window_days
+            if old is None or new_as_of - old >= w:
+                st.volume = st.cyto = st.tat_count = 0
+                st.tat_sum = 0.0
+                for day in range(new_as_of - w + 1, new_as_of + 1):
+                    d = self._days.get(day)
+                    if d is not None:
+                        self._apply(st, d, 1)
+                st.dirty = True
+                continue
+            for day in range(old - w + 1, new_as_of - w + 1):  # leaving
+                d = self._days.get(day)
+                if d is not None:
+                    self._apply(st, d, -1)
+            for day in range(old + 1, new_as_of + 1):  # entering
+                d = self._days.get(day)
+                if d is not None:
+                    self._apply(st, d, 1)
+            st.dirty = True
+        cutoff = new_as_of - self._max_window
+        for day in [k for k in self._days if k <= cutoff]:
+            del self._days[day]
+
+    def _add(self, day: int, is_cyto: bool, tat: Optional[float]) -> None:
+        if self.as_of is None or day > self.as_of:
+            self._advance(day)
+        if day <= self.as_of - self._max_window:  # type: ignore[operator]
+            self.late += 1
+            return
+        d = self._days.get(day)
+        if d is None:
+            d = self._days[day] = _Day()
+        delta = _Day(1, 1 if is_cyto else 0, tat or 0.0, 1 if tat is not None else 0)
+        d.volume += delta.volume
+        d.cyto += delta.cyto
+        d.tat_sum += delta.tat_sum
+        d.tat_count += delta.tat_count
+        for rule in self.rules:
+            if self._in_window(rule, day):
+                self._apply(self._states[rule.name], delta, 1)
+
+    # ---- public API ----
+
+    def ingest(self, records: Iterable[Dict[str, Any]], notify: bool = True) -> List[Dict[str, Any]]:
+        """
+        Fold new test records into the windows and evaluate changed rules; returns raised alerts.
+
+        With notify=False (backfill/priming) rule states are set to the observed
+        status directly, without debounce or notifications.
+        """
+        t0 = time.perf_counter()
+        horizon = datetime.utcnow().date().toordinal() + 1
+        with self._lock:
+            for rec in records:
+                ts = _record_timestamp(rec)
+                if ts is None:
+                    self.skipped += 1
+                    continue
+                day = ts.date().toordinal()
+                if day > horizon:
+                    self.future += 1
+                    continue
+                self.records += 1
+                self._add(day, _classify_test(rec, self.classifier)[0] == "CYTO", _tat_hours(rec))
+            alerts = self._evaluate(quiet=not notify)
+        self.ingest_latency.add((time.perf_counter() - t0) * 1000.0)
+        return alerts
+
+    def tick(self, today: Optional[date] = None) -> List[Dict[str, Any]]:
+        """Advance windows to `today` (so volumes drop when no records arrive) and evaluate."""
+        day = (today or datetime.utcnow().date()).toordinal()
+        with self._lock:
+            if self.as_of is None or day > self.as_of:
+                self._advance(day)
+            return self._evaluate()
+
+    def _value(self, rule: AlertRule, st: RuleState) -> Optional[float]:
+        if rule.kpi == "tat":
+            if st.tat_count < rule.min_count or not st.tat_count:
+                return None
+            return st.tat_sum / st.tat_count
+        return st.cyto if rule.kpi == "cytogenetics_total_volume" else st.volume
+
+    def _evaluate(self, quiet: bool = False) -> List[Dict[str, Any]]:
+        raised: List[Dict[str, Any]] = []
+        now = time.time()
+        for rule in self.rules:
+            st = self._states[rule.name]
+            if not st.dirty:
+                continue
+            t0 = time.perf_counter()
+            st.dirty = False
+            st.evaluations += 1
+            st.value = self._value(rule, st)
+            observed = rule.status(st.value)
+            st.observed = observed
+            if quiet:
+                if observed != "unknown" and observed != st.status:
+                    st.status, st.since = observed, datetime.utcnow().isoformat() + "Z"
+                    st.last_notified_at = now  # no immediate "repeat" for a primed alert state
+                st.pending, st.pending_count = None, 0
+                alert = None
+            else:
+                alert = self._debounce(rule, st, observed, now)
+            self.eval_latency.add((time.perf_counter() - t0) * 1000.0)
+            if alert is not None:
+                raised.append(alert)
+        for alert in raised:
+            self.history.append(alert)
+            try:
+                self.notify(alert)
+            except Exception:
+                logger.exception("Alert notification failed: rule=%s", alert.get("rule"))
+        return raised
+
+    def _debounce(self, rule: AlertRule, st: RuleState, observed: str, now: float) -> Optional[Dict[str, Any]]:
+        if observed == "unknown":
+            st.pending, st.pending_count = None, 0
+            return None
+        if observed == st.status:
+            st.pending, st.pending_count = None, 0
+            if SEVERITY_RANK[observed] and now - st.last_notified_at >= rule.cooldown_s:
+                return self._raise(rule, st, observed, st.status, now, "repeat")
+            return None
+        if observed == st.pending:
+            st.pending_count += 1
+        else:
+            st.pending, st.pending_count = observed, 1
+        if st.pending_count < rule.debounce:
+            return None
+        previous = st.status
+        st.status = observed
+        st.pending, st.pending_count = None, 0
+        st.since = datetime.utcnow().isoformat() + "Z"
+        if SEVERITY_RANK[observed]:
+            return self._raise(rule, st, observed, previous, now, "raised")
+        if SEVERITY_RANK.get(previous, 0):
+            return self._raise(rule, st, observed, previous, now, "resolved")
+        return None
+
+    def _raise(self, rule: AlertRule, st: RuleState, severity: str, previous: str, now: float, event: str) -> Dict[str, Any]:
+        st.last_notified_at = now
+        st.notifications += 1
+        return {
+            "rule": rule.name,
+            "kpi": rule.kpi,
+            "event": event,
+            "severity": severity,
+            "previous": previous,
+            "value": st.value,
+            "window_days": rule.window_days,
+            "thresholds": rule.thresholds,
+            "as_of": date.fromordinal(self.as_of).isoformat() if self.as_of else None,
+            "firedAt": datetime.utcnow().isoformat() + "Z",
+        }
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "as_of": date.fromordinal(self.as_of).isoformat() if self.as_of else None,
+                "records": self.records,
+                "skipped": self.skipped,
+                "late": self.late,
+                "future": self.future,
+                "rules": [
+                    {"name": r.name, "kpi": r.kpi, "window_days": r.window_days, "thresholds": r.thresholds,
+                     "debounce": r.debounce, **self._states[r.name].to_dict()}
+                    for r in self.rules
+                ],
+                "latency": {"ingest": self.ingest_latency.to_dict(), "evaluate": self.eval_latency.to_dict()},
+                "recent": list(self.history),
+            }
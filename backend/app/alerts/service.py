@@ -0,0 +1,62 @@
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+from app.core.config import Settings
+from app.kpi import load_kpi_config
+from app.kpi.classification import get_classifier
+
+from .engine import AlertEngine, rules_from_config
+from .sinks import FileSink, LogSink, SinkDispatcher, WebhookSink
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_engine: Optional[AlertEngine] = None
+_dispatcher: Optional[SinkDispatcher] = None
+
+
+def _build_sinks(names: List[str]) -> List[Any]:
+    sinks: List[Any] = []
+    for name in names:
+        if name == "log":
+            sinks.append(LogSink())
+        elif name == "file":
+            sinks.append(FileSink(Settings.ALERT_FILE_PATH))
+        elif name == "webhook":
+            sinks.append(WebhookSink(Settings.ALERT_WEBHOOK_URL))
+        else:
+            raise ValueError(f"Unknown alert sink '{name}'; expected log, file or webhook")
+    return sinks
+
+
+def get_alert_engine() -> AlertEngine:
+    """Engine built from the KPI config's `alerts` section and ALERT_SINKS (created on first use)."""
+    global _engine, _dispatcher
+    with _lock:
+        if _engine is None:
+            cfg = load_kpi_config()
+            _dispatcher = SinkDispatcher(_build_sinks(Settings.ALERT_SINKS)).start()
+            _engine = AlertEngine(rules_from_config(cfg), notify=_dispatcher.submit, classifier=get_classifier(cfg))
+            logger.info("Alert engine ready: rules=%s sinks=%s", len(_engine.rules), ",".join(Settings.ALERT_SINKS))
+        return _engine
+
+
+def ingest_new_records(records: List[Dict[str, Any]], initial: bool = False) -> None:
+    """Listener for incremental sources; the initial backfill primes state without notifying."""
+    engine = get_alert_engine()
+    engine.ingest(records, notify=not initial)
+    engine.tick()
+
+
+def alerts_status() -> Dict[str, Any]:
+    engine = get_alert_engine()
+    out = engine.status()
+    out["delivery"] = _dispatcher.status() if _dispatcher is not None else None
+    return out
+
+
+def stop_alerts() -> None:
+    if _dispatcher is not None:
+        _dispatcher.flush(timeout=2.0)
+        _dispatcher.stop()
@@ -0,0 +1,147 @@
+"""Alert delivery sinks.
+
+Sinks expose `name` and `send(alert)`. SinkDispatcher fans alerts out on a
+background thread through a bounded queue, so rule evaluation never waits on
+disk or network I/O; when the queue is full new alerts are dropped and counted.
+"""
+import json
+import logging
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class LogSink:
+    name = "log"
+
+    def send(self, alert: Dict[str, Any]) -> None:
+        msg = (
+            f"ALERT {alert['event']} {alert['rule']} {alert['severity']}: kpi={alert['kpi']} "
+            f"value={alert['value']} window_days={alert['window_days']} as_of={alert['as_of']}"
+        )
+        if alert["severity"] == "critical":
+            logger.error(msg)
+        elif alert["severity"] == "warning":
+            logger.warning(msg)
+        else:
+            logger.info(msg)
+
+
+class FileSink:
+    """Append alerts as JSON lines."""
+
+    name = "file"
+
+    def __init__(self, path: str) -> None:
+        if not path:
+            raise ValueError("ALERT_FILE_PATH is required for the file alert sink")
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+    def send(self, alert: Dict[str, Any]) -> None:
+        line = json.dumps(alert) + "\n"
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self.path.open("a", encoding="utf-8") as f:
+                f.write(line)
+
+
+class WebhookSink:
+    """POST each alert as JSON; retries transient failures with exponential backoff."""
+
+    name = "webhook"
+
+    def __init__(self, url: str, timeout: float = 5.0, retries: int = 3, backoff_s: float = 0.5) -> None:
+        if not url:
+            raise ValueError("ALERT_WEBHOOK_URL is required for the webhook alert sink")
+        self.url = url
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_s = backoff_s
+        self._session = None
+
+    def send(self, alert: Dict[str, Any]) -> None:
+        import requests
+
+        if self._session is None:
+            self._session = requests.Session()
+        for attempt in range(self.retries + 1):
+            try:
+                resp = self._session.post(self.url, json=alert, timeout=self.timeout)
+                if resp.status_code < 500 and resp.status_code != 429:
+                    resp.raise_for_status()
+                    return
+                err: Exception = RuntimeError(f"webhook responded {resp.status_code}")
+            except requests.RequestException as e:
+                if isinstance(e, requests.HTTPError):
+                    raise
+                err = e
+            if attempt < self.retries:
+                time.sleep(self.backoff_s * (2 ** attempt))
+        raise err
+
+
+class SinkDispatcher:
+    def __init__(self, sinks: List[Any], maxsize: int = 1000) -> None:
+        self.sinks = sinks
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=maxsize)
+        self._thread: Optional[threading.Thread] = None
+        self.delivered: Dict[str, int] = {s.name: 0 for s in sinks}
+        self.failed: Dict[str, int] = {s.name: 0 for s in sinks}
+        self.dropped = 0
+
+    def start(self) -> "SinkDispatcher":
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="alert-sinks", daemon=True)
+            self._thread.start()
+        return self
+
+    def submit(self, alert: Dict[str, Any]) -> None:
+        try:
+            self._queue.put_nowait(alert)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self) -> None:
+        while True:
+            alert = self._queue.get()
+            try:
+                if alert is None:
+                    return
+                for sink in self.sinks:
+                    try:
+                        sink.send(alert)
+                        self.delivered[sink.name] += 1
+                    except Exception as e:
+                        self.failed[sink.name] += 1
+                        logger.warning("Alert sink %s failed: %s", sink.name, type(e).__name__)
+            finally:
+                self._queue.task_done()
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until queued alerts are delivered (best effort; for shutdown and tests)."""
+        deadline = time.time() + timeout
+        while self._queue.unfinished_tasks:
+            if time.time() > deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def stop(self, timeout: float = 5.0) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(timeout)
+        self._thread = None
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "sinks": [s.name for s in self.sinks],
+            "queued": self._queue.qsize(),
+            "delivered": dict(self.delivered),
+            "failed": dict(self.failed),
+            "dropped": self.dropped,
+        }
@@ -1,28 +1,41 @@
-from datetime import datetime, timezone
+from datetime import date, datetime, timedelta
 from typing import Any, Dict, List, Optional
 
 import logging
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
+from app.core.compute_pool import ComputeRejected, compute_pool
 from app.core.config import Settings
-from app.kpi import load_kpi_config, compute_kpis
-from app.integrations.powerbi import get_embed_info
+from app.core.serialization import NotAcceptable, encode, negotiate
+from app.core.health import health_payload
+from app.core.xlsx import XLSX_MEDIA_TYPE, iter_xlsx
+from app.kpi import (
+    load_kpi_config,
+    compute_kpis,
+    period_to_date_kpis,
+    rolling_kpis,
+    stage_kpis,
+    tests_per_fte_breakdown,
+    tests_per_fte_series,
+    what_if,
+)
+from app.kpi.batch import TestBatch
+from app.kpi.export import EXPORT_FORMATS, export_rows, iter_csv
+from app.kpi.profiling import KPIProfiler, ProfilerBusy, run_with_cprofile
 from app.core.log_store import get_recent_logs
+from app.core.shared_state import cached_result, get_shared_state
+from app.core.snapshot_service import scheduler_status, snapshot_store, trigger_refresh
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
 
 @router.get("/health")
-def health():
+async def health():
     """Basic health endpoint for uptime checks and frontend handshake."""
-    return {
-        "status": "ok",
-        "service": Settings.PROJECT_NAME,
-        "version": Settings.APP_VERSION,
-        "time": datetime.now(timezone.utc).isoformat(),
-    }
+    return health_payload()
 
 # -------------------- KPI Engine --------------------
 
@@ -41,6 +54,126 @@ class KPIComputeRequest(BaseModel):
         default=None,
         description="Optional productivity entries (date, hours_worked/remote_hours/in_lab_hours)",
     )
+    level: str = Field(
+        default="row",
+        description="'row' counts test rows; 'case' rolls rows up to unique cases (dashboard semantics)",
+    )
+    profile: Optional[str] = Field(
+        default=None,
+        description="Opt-in profiling: 'timing' for stage timings, 'cprofile' to also attach a cProfile summary",
+    )
+    history: bool = Field(
+        default=False,
+        description="Use the on-disk history (HISTORY_PATH) for MoM/YoY periods, and for the period itself when tests is empty",
+    )
+
+
+class KPIColumnarComputeRequest(BaseModel):
+    period: KPIComputePeriod
+    # Column-oriented tests: {"category": [...], "case_no": [...], "resulted_at": [...], ...}.
+    # Left as Any so rows are not validated/copied one by one; TestBatch.from_columns checks shapes.
+    columns: Dict[str, Any] = Field(default_factory=dict)
+    productivity: Optional[List[Dict[str, Any]]] = None
+    level: str = Field(default="row", description="row | case")
+    profile: Optional[str] = Field(default=None, description="timing | cprofile")
+    history: bool = Field(default=False, description="Use the on-disk history for MoM/YoY periods")
+
+
+class KPIFTEBreakdownRequest(BaseModel):
+    period: KPIComputePeriod
+    tests: List[Dict[str, Any]] = Field(default_factory=list)
+    productivity: List[Dict[str, Any]] = Field(
+        default_factory=list,
+        description="Productivity entries (date, staff_id, staff_name, hours_worked/remote_hours/in_lab_hours)",
+    )
+    by: str = Field(default="staff", description="staff | day | group")
+    groups: Optional[Dict[str, str]] = Field(
+        default=None,
+        description="staff_id -> group name (required for by=group)",
+    )
+
+
+class KPIFTESeriesRequest(BaseModel):
+    period: KPIComputePeriod
+    tests: List[Dict[str, Any]] = Field(default_factory=list)
+    productivity: List[Dict[str, Any]] = Field(default_factory=list)
+    granularity: str = Field(default="daily", description="daily | weekly")
+
+
+class KPIRollingRequest(BaseModel):
+    period: KPIComputePeriod
+    tests: List[Dict[str, Any]] = Field(default_factory=list)
+    windows: Optional[List[int]] = Field(
+        default=None,
+        description="Trailing window sizes in days (defaults to kpis.rolling.windows)",
+    )
+
+
+class HistoryIngestRequest(BaseModel):
+    tests: List[Dict[str, Any]] = Field(default_factory=list)
+    months: Optional[List[str]] = Field(default=None, description="Only store these months (YYYY-MM)")
+    since: Optional[str] = Field(
+        default=None, description="YYYY-MM-DD the tests are complete from (defaults to the earliest test)"
+    )
+    until: Optional[str] = Field(
+        default=None,
+        description="YYYY-MM-DD the tests are complete through (defaults to the end of the month before the latest test)",
+    )
+
+
+class KPIStagesRequest(BaseModel):
+    period: KPIComputePeriod
+    tests: List[Dict[str, Any]] = Field(
+        default_factory=list,
+        description="Test records with stage timestamps (triaged_at, analyzed_at, reviewed_at, qc_at; see kpi_config.yaml stages)",
+    )
+
+
+class KPIPeriodToDateRequest(BaseModel):
+    as_of: Optional[str] = Field(default=None, description="YYYY-MM-DD (defaults to today, UTC)")
+    tests: List[Dict[str, Any]] = Field(default_factory=list)
+    periods: List[KPIComputePeriod] = Field(
+        default_factory=list,
+        description="Extra periods compared with the same period last year",
+    )
+
+
+class KPIExportRequest(BaseModel):
+    report: str = Field(default="monthly", description="monthly | tech")
+    format: str = Field(default="csv", description="csv | xlsx")
+    start_date: str = Field(..., description="YYYY-MM-DD")
+    end_date: str = Field(..., description="YYYY-MM-DD")
+    tests: List[Dict[str, Any]] = Field(default_factory=list)
+    productivity: Optional[List[Dict[str, Any]]] = None
+
+
+class KPIWhatIfRequest(BaseModel):
+    periods: List[KPIComputePeriod] = Field(default_factory=list)
+    tests: List[Dict[str, Any]] = Field(default_factory=list)
+    productivity: Optional[List[Dict[str, Any]]] = None
+    level: str = Field(default="row", description="row | case")
+    aggregate_key: Optional[str] = Field(
+        default=None,
+        description="Key from a previous what-if response; reuses its cached aggregates instead of periods/tests",
+    )
+    threshold_sets: List[Dict[str, Any]] = Field(
+        default_factory=list,
+        description='Overrides of kpi_config.yaml, e.g. {"name": "strict", "kpis": {"tat": {"thresholds": {"warning": 36}}}}',
+    )
+    include_periods: bool = True
+
+
+class AlertIngestRequest(BaseModel):
+    tests: List[Dict[str, Any]] = Field(default_factory=list)
+    notify: bool = Field(default=True, description="false primes rule state (backfill) without sending alerts")
+
+
+class PowerBIPushRequest(BaseModel):
+    tests: List[Dict[str, Any]] = Field(default_factory=list)
+    productivity: Optional[List[Dict[str, Any]]] = None
+    start_date: Optional[str] = Field(default=None, description="YYYY-MM-DD (default: PBI_PUSH_DAYS before end_date)")
+    end_date: Optional[str] = Field(default=None, description="YYYY-MM-DD (default: today, UTC)")
+    full: bool = Field(default=False, description="Clear the table and re-push every row")
 
 
 class KPIConfigOut(BaseModel):
@@ -60,39 +193,648 @@ def kpi_get_config():
         raise HTTPException(status_code=500, detail="Failed to load KPI config")
 
 
-@router.post("/kpi/compute")
-def kpi_compute(req: KPIComputeRequest):
+_PROFILE_MODES = {"1": "timing", "true": "timing", "timing": "timing", "cprofile": "cprofile"}
+
+
+def _profile_mode(header_val: Optional[str], body_val: Optional[str]) -> Optional[str]:
+    """Resolve the profiling mode from the X-KPI-Profile header or the body flag."""
+    raw = (header_val or body_val or "").strip().lower()
+    return _PROFILE_MODES.get(raw)
+
+
+def _request_timeout(header_val: Optional[str]) -> Optional[float]:
+    """X-KPI-Timeout in seconds (can only lower COMPUTE_TIMEOUT_SECONDS)."""
+    if not header_val:
+        return None
+    try:
+        val = float(header_val)
+    except ValueError:
+        val = 0.0
+    if not val > 0:
+        raise HTTPException(status_code=400, detail="X-KPI-Timeout must be a positive number of seconds")
+    return val
+
+
+async def _run_on_pool(name: str, job, timeout: Optional[str]) -> Any:
+    """compute_pool.run(job) with overload/deadline mapped to 429/503 + Retry-After."""
+    try:
+        return await compute_pool.run(job, timeout=_request_timeout(timeout))
+    except ComputeRejected as e:
+        logger.warning("API %s rejected: status=%s detail=%s", name, e.status_code, e.detail)
+        raise HTTPException(status_code=e.status_code, detail=e.detail, headers={"Retry-After": str(e.retry_after)})
+
+
+async def _offload(
+    fn,
+    *args: Any,
+    timeout: Optional[str] = None,
+    accept: Optional[str] = None,
+    accept_encoding: Optional[str] = None,
+    response: Optional[Response] = None,
+) -> Response:
+    """
+    Run a sync handler body on the compute pool and encode its result there in
+    the negotiated format (see app.core.serialization). Overload and deadline
+    map to 429/503 with Retry-After; headers set on `response` are kept.
+    """
+    try:
+        media_type = negotiate(accept)
+    except NotAcceptable as e:
+        raise HTTPException(status_code=406, detail=str(e))
+
+    def job():
+        result = fn(*args)
+        try:
+            return encode(result, media_type, accept_encoding)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=500, detail="Failed to serialize response")
+
+    body, headers = await _run_on_pool(fn.__name__.lstrip("_"), job, timeout)
+    if response is not None:
+        for k, v in response.headers.items():
+            if k not in ("content-length", "content-type"):
+                headers.setdefault(k, v)
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+def _history_store(enabled: bool):
+    """HistoryStore for a request that asked for it (ValueError when HISTORY_PATH is not set)."""
+    if not enabled:
+        return None
+    from app.kpi.history import get_history_store
+
+    store = get_history_store()
+    if store is None:
+        raise ValueError("History is not enabled (set HISTORY_PATH)")
+    return store
+
+
+async def _cache_body(request: Request) -> Optional[bytes]:
+    """Raw request body as the result cache key (None when shared state is off; nothing is read)."""
+    if not Settings.SHARED_STATE_PATH:
+        return None
+    # FastAPI has already read the body to parse it; this returns the same bytes
+    return await request.body()
+
+
+def _cached(name: str, cfg: Dict[str, Any], body: Optional[bytes], response: Response, compute) -> Dict[str, Any]:
+    """Serve from / fill the shared result cache; X-KPI-Cache says which (absent when disabled)."""
+    if body is None:
+        return compute()
+    result, status = cached_result(name, cfg, body, compute)
+    if status is not None:
+        response.headers["X-KPI-Cache"] = status
+    return result
+
+
+def _kpi_compute(req: KPIComputeRequest, response: Response, body: Optional[bytes], x_kpi_profile: Optional[str]):
     try:
         cfg = load_kpi_config()
     except Exception:
         raise HTTPException(status_code=500, detail="Failed to load KPI config")
 
     productivity_items: Optional[List[Dict[str, Any]]] = req.productivity
+    mode = _profile_mode(x_kpi_profile, req.profile)
 
     try:
-        result = compute_kpis(
-            cfg,
+        kwargs = dict(
             period=req.period,  # type: ignore[arg-type]
             tests=list(req.tests),
             productivity=productivity_items,
+            level=req.level,
+            history=_history_store(req.history),
         )
+        if mode is None and req.history:
+            # History files can change between requests; not cached
+            result = compute_kpis(cfg, **kwargs)
+        elif mode is None:
+            result = _cached("compute", cfg, body, response, lambda: compute_kpis(cfg, **kwargs))
+        elif mode == "timing":
+            result = compute_kpis(cfg, profiler=KPIProfiler(), **kwargs)
+        else:
+            result, summary = run_with_cprofile(
+                compute_kpis, cfg, profiler=KPIProfiler(),
+                sample_rate=Settings.KPI_CPROFILE_SAMPLE_RATE, **kwargs,
+            )
+            result["meta"]["profile"]["cprofile"] = summary
         logger.info(
-            "API kpi_compute ok: tests=%s productivity_items=%s",
+            "API kpi_compute ok: tests=%s productivity_items=%s quality_issues=%s",
             len(req.tests or []),
             0 if productivity_items is None else len(productivity_items),
+            result["data_quality"]["issues"],
         )
         return result
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=429, detail=f"{e}; retry or drop the cprofile flag", headers={"Retry-After": "1"})
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception:
         raise HTTPException(status_code=500, detail="KPI computation failed")
 
 
+@router.post("/kpi/compute")
+async def kpi_compute(
+    request: Request,
+    req: KPIComputeRequest,
+    response: Response,
+    x_kpi_profile: Optional[str] = Header(default=None),
+    x_kpi_timeout: Optional[str] = Header(default=None),
+    accept: Optional[str] = Header(default=None),
+    accept_encoding: Optional[str] = Header(default=None),
+):
+    return await _offload(
+        _kpi_compute, req, response, await _cache_body(request), x_kpi_profile,
+        timeout=x_kpi_timeout, accept=accept, accept_encoding=accept_encoding, response=response,
+    )
+
+
+def _kpi_compute_columnar(
+    req: KPIColumnarComputeRequest, response: Response, body: Optional[bytes], x_kpi_profile: Optional[str]
+):
+    try:
+        cfg = load_kpi_config()
+    except Exception:
+        raise HTTPException(status_code=500, detail="Failed to load KPI config")
+
+    mode = _profile_mode(x_kpi_profile, req.profile)
+    try:
+        profiler = KPIProfiler() if mode else None
+        if profiler is not None:
+            with profiler.stage("build_batch"):
+                batch = TestBatch.from_columns(req.columns)
+        else:
+            batch = TestBatch.from_columns(req.columns)
+        kwargs = dict(
+            period=req.period,  # type: ignore[arg-type]
+            tests=batch,
+            productivity=req.productivity,
+            level=req.level,
+            history=_history_store(req.history),
+        )
+        if mode == "cprofile":
+            result, summary = run_with_cprofile(
+                compute_kpis, cfg, profiler=profiler,
+                sample_rate=Settings.KPI_CPROFILE_SAMPLE_RATE, **kwargs,
+            )
+            result["meta"]["profile"]["cprofile"] = summary
+        elif mode is None and not req.history:
+            result = _cached("compute_columnar", cfg, body, response, lambda: compute_kpis(cfg, **kwargs))
+        else:
+            result = compute_kpis(cfg, profiler=profiler, **kwargs)
+        logger.info(
+            "API kpi_compute_columnar ok: tests=%s batch_bytes=%s productivity_items=%s quality_issues=%s",
+            len(batch), batch.nbytes, 0 if req.productivity is None else len(req.productivity),
+            result["data_quality"]["issues"],
+        )
+        return result
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=429, detail=f"{e}; retry or drop the cprofile flag", headers={"Retry-After": "1"})
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception:
+        raise HTTPException(status_code=500, detail="KPI computation failed")
+
+
+@router.post("/kpi/compute/columnar")
+async def kpi_compute_columnar(
+    request: Request,
+    req: KPIColumnarComputeRequest,
+    response: Response,
+    x_kpi_profile: Optional[str] = Header(default=None),
+    x_kpi_timeout: Optional[str] = Header(default=None),
+    accept: Optional[str] = Header(default=None),
+    accept_encoding: Optional[str] = Header(default=None),
+):
+    return await _offload(
+        _kpi_compute_columnar, req, response, await _cache_body(request), x_kpi_profile,
+        timeout=x_kpi_timeout, accept=accept, accept_encoding=accept_encoding, response=response,
+    )
+
+
+def _kpi_tests_per_fte_breakdown(req: KPIFTEBreakdownRequest, response: Response, body: Optional[bytes]):
+    try:
+        cfg = load_kpi_config()
+    except Exception:
+        raise HTTPException(status_code=500, detail="Failed to load KPI config")
+
+    try:
+        result = _cached("tests_per_fte_breakdown", cfg, body, response, lambda: tests_per_fte_breakdown(
+            cfg,
+            period=req.period,  # type: ignore[arg-type]
+            tests=req.tests,
+            productivity=req.productivity,
+            by=req.by,
+            groups=req.groups,
+        ))
+        logger.info(
+            "API tests_per_fte_breakdown ok: by=%s tests=%s productivity_items=%s rows=%s",
+            req.by, len(req.tests), len(req.productivity), len(result["rows"]),
+        )
+        return result
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception:
+        raise HTTPException(status_code=500, detail="Tests per FTE breakdown failed")
+
+
+@router.post("/kpi/tests-per-fte/breakdown")
+async def kpi_tests_per_fte_breakdown(
+    request: Request,
+    req: KPIFTEBreakdownRequest,
+    response: Response,
+    x_kpi_timeout: Optional[str] = Header(default=None),
+    accept: Optional[str] = Header(default=None),
+    accept_encoding: Optional[str] = Header(default=None),
+):
+    return await _offload(
+        _kpi_tests_per_fte_breakdown, req, response, await _cache_body(request),
+        timeout=x_kpi_timeout, accept=accept, accept_encoding=accept_encoding, response=response,
+    )
+
+
+def _kpi_tests_per_fte_series(req: KPIFTESeriesRequest, response: Response, body: Optional[bytes]):
+    try:
+        cfg = load_kpi_config()
+    except Exception:
+        raise HTTPException(status_code=500, detail="Failed to load KPI config")
+
+    try:
+        result = _cached("tests_per_fte_series", cfg, body, response, lambda: tests_per_fte_series(
+            cfg,
+            period=req.period,  # type: ignore[arg-type]
+            tests=req.tests,
+            productivity=req.productivity,
+            granularity=req.granularity,
+        ))
+        logger.info(
+            "API tests_per_fte_series ok: granularity=%s tests=%s productivity_items=%s points=%s",
+            req.granularity, len(req.tests), len(req.productivity), len(result["points"]),
+        )
+        return result
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception:
+        raise HTTPException(status_code=500, detail="Tests per FTE series failed")
+
+
+@router.post("/kpi/tests-per-fte/series")
+async def kpi_tests_per_fte_series(
+    request: Request,
+    req: KPIFTESeriesRequest,
+    response: Response,
+    x_kpi_timeout: Optional[str] = Header(default=None),
+    accept: Optional[str] = Header(default=None),
+    accept_encoding: Optional[str] = Header(default=None),
+):
+    return await _offload(
+        _kpi_tests_per_fte_series, req, response, await _cache_body(request),
+        timeout=x_kpi_timeout, accept=accept, accept_encoding=accept_encoding, response=response,
+    )
+
+
+def _kpi_rolling(req: KPIRollingRequest, response: Response, body: Optional[bytes]):
+    try:
+        cfg = load_kpi_config()
+    except Exception:
+        raise HTTPException(status_code=500, detail="Failed to load KPI config")
+
+    try:
+        result = _cached("rolling", cfg, body, response, lambda: rolling_kpis(
+            cfg,
+            period=req.period,  # type: ignore[arg-type]
+            tests=req.tests,
+            windows=req.windows,
+        ))
+        logger.info(
+            "API kpi_rolling ok: tests=%s windows=%s points=%s",
+            len(req.tests), result["meta"]["windows"], len(result["points"]),
+        )
+        return result
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception:
+        raise HTTPException(status_code=500, detail="Rolling KPI computation failed")
+
+
+@router.post("/kpi/rolling")
+async def kpi_rolling(
+    request: Request,
+    req: KPIRollingRequest,
+    response: Response,
+    x_kpi_timeout: Optional[str] = Header(default=None),
+    accept: Optional[str] = Header(default=None),
+    accept_encoding: Optional[str] = Header(default=None),
+):
+    return await _offload(
+        _kpi_rolling, req, response, await _cache_body(request),
+        timeout=x_kpi_timeout, accept=accept, accept_encoding=accept_encoding, response=response,
+    )
+
+
+def _kpi_stages(req: KPIStagesRequest, response: Response, body: Optional[bytes]):
+    try:
+        cfg = load_kpi_config()
+    except Exception:
+        raise HTTPException(status_code=500, detail="Failed to load KPI config")
+
+    try:
+        result = _cached(
+            "stages", cfg, body, response,
+            lambda: stage_kpis(cfg, period=req.period, tests=req.tests),  # type: ignore[arg-type]
+        )
+        logger.info(
+            "API kpi_stages ok: tests=%s stages=%s quality_issues=%s",
+            len(req.tests), len(result["stages"]), result["data_quality"]["issues"],
+        )
+        return result
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception:
+        raise HTTPException(status_code=500, detail="Stage KPI computation failed")
+
+
+@router.post("/kpi/stages")
+async def kpi_stages(
+    request: Request,
+    req: KPIStagesRequest,
+    response: Response,
+    x_kpi_timeout: Optional[str] = Header(default=None),
+    accept: Optional[str] = Header(default=None),
+    accept_encoding: Optional[str] = Header(default=None),
+):
+    return await _offload(
+        _kpi_stages, req, response, await _cache_body(request),
+        timeout=x_kpi_timeout, accept=accept, accept_encoding=accept_encoding, response=response,
+    )
+
+
+def _kpi_period_to_date(req: KPIPeriodToDateRequest, response: Response, body: Optional[bytes]):
+    try:
+        cfg = load_kpi_config()
+    except Exception:
+        raise HTTPException(status_code=500, detail="Failed to load KPI config")
+
+    try:
+        as_of = date.fromisoformat(req.as_of) if req.as_of else None
+        result = _cached("period_to_date", cfg, body, response, lambda: period_to_date_kpis(
+            cfg,
+            tests=req.tests,
+            as_of=as_of,
+            periods=req.periods,  # type: ignore[arg-type]
+        ))
+        logger.info(
+            "API kpi_period_to_date ok: tests=%s as_of=%s fiscal_year=%s custom=%s",
+            len(req.tests), result["meta"]["as_of"], result["meta"]["fiscal_year"], len(result["custom"]),
+        )
+        return result
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception:
+        raise HTTPException(status_code=500, detail="Period-to-date KPI computation failed")
+
+
+@router.post("/kpi/period-to-date")
+async def kpi_period_to_date(
+    request: Request,
+    req: KPIPeriodToDateRequest,
+    response: Response,
+    x_kpi_timeout: Optional[str] = Header(default=None),
+    accept: Optional[str] = Header(default=None),
+    accept_encoding: Optional[str] = Header(default=None),
+):
+    return await _offload(
+        _kpi_period_to_date, req, response, await _cache_body(request),
+        timeout=x_kpi_timeout, accept=accept, accept_encoding=accept_encoding, response=response,
+    )
+
+
+def _kpi_export_rows(req: KPIExportRequest) -> List[List[Any]]:
+    """All report rows (header first); the aggregation is the expensive part, the rows are months x staff."""
+    try:
+        cfg = load_kpi_config()
+    except Exception:
+        raise HTTPException(status_code=500, detail="Failed to load KPI config")
+
+    try:
+        if req.format not in EXPORT_FORMATS:
+            raise ValueError(f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+        start, end = date.fromisoformat(req.start_date), date.fromisoformat(req.end_date)
+        return list(export_rows(cfg, req.report, start, end, req.tests, req.productivity))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception:
+        raise HTTPException(status_code=500, detail="KPI export failed")
+
+
+@router.post("/kpi/export")
+async def kpi_export(req: KPIExportRequest, x_kpi_timeout: Optional[str] = Header(default=None)):
+    # Aggregate on the compute pool (admission control, deadline); only the encoding is streamed
+    rows = await _run_on_pool("kpi_export", lambda: _kpi_export_rows(req), x_kpi_timeout)
+    start, end = date.fromisoformat(req.start_date), date.fromisoformat(req.end_date)
+    filename = f"kpi_{req.report}_{start.isoformat()}_{end.isoformat()}.{req.format}"
+    if req.format == "xlsx":
+        body, media_type = iter_xlsx(rows, sheet_name=req.report), XLSX_MEDIA_TYPE
+    else:
+        body, media_type = iter_csv(rows), "text/csv; charset=utf-8"
+    logger.info(
+        "API kpi_export ok: report=%s format=%s tests=%s productivity_items=%s",
+        req.report, req.format, len(req.tests), len(req.productivity or []),
+    )
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+def _kpi_what_if(req: KPIWhatIfRequest):
+    try:
+        cfg = load_kpi_config()
+    except Exception:
+        raise HTTPException(status_code=500, detail="Failed to load KPI config")
+
+    try:
+        result = what_if(
+            cfg,
+            threshold_sets=req.threshold_sets,
+            periods=req.periods,
+            tests=req.tests,
+            productivity=req.productivity,
+            level=req.level,
+            aggregate_key=req.aggregate_key,
+            include_periods=req.include_periods,
+        )
+        logger.info(
+            "API kpi_what_if ok: tests=%s periods=%s threshold_sets=%s cached=%s",
+            len(req.tests), result["meta"]["periods"], result["meta"]["threshold_sets"], result["meta"]["cached"],
+        )
+        return result
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception:
+        raise HTTPException(status_code=500, detail="What-if evaluation failed")
+
+
+@router.post("/kpi/what-if")
+async def kpi_what_if(
+    req: KPIWhatIfRequest,
+    x_kpi_timeout: Optional[str] = Header(default=None),
+    accept: Optional[str] = Header(default=None),
+    accept_encoding: Optional[str] = Header(default=None),
+):
+    return await _offload(_kpi_what_if, req, timeout=x_kpi_timeout, accept=accept, accept_encoding=accept_encoding)
+
+
+# -------------------- Precomputed snapshots --------------------
+
+
+def _latest_snapshot() -> Dict[str, Any]:
+    snap = snapshot_store.latest()
+    if snap is None:
+        raise HTTPException(status_code=503, detail="No KPI snapshot available yet")
+    return snap
+
+
+def _negotiated(result: Dict[str, Any], accept: Optional[str], accept_encoding: Optional[str]) -> Response:
+    """Encode `result` in the format the Accept header asks for (406 if none is supported)."""
+    try:
+        media_type = negotiate(accept)
+        body, headers = encode(result, media_type, accept_encoding)
+    except NotAcceptable as e:
+        raise HTTPException(status_code=406, detail=str(e))
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+@router.get("/kpi/snapshots")
+def kpi_snapshots(
+    accept: Optional[str] = Header(default=None),
+    accept_encoding: Optional[str] = Header(default=None),
+):
+    snap = _latest_snapshot()
+    return _negotiated({**snap, "scheduler": scheduler_status()}, accept, accept_encoding)
+
+
+@router.get("/kpi/snapshots/{name}")
+def kpi_snapshot(
+    name: str,
+    accept: Optional[str] = Header(default=None),
+    accept_encoding: Optional[str] = Header(default=None),
+):
+    snap = _latest_snapshot()
+    result = snap["periods"].get(name)
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"Unknown snapshot '{name}'; expected one of {', '.join(snap['periods'])}")
+    meta = {**result["meta"], "generatedAt": snap["meta"]["generatedAt"], "snapshot": name}
+    return _negotiated({**result, "meta": meta}, accept, accept_encoding)
+
+
+@router.post("/kpi/snapshots/refresh", status_code=202)
+def kpi_snapshots_refresh():
+    try:
+        started = trigger_refresh()
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    logger.info("API kpi_snapshots_refresh ok: started=%s", started)
+    return {"started": started, "scheduler": scheduler_status()}
+
+
+# -------------------- Columnar history --------------------
+
+
+@router.get("/history")
+def history_status():
+    try:
+        store = _history_store(True)
+        return store.status()
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception:
+        raise HTTPException(status_code=500, detail="Failed to read history")
+
+
+def _history_ingest(req: HistoryIngestRequest):
+    try:
+        store = _history_store(True)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    try:
+        since = datetime.fromisoformat(req.since) if req.since else None
+        until = datetime.fromisoformat(req.until) + timedelta(days=1) if req.until else None
+        stats = store.ingest(req.tests, months=req.months, since=since, until=until)
+        logger.info(
+            "API history_ingest ok: tests=%s written=%s unchanged=%s partial=%s skipped_rows=%s",
+            len(req.tests), len(stats["written"]), len(stats["unchanged"]), len(stats["partial"]),
+            stats["skipped_rows"],
+        )
+        return stats
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception:
+        raise HTTPException(status_code=500, detail="History ingest failed")
+
+
+@router.post("/history/ingest")
+async def history_ingest(
+    req: HistoryIngestRequest,
+    x_kpi_timeout: Optional[str] = Header(default=None),
+    accept: Optional[str] = Header(default=None),
+    accept_encoding: Optional[str] = Header(default=None),
+):
+    return await _offload(_history_ingest, req, timeout=x_kpi_timeout, accept=accept, accept_encoding=accept_encoding)
+
+
+# -------------------- Alerts --------------------
+
+
+@router.post("/alerts/ingest")
+def alerts_ingest(payload: AlertIngestRequest):
+    from app.alerts.service import get_alert_engine
+
+    try:
+        engine = get_alert_engine()
+        alerts = engine.ingest(payload.tests, notify=payload.notify)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception:
+        raise HTTPException(status_code=500, detail="Alert ingest failed")
+    logger.info("API alerts_ingest ok: tests=%s alerts=%s", len(payload.tests), len(alerts))
+    return {"alerts": alerts, "as_of": engine.status()["as_of"]}
+
+
+@router.post("/alerts/tick")
+def alerts_tick():
+    from app.alerts.service import get_alert_engine
+
+    try:
+        alerts = get_alert_engine().tick()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception:
+        raise HTTPException(status_code=500, detail="Alert evaluation failed")
+    logger.info("API alerts_tick ok: alerts=%s", len(alerts))
+    return {"alerts": alerts}
+
+
+@router.get("/alerts")
+def alerts_get():
+    from app.alerts.service import alerts_status
+
+    try:
+        return alerts_status()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception:
+        raise HTTPException(status_code=500, detail="Alert status failed")
+
+
 # -------------------- PowerBI Integration --------------------
 
 
 @router.get("/powerbi/embed-info")
 def powerbi_embed_info():
+    # Imported on first use: msal/requests are only needed by this endpoint
+    from app.integrations.powerbi import get_embed_info
+
     try:
         info = get_embed_info()
         return info
@@ -103,6 +845,36 @@ def powerbi_embed_info():
         raise HTTPException(status_code=500, detail="PowerBI embed info failed")
 
 
+@router.post("/powerbi/push")
+def powerbi_push(req: PowerBIPushRequest):
+    # Imported on first use, like embed-info
+    from app.integrations.powerbi_push import push_kpis
+
+    try:
+        cfg = load_kpi_config()
+    except Exception:
+        raise HTTPException(status_code=500, detail="Failed to load KPI config")
+
+    try:
+        stats = push_kpis(
+            cfg,
+            req.tests,
+            req.productivity,
+            start=date.fromisoformat(req.start_date) if req.start_date else None,
+            end=date.fromisoformat(req.end_date) if req.end_date else None,
+            full=req.full,
+        )
+        logger.info(
+            "API powerbi_push ok: tests=%s pushed=%s batches=%s",
+            len(req.tests), stats["pushed"], stats["batches"],
+        )
+        return stats
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception:
+        raise HTTPException(status_code=500, detail="PowerBI push failed")
+
+
 # -------------------- Logging & Monitoring --------------------
 
 
@@ -121,3 +893,28 @@ def get_logs(limit: int = 100, level: Optional[str] = None, since: Optional[str]
         raise HTTPException(status_code=400, detail=str(e))
     except Exception:
         raise HTTPException(status_code=500, detail="Failed to fetch logs")
+
+
+@router.get("/compute")
+async def compute_status():
+    """Compute pool load: running/queued jobs, rejections, timeouts, average job time."""
+    return compute_pool.status()
+
+
+@router.get("/shared-state")
+def shared_state_status():
+    """Which shared state all workers use: file, counts, published KPI config and snapshot lease holder."""
+    state = get_shared_state()
+    if state is None:
+        return {"enabled": False}
+    try:
+        from app.core.snapshot_service import SNAPSHOT_LEASE
+
+        return {
+            "enabled": True,
+            **state.status(),
+            "kpi_config": state.get("kpi_config"),
+            "snapshot_lease": state.lease_owner(SNAPSHOT_LEASE),
+        }
+    except Exception:
+        raise HTTPException(status_code=500, detail="Failed to read shared state")
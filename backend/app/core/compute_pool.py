@@ -0,0 +1,138 @@
+"""Bounded executor for CPU-heavy request work, with admission control.
+
+KPI computations run on a dedicated thread pool (COMPUTE_WORKERS threads)
+rather than Starlette's shared one, so the event loop and the default pool stay
+free for /health, /logs, /kpi/config and integration I/O.
+
+- At most COMPUTE_WORKERS + COMPUTE_QUEUE jobs are admitted (running or
+  waiting). Beyond that run() raises ComputeRejected(429) with a Retry-After
+  estimate instead of queueing without bound.
+- Each job has a deadline: COMPUTE_TIMEOUT_SECONDS, or less when the request
+  asks for it. A job still waiting at its deadline is cancelled. A running job
+  is abandoned by the request (ComputeRejected 503) but keeps its slot until it
+  actually finishes, so admission always reflects real load.
+
+Threads share the GIL, so one worker process computes on about one core; keep
+COMPUTE_WORKERS small and scale with uvicorn workers (see shared state).
+"""
+import asyncio
+import logging
+import math
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from app.core.config import Settings
+
+logger = logging.getLogger(__name__)
+
+_EWMA_ALPHA = 0.2
+
+
+class ComputeRejected(Exception):
+    """A job was not run (429: queue full) or not finished in time (503)."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: int) -> None:
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class ComputePool:
+    def __init__(self, workers: int, queue: int, timeout_s: float) -> None:
+        self.workers = max(1, workers)
+        self.capacity = self.workers + max(0, queue)
+        self.timeout_s = timeout_s
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._admitted = 0
+        self._running = 0
+        self._avg_s = 0.0
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="kpi-compute")
+        return self._executor
+
+    def retry_after(self) -> int:
+        """Seconds until the current backlog is likely drained (at least 1)."""
+        with self._lock:
+            backlog = self._admitted
+        return max(1, math.ceil(self._avg_s * backlog / self.workers))
+
+    def _timed(self, fn: Callable[..., Any], args: tuple) -> Any:
+        with self._lock:
+            self._running += 1
+        t0 = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            elapsed = time.perf_counter() - t0
+            with self._lock:
+                self._running -= 1
+                self.completed += 1
+                self._avg_s = elapsed if self.completed == 1 else (
+                    (1 - _EWMA_ALPHA) * self._avg_s + _EWMA_ALPHA * elapsed
+                )
+
+    def _release(self, _fut: Future) -> None:
+        with self._lock:
+            self._admitted -= 1
+
+    async def run(self, fn: Callable[..., Any], *args: Any, timeout: Optional[float] = None) -> Any:
+        """
+        Run fn(*args) on the pool and await its result (exceptions propagate).
+        `timeout` can only shorten COMPUTE_TIMEOUT_SECONDS.
+        """
+        with self._lock:
+            admitted = self._admitted < self.capacity
+            if admitted:
+                self._admitted += 1
+            else:
+                self.rejected += 1
+        if not admitted:
+            raise ComputeRejected(429, "Server busy: KPI computation queue is full", self.retry_after())
+        try:
+            fut = self._get_executor().submit(self._timed, fn, args)
+        except RuntimeError:
+            self._release(None)  # type: ignore[arg-type]
+            raise ComputeRejected(503, "Server is shutting down", 1)
+        fut.add_done_callback(self._release)
+        deadline = self.timeout_s if timeout is None else min(timeout, self.timeout_s)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(fut), deadline)
+        except asyncio.TimeoutError:
+            fut.cancel()
+            with self._lock:
+                self.timed_out += 1
+            raise ComputeRejected(503, f"KPI computation timed out after {deadline:g}s", self.retry_after())
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "capacity": self.capacity,
+                "timeout_s": self.timeout_s,
+                "running": self._running,
+                "queued": self._admitted - self._running,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "timed_out": self.timed_out,
+                "avg_job_ms": round(self._avg_s * 1000.0, 1),
+            }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+compute_pool = ComputePool(
+    Settings.COMPUTE_WORKERS, Settings.COMPUTE_QUEUE, Settings.COMPUTE_TIMEOUT_SECONDS
+)
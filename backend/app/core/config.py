@@ -18,6 +18,46 @@ class Settings:
 
     # --- Logging & Monitoring ---
     LOG_BUFFER_CAPACITY = int(os.getenv("LOG_BUFFER_CAPACITY", "1000"))
+    # Fraction of profiled KPI requests that also attach a cProfile summary (0..1)
+    KPI_CPROFILE_SAMPLE_RATE = float(os.getenv("KPI_CPROFILE_SAMPLE_RATE", "1.0"))
+
+    # --- Request compute pool (app.core.compute_pool) ---
+    # Threads for KPI computation, extra jobs allowed to wait (beyond that: 429), and the
+    # per-request deadline (503 when exceeded; X-KPI-Timeout can only lower it)
+    COMPUTE_WORKERS = int(os.getenv("COMPUTE_WORKERS", str(min(4, os.cpu_count() or 1))))
+    COMPUTE_QUEUE = int(os.getenv("COMPUTE_QUEUE", "16"))
+    COMPUTE_TIMEOUT_SECONDS = float(os.getenv("COMPUTE_TIMEOUT_SECONDS", "60"))
+
+    # --- Response compression: gzip encoded KPI bodies of at least this many bytes (0 disables) ---
+    GZIP_MIN_BYTES = int(os.getenv("GZIP_MIN_BYTES", "16384"))
+    GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "5"))
+
+    # --- Shared state across worker processes (SQLite WAL file; "" keeps state per process) ---
+    SHARED_STATE_PATH = os.getenv("SHARED_STATE_PATH", "")
+    SHARED_CACHE_TTL_SECONDS = float(os.getenv("SHARED_CACHE_TTL_SECONDS", "300"))
+    SHARED_CACHE_MAX_ENTRIES = int(os.getenv("SHARED_CACHE_MAX_ENTRIES", "256"))
+
+    # --- Background KPI snapshots ---
+    # Source of records for precomputed snapshots ("" disables the scheduler; "file" or "lis")
+    SNAPSHOT_SOURCE = os.getenv("SNAPSHOT_SOURCE", "").strip().lower()
+    SNAPSHOT_INTERVAL_SECONDS = float(os.getenv("SNAPSHOT_INTERVAL_SECONDS", "900"))
+    SNAPSHOT_JITTER_SECONDS = float(os.getenv("SNAPSHOT_JITTER_SECONDS", "60"))
+    SNAPSHOT_LEVEL = os.getenv("SNAPSHOT_LEVEL", "row")
+    # Optional JSON file mirroring the latest snapshot (served after restarts)
+    SNAPSHOT_STORE_PATH = os.getenv("SNAPSHOT_STORE_PATH", "")
+    # file source: JSON/CSV exports
+    SNAPSHOT_TESTS_PATH = os.getenv("SNAPSHOT_TESTS_PATH", "")
+    SNAPSHOT_PRODUCTIVITY_PATH = os.getenv("SNAPSHOT_PRODUCTIVITY_PATH", "")
+
+    # --- Columnar test history (app.kpi.history; "" disables) ---
+    # Directory of month partitions (.npy columns) used for MoM/YoY comparison periods
+    HISTORY_PATH = os.getenv("HISTORY_PATH", "")
+
+    # --- Alerting ---
+    # Comma-separated alert sinks: log, file, webhook
+    ALERT_SINKS = [s.strip() for s in os.getenv("ALERT_SINKS", "log").split(",") if s.strip()]
+    ALERT_FILE_PATH = os.getenv("ALERT_FILE_PATH", "")
+    ALERT_WEBHOOK_URL = os.getenv("ALERT_WEBHOOK_URL", "")
 
     # --- PowerBI Integration ---
     # These are used by the PowerBI integration module to authenticate and fetch embed info
@@ -29,3 +69,12 @@ class Settings:
     PBI_SCOPE = os.getenv(
         "PBI_SCOPE", "https://analysis.windows.net/powerbi/api/.default"
     )
+    # Optional endpoint overrides (local stand-ins for testing)
+    PBI_API_BASE = os.getenv("PBI_API_BASE", "")
+    PBI_AUTHORITY_HOST = os.getenv("PBI_AUTHORITY_HOST", "")
+    # Push-dataset feed (app.integrations.powerbi_push); empty dataset name disables it
+    PBI_PUSH_DATASET = os.getenv("PBI_PUSH_DATASET", "")
+    # JSON watermark of pushed rows (in-memory when empty)
+    PBI_PUSH_STATE_PATH = os.getenv("PBI_PUSH_STATE_PATH", "")
+    PBI_PUSH_BATCH_ROWS = int(os.getenv("PBI_PUSH_BATCH_ROWS", "5000"))
+    PBI_PUSH_DAYS = int(os.getenv("PBI_PUSH_DAYS", "800"))
@@ -0,0 +1,18 @@
+from datetime import datetime, timezone
+from typing import Dict
+
+from app.core.config import Settings
+
+
+def health_payload() -> Dict[str, str]:
+    """Health response body.
+
+    Kept free of FastAPI/integration imports so the serverless entrypoint can
+    answer health probes before the full app is loaded.
+    """
+    return {
+        "status": "ok",
+        "service": Settings.PROJECT_NAME,
+        "version": Settings.APP_VERSION,
+        "time": datetime.now(timezone.utc).isoformat(),
+    }
@@ -1,9 +1,18 @@
+"""Recent log records for GET /logs.
+
+Records are kept in an in-process ring buffer. When SHARED_STATE_PATH is set
+they are also queued for the shared SQLite ring (app.core.shared_state), which a
+background thread fills in batches; /logs then reads the shared ring so every
+worker returns the same records.
+"""
 import logging
+import threading
+import time
 from collections import deque
 from dataclasses import asdict, dataclass
-from datetime import datetime
+from datetime import datetime, timezone
 from threading import RLock
-from typing import Deque, Dict, List, Optional
+from typing import Any, Deque, Dict, List, Optional
 
 
 @dataclass
@@ -23,6 +32,12 @@ _buffer: Deque[LogRecordItem] = deque(maxlen=1000)
 _lock = RLock()
 _handler_attached = False
 
+# Shared ring: pending records and the thread that writes them
+_SHARED_FLUSH_INTERVAL_S = 0.25
+_pending: Optional[List[Dict[str, Any]]] = None
+_flush_lock = threading.Lock()
+_flusher: Optional[threading.Thread] = None
+
 
 class RingBufferHandler(logging.Handler):
     def emit(self, record: logging.LogRecord) -> None:  # pragma: no cover - basic container logic
@@ -40,6 +55,8 @@ class RingBufferHandler(logging.Handler):
             )
             with _lock:
                 _buffer.append(item)
+                if _pending is not None:
+                    _pending.append({"created": record.created, "level": item.level, "item": asdict(item)})
         except Exception:
             # Never raise from logging
             pass
@@ -58,6 +75,47 @@ def init_logging_buffer(capacity: int = 1000) -> None:
         if not _handler_attached:
             logging.getLogger().addHandler(RingBufferHandler())
             _handler_attached = True
+    _start_shared_logs()
+
+
+def _shared():
+    from app.core.shared_state import get_shared_state
+
+    return get_shared_state()
+
+
+def _start_shared_logs() -> None:
+    global _pending, _flusher
+    if _shared() is None or _flusher is not None:
+        return
+    with _lock:
+        _pending = []
+    _flusher = threading.Thread(target=_flush_loop, name="log-store-flush", daemon=True)
+    _flusher.start()
+
+
+def flush_shared_logs() -> None:
+    """Write queued records to the shared ring (no-op without shared state)."""
+    global _pending
+    with _flush_lock:
+        with _lock:
+            if not _pending:
+                return
+            batch, _pending = _pending, []
+        state = _shared()
+        if state is None:
+            return
+        try:
+            state.append_logs(batch)
+        except Exception:
+            # Never raise from logging; the in-process buffer still has the records
+            pass
+
+
+def _flush_loop() -> None:
+    while True:
+        time.sleep(_SHARED_FLUSH_INTERVAL_S)
+        flush_shared_logs()
 
 
 def _parse_since(since: Optional[str]) -> Optional[datetime]:
@@ -78,6 +136,16 @@ def get_recent_logs(limit: int = 100, level: Optional[str] = None, since: Option
     level_norm = level.upper() if level else None
     ts_since = _parse_since(since)
 
+    if _pending is not None:
+        state = _shared()
+        if state is not None:
+            flush_shared_logs()
+            since_epoch = None
+            if ts_since is not None:
+                aware = ts_since if ts_since.tzinfo else ts_since.replace(tzinfo=timezone.utc)
+                since_epoch = aware.timestamp()
+            return state.recent_logs(limit, level_norm, since_epoch)
+
     with _lock:
         items = list(_buffer)
 
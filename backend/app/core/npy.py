@@ -0,0 +1,84 @@
+"""Minimal NumPy .npy reader/writer for 1-D arrays (stdlib only).
+
+write_npy stores an array.array as a version 1.0 .npy file (little-endian,
+header padded to 64 bytes), so numpy.load(path, mmap_mode="r") reads it too.
+map_npy memory-maps a file read-only and returns a memoryview cast to the
+array's typecode: nothing is copied or parsed, and only the pages that are
+actually indexed are read from disk. On big-endian hosts map_npy falls back to
+a byte-swapped copy.
+"""
+import ast
+import mmap
+import os
+import sys
+from array import array
+from pathlib import Path
+from typing import Tuple, Union
+
+MAGIC = b"\x93NUMPY"
+_ALIGN = 64
+_LITTLE = sys.byteorder == "little"
+
+# array typecode -> numpy dtype descr
+DESCR = {"q": "<i8", "i": "<i4", "H": "<u2", "B": "|u1", "d": "<f8"}
+_TYPECODE = {v: k for k, v in DESCR.items()}
+
+
+def _header(descr: str, n: int) -> bytes:
+    text = "{'descr': '%s', 'fortran_order': False, 'shape': (%d,), }" % (descr, n)
+    pad = -(len(MAGIC) + 4 + len(text) + 1) % _ALIGN
+    text = text + " " * pad + "\n"
+    return MAGIC + b"\x01\x00" + len(text).to_bytes(2, "little") + text.encode("latin1")
+
+
+def write_npy(path: Union[str, Path], values: array) -> None:
+    """Write `values` (typecode q/i/H/B/d) to `path`."""
+    descr = DESCR.get(values.typecode)
+    if descr is None:
+        raise ValueError(f"unsupported array typecode: {values.typecode}")
+    if not _LITTLE and values.itemsize > 1:
+        values = array(values.typecode, values)
+        values.byteswap()
+    with open(path, "wb") as f:
+        f.write(_header(descr, len(values)))
+        f.write(values.tobytes())
+
+
+def _read_header(buf: Union[bytes, mmap.mmap]) -> Tuple[str, int, int]:
+    """(typecode, length, data offset) from a .npy header."""
+    if buf[:6] != MAGIC:
+        raise ValueError("not a .npy file")
+    major = buf[6]
+    if major == 1:
+        hlen, start = int.from_bytes(buf[8:10], "little"), 10
+    elif major in (2, 3):
+        hlen, start = int.from_bytes(buf[8:12], "little"), 12
+    else:
+        raise ValueError(f"unsupported .npy version {major}")
+    meta = ast.literal_eval(bytes(buf[start:start + hlen]).decode("latin1"))
+    typecode = _TYPECODE.get(meta.get("descr"))
+    shape = meta.get("shape")
+    if typecode is None or meta.get("fortran_order") or not isinstance(shape, tuple) or len(shape) != 1:
+        raise ValueError(f"unsupported .npy array: {meta}")
+    return typecode, shape[0], start + hlen
+
+
+def map_npy(path: Union[str, Path]) -> memoryview:
+    """Read-only, zero-copy view of a 1-D .npy file."""
+    size = os.path.getsize(path)
+    with open(path, "rb") as f:
+        if size == 0:
+            raise ValueError(f"empty .npy file: {path}")
+        # The mapping stays valid after the file is closed (and after it is replaced)
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    typecode, n, offset = _read_header(mm)
+    itemsize = array(typecode).itemsize
+    if offset + n * itemsize > size:
+        raise ValueError(f"truncated .npy file: {path}")
+    if n == 0:
+        return memoryview(array(typecode))
+    if not _LITTLE and itemsize > 1:
+        copy = array(typecode, bytes(mm[offset:offset + n * itemsize]))
+        copy.byteswap()
+        return memoryview(copy)
+    return memoryview(mm)[offset:offset + n * itemsize].cast(typecode)
@@ -0,0 +1,123 @@
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _iso(ts: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat() if ts else None
+
+
+class PeriodicJob:
+    """
+    Run `fn` on a daemon thread every `interval_s` seconds, +/- `jitter_s`.
+
+    - The first run happens after a random delay in [0, jitter_s] so several
+      workers started together do not hit upstream services at the same moment.
+    - Runs never overlap: a scheduled or manual run that finds the previous one
+      still in progress is skipped (and counted in `skipped`).
+    - trigger() starts a run immediately on a separate thread.
+    Exceptions from `fn` are logged and recorded; the schedule keeps going.
+    """
+
+    def __init__(self, name: str, fn: Callable[[], Any], interval_s: float, jitter_s: float = 0.0) -> None:
+        if interval_s <= 0:
+            raise ValueError("interval_s must be positive")
+        self.name = name
+        self.fn = fn
+        self.interval_s = float(interval_s)
+        self.jitter_s = max(0.0, min(float(jitter_s), self.interval_s / 2))
+        self._run_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+        self.last_started: Optional[float] = None
+        self.last_finished: Optional[float] = None
+        self.last_duration_ms: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.next_run_at: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        return self._run_lock.locked()
+
+    def _next_delay(self) -> float:
+        return max(1.0, self.interval_s + random.uniform(-self.jitter_s, self.jitter_s))
+
+    def run_once(self) -> bool:
+        """Run now on the calling thread; returns False if a run is already in progress."""
+        if not self._run_lock.acquire(blocking=False):
+            self.skipped += 1
+            logger.info("Job %s skipped: previous run still in progress", self.name)
+            return False
+        try:
+            self.last_started = time.time()
+            t0 = time.perf_counter()
+            try:
+                self.fn()
+                self.last_error = None
+            except Exception as e:
+                self.failures += 1
+                self.last_error = type(e).__name__
+                logger.exception("Job %s failed", self.name)
+            self.last_duration_ms = (time.perf_counter() - t0) * 1000.0
+            self.last_finished = time.time()
+            self.runs += 1
+            return True
+        finally:
+            self._run_lock.release()
+
+    def trigger(self) -> bool:
+        """Start a run in the background; returns False if one is already in progress."""
+        if self.running:
+            self.skipped += 1
+            return False
+        threading.Thread(target=self.run_once, name=f"{self.name}-manual", daemon=True).start()
+        return True
+
+    def _loop(self) -> None:
+        delay = random.uniform(0, self.jitter_s)
+        while True:
+            self.next_run_at = time.time() + delay
+            if self._stop.wait(delay):
+                return
+            self.run_once()
+            delay = self._next_delay()
+
+    def start(self) -> "PeriodicJob":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+            self._thread.start()
+            logger.info("Job %s started: interval=%ss jitter=%ss", self.name, self.interval_s, self.jitter_s)
+        return self
+
+    def stop(self, timeout: Optional[float] = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self.next_run_at = None
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "scheduled": self._thread is not None and self._thread.is_alive(),
+            "running": self.running,
+            "interval_s": self.interval_s,
+            "jitter_s": self.jitter_s,
+            "runs": self.runs,
+            "failures": self.failures,
+            "skipped": self.skipped,
+            "last_started": _iso(self.last_started),
+            "last_finished": _iso(self.last_finished),
+            "last_duration_ms": self.last_duration_ms,
+            "last_error": self.last_error,
+            "next_run_at": _iso(self.next_run_at),
+        }
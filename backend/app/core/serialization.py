@@ -0,0 +1,140 @@
+"""Response encodings for KPI results, chosen from the Accept header.
+
+- application/json (default): the usual result dicts
+- application/vnd.kpi.columnar+json: the same result with every list of
+  objects turned into an object of arrays ({"date": [...], "volume": [...]}),
+  so repeated keys are written once per field instead of once per row
+- application/x-msgpack: the columnar shape as MessagePack (needs the optional
+  `msgpack` package, imported on first use)
+
+negotiate() picks the first acceptable type by q-value, skipping msgpack when
+it is not installed; when nothing is acceptable it raises NotAcceptable (406).
+encode() returns the body plus Server-Timing (serialize;dur=<ms>) and
+X-KPI-Body-Bytes (uncompressed size) headers. When the client's
+Accept-Encoding allows gzip, bodies of at least GZIP_MIN_BYTES are compressed
+here (Content-Encoding: gzip). There is no app-wide gzip middleware: it would
+also buffer and re-deflate streamed exports (/kpi/export CSV/XLSX).
+"""
+import gzip
+import json
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import Settings
+
+MEDIA_JSON = "application/json"
+MEDIA_COLUMNAR = "application/vnd.kpi.columnar+json"
+MEDIA_MSGPACK = "application/x-msgpack"
+MEDIA_TYPES = (MEDIA_JSON, MEDIA_COLUMNAR, MEDIA_MSGPACK)
+
+
+class NotAcceptable(ValueError):
+    pass
+
+
+def _has_msgpack() -> bool:
+    try:
+        import msgpack  # type: ignore  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _accepted(accept: str) -> List[Tuple[str, float]]:
+    """Media ranges from an Accept header, highest q first (stable for ties)."""
+    out: List[Tuple[str, float]] = []
+    for part in accept.split(","):
+        fields = [f.strip() for f in part.split(";")]
+        media = fields[0].lower()
+        if not media:
+            continue
+        q = 1.0
+        for f in fields[1:]:
+            if f.startswith("q="):
+                try:
+                    q = float(f[2:])
+                except ValueError:
+                    q = 0.0
+        if q > 0:
+            out.append((media, q))
+    return sorted(out, key=lambda m: -m[1])
+
+
+def negotiate(accept: Optional[str]) -> str:
+    """Media type to respond with for `accept` (JSON when absent or */*)."""
+    if not accept:
+        return MEDIA_JSON
+    for media, _ in _accepted(accept):
+        if media in ("*/*", "application/*", MEDIA_JSON):
+            return MEDIA_JSON
+        if media == MEDIA_COLUMNAR:
+            return MEDIA_COLUMNAR
+        if media == MEDIA_MSGPACK and _has_msgpack():
+            return MEDIA_MSGPACK
+    hint = " (msgpack is not installed)" if MEDIA_MSGPACK in accept.lower() else ""
+    raise NotAcceptable(f"Supported response types: {', '.join(MEDIA_TYPES)}{hint}")
+
+
+def accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """True when an Accept-Encoding header allows gzip (q > 0)."""
+    if not accept_encoding:
+        return False
+    return any(coding in ("gzip", "*") for coding, _ in _accepted(accept_encoding))
+
+
+def to_columnar(obj: Any) -> Any:
+    """
+    Recursively turn lists of objects into objects of arrays (missing keys
+    become null): [{"d": 1, "w": {"7": 2}}, {"d": 2, "w": {"7": 3}}] ->
+    {"d": [1, 2], "w": {"7": [2, 3]}}.
+    """
+    if isinstance(obj, dict):
+        return {k: to_columnar(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        if obj and all(isinstance(x, dict) for x in obj):
+            keys: Dict[str, None] = {}
+            for row in obj:
+                for k in row:
+                    keys.setdefault(k, None)
+            # Columns are converted as lists, so nested objects become arrays too
+            return {k: to_columnar([row.get(k) for row in obj]) for k in keys}
+        return [to_columnar(x) for x in obj]
+    return obj
+
+
+def _default(obj: Any) -> Any:
+    iso = getattr(obj, "isoformat", None)
+    return iso() if iso is not None else str(obj)
+
+
+def encode(obj: Any, media_type: str, accept_encoding: Optional[str] = None) -> Tuple[bytes, Dict[str, str]]:
+    """(body, headers) for `obj` in `media_type`, gzipped when large and `accept_encoding` allows it."""
+    t0 = time.perf_counter()
+    if media_type == MEDIA_JSON:
+        # Same options as FastAPI's JSONResponse; dates as ISO strings like jsonable_encoder
+        body = json.dumps(
+            obj, ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_default
+        ).encode("utf-8")
+    elif media_type == MEDIA_COLUMNAR:
+        body = json.dumps(
+            to_columnar(obj), ensure_ascii=False, allow_nan=False, separators=(",", ":"), default=_default
+        ).encode("utf-8")
+    elif media_type == MEDIA_MSGPACK:
+        import msgpack  # type: ignore
+
+        body = msgpack.packb(to_columnar(obj), use_bin_type=True, default=_default)
+    else:
+        raise NotAcceptable(f"Unsupported response type: {media_type}")
+    ms = (time.perf_counter() - t0) * 1000.0
+    headers = {
+        "Server-Timing": f"serialize;dur={ms:.2f}",
+        "X-KPI-Body-Bytes": str(len(body)),
+        "Vary": "Accept, Accept-Encoding",
+    }
+    if 0 < Settings.GZIP_MIN_BYTES <= len(body) and accepts_gzip(accept_encoding):
+        t0 = time.perf_counter()
+        body = gzip.compress(body, compresslevel=Settings.GZIP_LEVEL, mtime=0)
+        ms = (time.perf_counter() - t0) * 1000.0
+        headers["Server-Timing"] += f", gzip;dur={ms:.2f}"
+        headers["Content-Encoding"] = "gzip"
+    return body, headers
@@ -0,0 +1,262 @@
+"""State shared by all worker processes through one local SQLite file (WAL mode).
+
+With `uvicorn --workers N` every worker is a separate process, so per-process
+globals (log ring buffer, result caches, snapshots) diverge. SharedState keeps
+them in SHARED_STATE_PATH instead:
+
+- logs: ring buffer of log records (trimmed to LOG_BUFFER_CAPACITY), written in
+  batches by a background thread so logging never waits on disk
+- kv: small JSON values (loaded KPI config version, latest snapshot)
+- cache: computed results (opaque bytes) with a TTL and an entry cap
+- leases: named, expiring locks so only one worker runs a periodic job
+
+WAL lets readers run alongside the single writer; each thread uses its own
+connection and writes are short transactions with a busy timeout. When
+SHARED_STATE_PATH is empty get_shared_state() returns None and callers keep
+their per-process behaviour. The file holds no PHI: logs, aggregates and
+config only.
+"""
+import hashlib
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.core.config import Settings
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created REAL NOT NULL,
+    level TEXT NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS logs_created ON logs (created);
+CREATE TABLE IF NOT EXISTS kv (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    created REAL NOT NULL,
+    expires REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS cache_expires ON cache (expires);
+CREATE TABLE IF NOT EXISTS leases (
+    name TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires REAL NOT NULL
+);
+"""
+
+
+def worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class SharedState:
+    def __init__(self, path: str, log_capacity: int = 1000, cache_max_entries: int = 256) -> None:
+        self.path = Path(path)
+        self.log_capacity = log_capacity
+        self.cache_max_entries = cache_max_entries
+        self._local = threading.local()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit; explicit BEGIN IMMEDIATE for multi-statement writes
+            conn = sqlite3.connect(str(self.path), timeout=5.0, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+        return conn
+
+    # ---- logs ----
+
+    def append_logs(self, items: List[Dict[str, Any]]) -> None:
+        if not items:
+            return
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                "INSERT INTO logs (created, level, payload) VALUES (?, ?, ?)",
+                [(it["created"], it["level"], json.dumps(it["item"])) for it in items],
+            )
+            conn.execute(
+                "DELETE FROM logs WHERE id <= (SELECT MAX(id) FROM logs) - ?", (self.log_capacity,)
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def recent_logs(self, limit: int, level: Optional[str] = None, since: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Newest first."""
+        sql = "SELECT payload FROM logs"
+        where: List[str] = []
+        args: List[Any] = []
+        if level:
+            where.append("level = ?")
+            args.append(level)
+        if since is not None:
+            where.append("created >= ?")
+            args.append(since)
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY id DESC LIMIT ?"
+        args.append(limit)
+        return [json.loads(r[0]) for r in self._conn().execute(sql, args)]
+
+    # ---- key/value ----
+
+    def get(self, key: str) -> Optional[Any]:
+        row = self._conn().execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def stamp(self, key: str) -> Optional[float]:
+        """Last update time of `key`; lets callers skip re-reading unchanged values."""
+        row = self._conn().execute("SELECT updated FROM kv WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: Any) -> None:
+        self._conn().execute(
+            "INSERT INTO kv (key, value, updated) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated = excluded.updated",
+            (key, json.dumps(value, default=str), time.time()),
+        )
+
+    # ---- result cache ----
+
+    def cache_get(self, key: str) -> Optional[bytes]:
+        row = self._conn().execute(
+            "SELECT value FROM cache WHERE key = ? AND expires > ?", (key, time.time())
+        ).fetchone()
+        return bytes(row[0]) if row else None
+
+    def cache_put(self, key: str, value: bytes, ttl_s: float) -> None:
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, created, expires) VALUES (?, ?, ?, ?)",
+                (key, sqlite3.Binary(value), now, now + ttl_s),
+            )
+            conn.execute("DELETE FROM cache WHERE expires <= ?", (now,))
+            conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                (self.cache_max_entries,),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    # ---- leases ----
+
+    def try_lease(self, name: str, owner: str, ttl_s: float) -> bool:
+        """Take or renew `name` for `owner` unless another owner holds an unexpired lease."""
+        now = time.time()
+        cur = self._conn().execute(
+            "INSERT INTO leases (name, owner, expires) VALUES (?, ?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, expires = excluded.expires "
+            "WHERE leases.owner = excluded.owner OR leases.expires <= ?",
+            (name, owner, now + ttl_s, now),
+        )
+        return cur.rowcount == 1
+
+    def release_lease(self, name: str, owner: str) -> None:
+        self._conn().execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, owner))
+
+    def lease_owner(self, name: str) -> Optional[str]:
+        row = self._conn().execute(
+            "SELECT owner FROM leases WHERE name = ? AND expires > ?", (name, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def status(self) -> Dict[str, Any]:
+        conn = self._conn()
+        return {
+            "path": str(self.path),
+            "logs": conn.execute("SELECT COUNT(*) FROM logs").fetchone()[0],
+            "cache_entries": conn.execute("SELECT COUNT(*) FROM cache WHERE expires > ?", (time.time(),)).fetchone()[0],
+        }
+
+
+_state: Optional[SharedState] = None
+_state_lock = threading.Lock()
+
+
+def get_shared_state() -> Optional[SharedState]:
+    """Process-wide SharedState for SHARED_STATE_PATH, or None when it is not set."""
+    global _state
+    if not Settings.SHARED_STATE_PATH:
+        return None
+    if _state is None:
+        with _state_lock:
+            if _state is None:
+                _state = SharedState(
+                    Settings.SHARED_STATE_PATH,
+                    log_capacity=Settings.LOG_BUFFER_CAPACITY,
+                    cache_max_entries=Settings.SHARED_CACHE_MAX_ENTRIES,
+                )
+    return _state
+
+
+def result_cache_key(name: str, config: Dict[str, Any], request_body: bytes) -> str:
+    """Cache key for a result: endpoint, config content, UTC day (for 'today' defaults) and raw request body."""
+    config_id = config.get("_source_sha256") or json.dumps(config, sort_keys=True, default=str)
+    h = hashlib.sha256()
+    for part in (name, config_id, datetime.utcnow().date().isoformat()):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    h.update(request_body)
+    return f"result:{name}:{h.hexdigest()}"
+
+
+def cached_result(
+    name: str,
+    config: Dict[str, Any],
+    request_body: bytes,
+    compute: Callable[[], Dict[str, Any]],
+) -> Tuple[Dict[str, Any], Optional[str]]:
+    """
+    (result, "hit" | "miss"), or (compute(), None) without shared state.
+
+    Results computed by any worker are reused by all of them for
+    SHARED_CACHE_TTL_SECONDS. A hit is returned as stored, so its
+    meta.generatedAt is when it was computed. Cache errors never fail the
+    request.
+    """
+    state = get_shared_state()
+    if state is None:
+        return compute(), None
+    key = result_cache_key(name, config, request_body)
+    try:
+        hit = state.cache_get(key)
+    except sqlite3.Error as e:
+        logger.warning("Shared result cache read failed: %s", e)
+        return compute(), None
+    if hit is not None:
+        return json.loads(hit), "hit"
+    result = compute()
+    try:
+        state.cache_put(key, json.dumps(result, separators=(",", ":")).encode("utf-8"), Settings.SHARED_CACHE_TTL_SECONDS)
+    except (sqlite3.Error, TypeError, ValueError) as e:
+        logger.warning("Shared result cache write failed: %s", e)
+    return result, "miss"
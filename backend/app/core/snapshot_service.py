@@ -0,0 +1,129 @@
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+from app.core.config import Settings
+from app.core.scheduler import PeriodicJob
+from app.core.shared_state import get_shared_state, worker_id
+from app.kpi import load_kpi_config
+from app.kpi.snapshots import SnapshotStore, build_snapshot
+
+logger = logging.getLogger(__name__)
+
+snapshot_store = SnapshotStore(Settings.SNAPSHOT_STORE_PATH or None)
+_job: Optional[PeriodicJob] = None
+_source: Any = None
+_force_next = threading.Event()
+
+# With shared state, only the worker holding this lease refreshes on schedule;
+# the others serve the snapshot it publishes (SnapshotStore reads it back).
+SNAPSHOT_LEASE = "kpi-snapshots"
+
+
+def _holds_lease() -> bool:
+    state = get_shared_state()
+    if state is None:
+        return True
+    ttl = 1.5 * Settings.SNAPSHOT_INTERVAL_SECONDS + Settings.SNAPSHOT_JITTER_SECONDS
+    return state.try_lease(SNAPSHOT_LEASE, worker_id(), ttl)
+
+
+def refresh_snapshots() -> Optional[Dict[str, Any]]:
+    """
+    Pull source data, compute every snapshot period and publish it to the store.
+
+    Scheduled runs on a worker that does not hold the snapshot lease return
+    None without fetching; trigger_refresh() always runs.
+    """
+    from app.integrations.sources import create_source
+
+    forced = _force_next.is_set()
+    _force_next.clear()
+    if not _holds_lease() and not forced:
+        logger.debug("Snapshot refresh skipped: lease held by %s", get_shared_state().lease_owner(SNAPSHOT_LEASE))
+        return None
+
+    global _source
+    if _source is None:
+        _source = create_source(Settings.SNAPSHOT_SOURCE)
+        if hasattr(_source, "listeners"):
+            from app.alerts.service import ingest_new_records
+
+            _source.listeners.append(ingest_new_records)
+    cfg = load_kpi_config()
+    data = _source.fetch()
+    snapshot = build_snapshot(
+        cfg,
+        data.get("tests") or [],
+        productivity=data.get("productivity"),
+        level=Settings.SNAPSHOT_LEVEL,
+        source=_source.name,
+    )
+    snapshot_store.put(snapshot)
+    if Settings.HISTORY_PATH:
+        from datetime import datetime
+
+        from app.kpi.history import get_history_store
+
+        try:
+            now = datetime.utcnow()
+            # A fetch is complete up to now; its oldest month is usually cut by the source's lookback
+            # window, so ingest() leaves that one as stored
+            stats = get_history_store().ingest(data.get("tests") or [], before=now.strftime("%Y-%m"), until=now)
+            logger.info(
+                "History updated: written=%s unchanged=%s partial=%s",
+                len(stats["written"]), len(stats["unchanged"]), len(stats["partial"]),
+            )
+        except Exception as e:
+            logger.warning("History update after snapshot refresh failed: %s", e)
+    if Settings.PBI_PUSH_DATASET:
+        from app.integrations.powerbi_push import push_kpis
+
+        try:
+            push_kpis(cfg, data.get("tests") or [], data.get("productivity"))
+        except Exception as e:
+            logger.warning("PowerBI push after snapshot refresh failed: %s", e)
+    meta = snapshot["meta"]
+    logger.info(
+        "Snapshots refreshed: source=%s tests=%s productivity_items=%s duration_ms=%s",
+        meta["source"], meta["tests"], meta["productivity_items"], meta["duration_ms"],
+    )
+    return snapshot
+
+
+def start_snapshot_scheduler() -> Optional[PeriodicJob]:
+    """Start the background refresh job if SNAPSHOT_SOURCE is configured."""
+    global _job
+    if not Settings.SNAPSHOT_SOURCE:
+        logger.info("Snapshot scheduler disabled (SNAPSHOT_SOURCE not set)")
+        return None
+    if _job is None:
+        _job = PeriodicJob(
+            "kpi-snapshots",
+            refresh_snapshots,
+            interval_s=Settings.SNAPSHOT_INTERVAL_SECONDS,
+            jitter_s=Settings.SNAPSHOT_JITTER_SECONDS,
+        )
+    return _job.start()
+
+
+def stop_snapshot_scheduler() -> None:
+    if _job is not None:
+        _job.stop()
+    state = get_shared_state()
+    if state is not None:
+        state.release_lease(SNAPSHOT_LEASE, worker_id())
+
+
+def trigger_refresh() -> bool:
+    """Start a refresh now; False if one is already running. Raises ValueError if disabled."""
+    if _job is None:
+        raise ValueError("Snapshot scheduler is not enabled (set SNAPSHOT_SOURCE)")
+    if _job.running:
+        return _job.trigger()
+    _force_next.set()  # manual refreshes run even without the lease
+    return _job.trigger()
+
+
+def scheduler_status() -> Optional[Dict[str, Any]]:
+    return None if _job is None else _job.status()
@@ -16,6 +16,14 @@ except Exception:  # pragma: no cover
     gapi_build = None
     _HAS_DRIVE = False
 
+from app.kpi.quality import (
+    REASON_DATE_INVALID,
+    REASON_DATE_MISSING,
+    REASON_HOURS_UNPARSEABLE,
+    REASON_STAFF_ID_MISSING,
+    QualityReport,
+)
+
 logger = logging.getLogger(__name__)
 
 SCOPES = [
@@ -155,17 +163,35 @@ def read_productivity(settings: SheetsSettings, date: Optional[str] = None, staf
 
     cleaned: List[Dict[str, Any]] = []
     skipped = 0
-
-    for r in records:
-        d = _valid_date(r.get("date"))
+    # Counts only (no cell values): why rows were skipped and how well each column parsed
+    quality = QualityReport()
+    quality.rows = len(records)
+
+    for i, r in enumerate(records):
+        raw_date = r.get("date")
+        d = _valid_date(raw_date)
+        if raw_date not in (None, ""):
+            quality.column("date", d is not None)
         sid = str(r.get("staff_id")) if r.get("staff_id") not in (None, "") else None
         name = r.get("staff_name") or None
         hours = _to_float(r.get("hours_worked"))
         remote = _to_float(r.get("remote_hours"))
         in_lab = _to_float(r.get("in_lab_hours"))
         total = _to_float(r.get("total_hours"))
+        bad_hours = False
+        for col, val in (("hours_worked", hours), ("remote_hours", remote), ("in_lab_hours", in_lab), ("total_hours", total)):
+            if r.get(col) not in (None, ""):
+                quality.column(col, val is not None)
+                bad_hours = bad_hours or val is None
+        if bad_hours:
+            # Once per row, however many hour columns failed (column tallies have the detail)
+            quality.issue(REASON_HOURS_UNPARSEABLE, i)
 
         if d is None or sid is None:
+            if d is None:
+                quality.issue(REASON_DATE_INVALID if raw_date not in (None, "") else REASON_DATE_MISSING, i)
+            if sid is None:
+                quality.issue(REASON_STAFF_ID_MISSING, i)
             skipped += 1
             continue
 
@@ -193,9 +219,10 @@ def read_productivity(settings: SheetsSettings, date: Optional[str] = None, staf
         cleaned.append(item)
 
     logger.info(
-        "Sheets read: rows=%s skipped=%s spreadsheet=%s version=%s",
+        "Sheets read: rows=%s skipped=%s reasons=%s spreadsheet=%s version=%s",
         len(cleaned),
         skipped,
+        quality.reasons,
         meta.get("title") or meta.get("name"),
         meta.get("version"),
     )
@@ -204,6 +231,7 @@ def read_productivity(settings: SheetsSettings, date: Optional[str] = None, staf
         "meta": meta,
         "count": len(cleaned),
         "skipped": skipped,
+        "quality": quality.to_dict(),
         "items": cleaned,
         "loggedAt": datetime.utcnow().isoformat() + "Z",
     }
@@ -0,0 +1,392 @@
+"""Read-only connector for the LIS (MariaDB) test tables.
+
+- Connections come from a small pool; MariaDB sessions are set READ ONLY and
+  SQLite files are opened with mode=ro.
+- Rows are streamed with a server-side (unbuffered) cursor and fetched in
+  fixed-size batches, so memory stays bounded regardless of table size.
+- Incremental pulls use a (resulted_at, id) high-water mark; the id breaks ties
+  between rows resulted in the same second. Rows without resulted_at (still
+  pending) are not pulled until they are resulted.
+- Rows are mapped straight to engine test records (see DEFAULT_COLUMNS) and can
+  be fed to any sink, e.g. DailyAggregates.add_tests.
+
+MariaDB access uses PyMySQL, imported on first connect (pip install PyMySQL).
+A SQLite file with the same columns works as a local stand-in
+(loadtest.fakes.create_sqlite_lis builds one from synthetic data).
+"""
+import json
+import logging
+import os
+import queue
+import re
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Engine record field -> LIS column. Override per field with LIS_DB_COLUMNS="field=column,...";
+# map a field to an empty column to leave it out.
+DEFAULT_COLUMNS: Dict[str, str] = {
+    "id": "id",
+    "case_no": "case_no",
+    "category": "category",
+    "priority": "priority",
+    "abn_norm": "abn_norm",
+    "collected_at": "collected_at",
+    "received_at": "received_at",
+    "resulted_at": "resulted_at",
+    "analyzed_by": "analyzed_by",
+    "reviewers": "reviewers",
+    "qc_by": "qc_by",
+}
+_IDENT_RE = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)?$")
+
+
+@dataclass
+class LISSettings:
+    driver: str = "mariadb"  # mariadb | sqlite
+    host: str = "localhost"
+    port: int = 3306
+    user: str = ""
+    password: str = ""
+    database: str = ""
+    sqlite_path: str = ""
+    table: str = "lis_tests"
+    columns: Dict[str, str] = field(default_factory=lambda: dict(DEFAULT_COLUMNS))
+    pool_size: int = 4
+    batch_size: int = 5000
+    connect_timeout: int = 10
+    watermark_path: str = ""
+
+    def is_configured(self) -> bool:
+        if self.driver == "sqlite":
+            return bool(self.sqlite_path)
+        return all([self.host, self.user, self.database])
+
+
+def _parse_columns(spec: str) -> Dict[str, str]:
+    cols = dict(DEFAULT_COLUMNS)
+    for part in spec.split(","):
+        if "=" in part:
+            k, _, v = part.partition("=")
+            cols[k.strip()] = v.strip()
+    return {k: v for k, v in cols.items() if v}
+
+
+def get_config_from_env() -> LISSettings:
+    return LISSettings(
+        driver=os.getenv("LIS_DB_DRIVER", "mariadb").strip().lower(),
+        host=os.getenv("LIS_DB_HOST", "localhost"),
+        port=int(os.getenv("LIS_DB_PORT", "3306")),
+        user=os.getenv("LIS_DB_USER", ""),
+        password=os.getenv("LIS_DB_PASSWORD", ""),
+        database=os.getenv("LIS_DB_NAME", ""),
+        sqlite_path=os.getenv("LIS_DB_SQLITE_PATH", ""),
+        table=os.getenv("LIS_DB_TABLE", "lis_tests"),
+        columns=_parse_columns(os.getenv("LIS_DB_COLUMNS", "")),
+        pool_size=int(os.getenv("LIS_DB_POOL_SIZE", "4")),
+        batch_size=int(os.getenv("LIS_DB_BATCH_SIZE", "5000")),
+        watermark_path=os.getenv("LIS_DB_WATERMARK_PATH", ""),
+    )
+
+
+# -------------------- Connections --------------------
+
+def _connect(cfg: LISSettings) -> Any:
+    if cfg.driver == "sqlite":
+        import sqlite3
+
+        uri = Path(cfg.sqlite_path).resolve().as_uri() + "?mode=ro"
+        return sqlite3.connect(uri, uri=True, check_same_thread=False, timeout=cfg.connect_timeout)
+    if cfg.driver != "mariadb":
+        raise ValueError(f"Unsupported LIS_DB_DRIVER '{cfg.driver}' (expected mariadb or sqlite)")
+    try:
+        import pymysql  # type: ignore
+    except Exception:  # pragma: no cover
+        raise RuntimeError("PyMySQL is not installed. Install it to connect to the LIS database.")
+    conn = pymysql.connect(
+        host=cfg.host,
+        port=cfg.port,
+        user=cfg.user,
+        password=cfg.password,
+        database=cfg.database,
+        connect_timeout=cfg.connect_timeout,
+        charset="utf8mb4",
+        autocommit=True,
+    )
+    with conn.cursor() as cur:
+        cur.execute("SET SESSION TRANSACTION READ ONLY")
+    return conn
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pool; connections are created lazily and dropped after errors."""
+
+    def __init__(self, cfg: LISSettings, connect: Callable[[LISSettings], Any] = _connect) -> None:
+        self.cfg = cfg
+        self._connect = connect
+        self._idle: "queue.LifoQueue[Any]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max(1, cfg.pool_size))
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = 30.0) -> Iterator[Any]:
+        if not self._slots.acquire(timeout=timeout):
+            raise RuntimeError("Timed out waiting for a LIS database connection")
+        conn = None
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect(self.cfg)
+            yield conn
+        except Exception:
+            if conn is not None:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+                conn = None
+            raise
+        finally:
+            if conn is not None:
+                self._idle.put(conn)
+            self._slots.release()
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+            except Exception:
+                continue
+
+
+# -------------------- Watermark --------------------
+
+@dataclass
+class Watermark:
+    resulted_at: Optional[str] = None
+    id: Any = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"resulted_at": self.resulted_at, "id": self.id}
+
+
+class WatermarkStore:
+    """High-water mark persisted as JSON (atomic replace); in-memory when path is empty."""
+
+    def __init__(self, path: str = "") -> None:
+        self.path = Path(path) if path else None
+        self._mem = Watermark()
+
+    def load(self) -> Watermark:
+        if self.path is None or not self.path.exists():
+            return self._mem
+        data = json.loads(self.path.read_text(encoding="utf-8"))
+        return Watermark(resulted_at=data.get("resulted_at"), id=data.get("id"))
+
+    def save(self, wm: Watermark) -> None:
+        self._mem = wm
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        payload = {**wm.to_dict(), "updatedAt": datetime.utcnow().isoformat() + "Z"}
+        tmp.write_text(json.dumps(payload), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+# -------------------- Queries & mapping --------------------
+
+def _sql_value(v: Any) -> Any:
+    """Watermark value as stored: DB strings verbatim, datetimes as 'YYYY-MM-DD HH:MM:SS[.ffffff]'."""
+    if isinstance(v, datetime):
+        return v.isoformat(sep=" ")
+    if isinstance(v, date):
+        return v.isoformat()
+    return v
+
+
+def _record_value(v: Any) -> Any:
+    if isinstance(v, (datetime, date)):
+        return v.isoformat()
+    if isinstance(v, bytes):
+        return v.decode("utf-8", "replace")
+    return v
+
+
+class LISConnector:
+    def __init__(self, cfg: LISSettings, pool: Optional[ConnectionPool] = None) -> None:
+        for name in [cfg.table, *cfg.columns.values()]:
+            if not _IDENT_RE.match(name):
+                raise ValueError(f"Invalid LIS identifier: {name!r}")
+        for required in ("id", "resulted_at"):
+            if required not in cfg.columns:
+                raise ValueError(f"LIS column mapping must include '{required}'")
+        if cfg.batch_size < 1:
+            raise ValueError("batch_size must be positive")
+        self.cfg = cfg
+        self.pool = pool or ConnectionPool(cfg)
+        self.fields: List[str] = list(cfg.columns)
+        self._ph = "?" if cfg.driver == "sqlite" else "%s"
+
+    def _query(self, wm: Watermark, until: Optional[str]) -> Tuple[str, List[Any]]:
+        c = self.cfg.columns
+        res, key = c["resulted_at"], c["id"]
+        select = ", ".join(c[f] for f in self.fields)
+        where = [f"{res} IS NOT NULL"]
+        params: List[Any] = []
+        if wm.resulted_at is not None and wm.id is None:
+            # A restart point (time only): include rows at that second, callers upsert by id
+            where.append(f"{res} >= {self._ph}")
+            params.append(wm.resulted_at)
+        elif wm.resulted_at is not None:
+            where.append(f"({res} > {self._ph} OR ({res} = {self._ph} AND {key} > {self._ph}))")
+            params += [wm.resulted_at, wm.resulted_at, wm.id]
+        if until is not None:
+            where.append(f"{res} <= {self._ph}")
+            params.append(until)
+        sql = f"SELECT {select} FROM {self.cfg.table} WHERE {' AND '.join(where)} ORDER BY {res}, {key}"
+        return sql, params
+
+    def _cursor(self, conn: Any) -> Any:
+        if self.cfg.driver == "sqlite":
+            return conn.cursor()  # sqlite steps rows lazily; fetchmany does not materialize the result
+        import pymysql.cursors  # type: ignore
+
+        return conn.cursor(pymysql.cursors.SSCursor)
+
+    def iter_batches(
+        self,
+        since: Optional[Watermark] = None,
+        until: Optional[str] = None,
+    ) -> Iterator[Tuple[List[Dict[str, Any]], Watermark]]:
+        """
+        Stream rows resulted after `since` (and at/before `until`) in order.
+
+        Yields (records, watermark) per batch, where watermark is the position of
+        the batch's last row; records are engine test dicts with ISO timestamps.
+        """
+        sql, params = self._query(since or Watermark(), until)
+        fields = self.fields
+        i_res, i_id = fields.index("resulted_at"), fields.index("id")
+        with self.pool.connection() as conn:
+            cur = self._cursor(conn)
+            try:
+                cur.execute(sql, params)
+                while True:
+                    rows = cur.fetchmany(self.cfg.batch_size)
+                    if not rows:
+                        break
+                    last = rows[-1]
+                    wm = Watermark(resulted_at=_sql_value(last[i_res]), id=_record_value(last[i_id]))
+                    yield [{f: _record_value(v) for f, v in zip(fields, row)} for row in rows], wm
+            finally:
+                cur.close()
+
+    def pull_incremental(
+        self,
+        sink: Callable[[List[Dict[str, Any]]], Any],
+        store: Optional[WatermarkStore] = None,
+        until: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """
+        Feed every row past the stored watermark to `sink`, one batch at a time.
+
+        The watermark is saved after each batch the sink accepted, so an
+        interrupted pull resumes after the last fully consumed batch.
+        """
+        store = store or WatermarkStore(self.cfg.watermark_path)
+        start = store.load()
+        wm = start
+        rows = batches = 0
+        for records, wm in self.iter_batches(start, until):
+            sink(records)
+            store.save(wm)
+            rows += len(records)
+            batches += 1
+        logger.info("LIS pull: rows=%s batches=%s watermark=%s", rows, batches, wm.resulted_at)
+        return {"rows": rows, "batches": batches, "from": start.to_dict(), "watermark": wm.to_dict()}
+
+
+class LISSource:
+    """
+    Snapshot source (see app.integrations.sources) backed by the LIS database.
+
+    The first fetch loads `lookback_days` of resulted tests; later fetches pull
+    rows past the in-memory watermark minus `overlap_minutes` (to catch rows
+    committed late with an earlier resulted_at) and upsert them by id. Records
+    that fall out of the lookback window are pruned.
+
+    `listeners` are called as listener(new_records, initial) with the rows whose
+    ids were not seen before (e.g. to feed the alert engine incrementally);
+    `initial` is True for the backfill on the first fetch.
+
+    The records live only in this process, so the watermark does too: every
+    process start re-backfills `lookback_days`. LIS_DB_WATERMARK_PATH is not
+    used here; it is for pull_incremental callers whose sink persists rows.
+    """
+
+    name = "lis"
+
+    def __init__(self, connector: LISConnector, lookback_days: int = 800, overlap_minutes: int = 60) -> None:
+        self.connector = connector
+        self.lookback_days = lookback_days
+        self.overlap = timedelta(minutes=overlap_minutes)
+        self._records: Dict[Any, Dict[str, Any]] = {}
+        # In memory on purpose: a persisted mark would skip the backfill after a restart
+        self._store = WatermarkStore()
+        self._fetched = False
+        self.listeners: List[Callable[[List[Dict[str, Any]], bool], None]] = []
+
+    def _restart_point(self, cutoff: datetime) -> Watermark:
+        wm = self._store.load()
+        if wm.resulted_at is None:
+            return Watermark(resulted_at=cutoff.strftime("%Y-%m-%d %H:%M:%S"))
+        try:
+            last = datetime.fromisoformat(str(wm.resulted_at).replace(" ", "T"))
+        except ValueError:
+            return wm
+        return Watermark(resulted_at=max(cutoff, last - self.overlap).strftime("%Y-%m-%d %H:%M:%S"))
+
+    def fetch(self) -> Dict[str, Any]:
+        cutoff = datetime.utcnow() - timedelta(days=self.lookback_days)
+        self._store.save(self._restart_point(cutoff))
+
+        new: List[Dict[str, Any]] = []
+
+        def upsert(batch: List[Dict[str, Any]]) -> None:
+            for r in batch:
+                if r["id"] not in self._records:
+                    new.append(r)
+                self._records[r["id"]] = r
+
+        self.connector.pull_incremental(upsert, self._store)
+        initial, self._fetched = not self._fetched, True
+        for listener in self.listeners:
+            try:
+                listener(new, initial)
+            except Exception as e:
+                logger.warning("LIS source listener failed: %s", type(e).__name__)
+        cutoff_iso = cutoff.strftime("%Y-%m-%dT%H:%M:%S")
+        self._records = {
+            k: r for k, r in self._records.items()
+            if str(r.get("resulted_at") or "").replace(" ", "T") >= cutoff_iso
+        }
+        return {"tests": list(self._records.values()), "productivity": None}
+
+
+def source_from_env() -> LISSource:
+    cfg = get_config_from_env()
+    if not cfg.is_configured():
+        raise ValueError("LIS database is not configured (set LIS_DB_* variables)")
+    return LISSource(
+        LISConnector(cfg),
+        lookback_days=int(os.getenv("LIS_DB_LOOKBACK_DAYS", "800")),
+        overlap_minutes=int(os.getenv("LIS_DB_OVERLAP_MINUTES", "60")),
+    )
@@ -3,16 +3,13 @@ import logging
 from dataclasses import dataclass
 from typing import Dict, Optional
 
-import requests
-try:
-    import msal  # type: ignore
-except Exception as e:  # pragma: no cover
-    msal = None  # Allow import-time failure; runtime will error clearly
-
+# requests and msal are imported inside the functions that use them so that
+# importing this module (and the app) stays cheap on serverless cold starts.
 
 logger = logging.getLogger(__name__)
 
-PBI_API_BASE = "https://api.powerbi.com/v1.0/myorg"
+PBI_DEFAULT_API_BASE = "https://api.powerbi.com/v1.0/myorg"
+PBI_DEFAULT_AUTHORITY_HOST = "https://login.microsoftonline.com"
 PBI_DEFAULT_SCOPE = "https://analysis.windows.net/powerbi/api/.default"
 
 
@@ -24,10 +21,13 @@ class PowerBISettings:
     workspace_id: str
     report_id: str
     scope: str = PBI_DEFAULT_SCOPE
+    # Overridable so local stand-ins (e.g. the load-test harness) can replace AAD/PowerBI
+    api_base: str = PBI_DEFAULT_API_BASE
+    authority_host: str = PBI_DEFAULT_AUTHORITY_HOST
 
     @property
     def authority(self) -> str:
-        return f"https://login.microsoftonline.com/{self.tenant_id.strip()}"
+        return f"{self.authority_host.rstrip('/')}/{self.tenant_id.strip()}"
 
     def is_configured(self) -> bool:
         return all([
@@ -44,16 +44,25 @@ def get_config_from_env() -> PowerBISettings:
         workspace_id=os.getenv("PBI_WORKSPACE_ID", ""),
         report_id=os.getenv("PBI_REPORT_ID", ""),
         scope=os.getenv("PBI_SCOPE", PBI_DEFAULT_SCOPE),
+        api_base=os.getenv("PBI_API_BASE") or PBI_DEFAULT_API_BASE,
+        authority_host=os.getenv("PBI_AUTHORITY_HOST") or PBI_DEFAULT_AUTHORITY_HOST,
     )
 
 
 def _access_token(cfg: PowerBISettings) -> str:
-    if msal is None:  # pragma: no cover
+    try:
+        import msal  # type: ignore
+    except Exception:  # pragma: no cover
         raise RuntimeError("msal is not installed. Please add 'msal' to requirements and install it.")
+    extra = {}
+    if cfg.authority_host.rstrip("/") != PBI_DEFAULT_AUTHORITY_HOST:
+        # Custom hosts are not known to AAD instance discovery
+        extra = {"validate_authority": False, "instance_discovery": False}
     app = msal.ConfidentialClientApplication(
         client_id=cfg.client_id,
         authority=cfg.authority,
         client_credential=cfg.client_secret,
+        **extra,
     )
     result = app.acquire_token_for_client(scopes=[cfg.scope])
     if not result or "access_token" not in result:
@@ -70,7 +79,9 @@ def _headers(token: str) -> Dict[str, str]:
 
 
 def _get_report_details(cfg: PowerBISettings, token: str) -> Dict[str, str]:
-    url = f"{PBI_API_BASE}/groups/{cfg.workspace_id}/reports/{cfg.report_id}"
+    import requests
+
+    url = f"{cfg.api_base}/groups/{cfg.workspace_id}/reports/{cfg.report_id}"
     resp = requests.get(url, headers=_headers(token), timeout=20)
     if resp.status_code >= 300:
         raise RuntimeError(f"PowerBI report fetch failed: {resp.status_code} {resp.text}")
@@ -83,8 +94,10 @@ def _get_report_details(cfg: PowerBISettings, token: str) -> Dict[str, str]:
 
 
 def _generate_embed_token(cfg: PowerBISettings, token: str) -> Dict[str, str]:
+    import requests
+
     # Generate a report-scoped embed token (View)
-    url = f"{PBI_API_BASE}/groups/{cfg.workspace_id}/reports/{cfg.report_id}/GenerateToken"
+    url = f"{cfg.api_base}/groups/{cfg.workspace_id}/reports/{cfg.report_id}/GenerateToken"
     payload = {"accessLevel": "View"}
     resp = requests.post(url, headers=_headers(token), json=payload, timeout=20)
     if resp.status_code >= 300:
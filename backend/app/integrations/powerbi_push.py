@@ -0,0 +1,356 @@
+"""Incremental feed of aggregated KPI rows into a PowerBI push dataset.
+
+Rows are per-day aggregates (volume, CYTO volume, TAT sums, productivity
+hours) -- no record-level fields, so no PHI leaves the backend.
+
+PushFeed.push(rows):
+- diffs each row (keyed by `date`) against a local watermark of content hashes
+  and sends only new or changed rows. Push datasets are append-only, so a
+  changed day is appended again with `revision` + 1; reports should keep the
+  highest revision per date. full=True (or a schema/dataset change) clears the
+  table and pushes everything at revision 1
+- sends rows in batches capped by row count (PowerBI allows 10,000 per POST)
+  and JSON size, paced to stay under the per-dataset request rate
+- retries 429 / 5xx responses with backoff, honouring Retry-After
+- saves the watermark (atomic replace) after every accepted batch, so an
+  interrupted push resumes without re-sending what already landed
+
+The dataset is found by name in the workspace and created (defaultMode Push)
+when missing. Auth reuses the client-credentials flow in app.integrations.powerbi.
+loadtest.fakes.FakePowerBIServer implements the dataset endpoints used here.
+"""
+import hashlib
+import json
+import logging
+import os
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .powerbi import PowerBISettings, _access_token, _headers, get_config_from_env
+
+logger = logging.getLogger(__name__)
+
+KPI_DAILY_TABLE = "KPIDaily"
+KPI_DAILY_COLUMNS: List[Tuple[str, str]] = [
+    ("date", "DateTime"),
+    ("volume", "Int64"),
+    ("cyto_volume", "Int64"),
+    ("tat_count", "Int64"),
+    ("tat_sum_hours", "Double"),
+    ("avg_tat_hours", "Double"),
+    ("productivity_hours", "Double"),
+    ("config_version", "String"),
+    ("revision", "Int64"),
+    ("pushed_at", "DateTime"),
+]
+# Added by the feed, not part of a row's content hash
+_FEED_COLUMNS = ("revision", "pushed_at")
+
+MAX_ROWS_PER_REQUEST = 10000
+DEFAULT_BATCH_BYTES = 1_000_000
+DEFAULT_MIN_INTERVAL_S = 0.5  # 120 POST rows requests per minute per dataset
+
+
+def kpi_daily_rows(
+    config: Dict[str, Any],
+    tests: Iterable[Dict[str, Any]],
+    productivity: Optional[List[Dict[str, Any]]],
+    start: date,
+    end: date,
+) -> List[Dict[str, Any]]:
+    """One aggregate row per day in [start, end] (row-level volumes, as /kpi/rolling)."""
+    from app.kpi import DailyAggregates, ProductivityIndex, get_classifier
+
+    agg = DailyAggregates.from_tests(tests, start, end, classifier=get_classifier(config))
+    hours = dict(ProductivityIndex(productivity).hours_by_day(start, end)) if productivity else {}
+    version = config.get("metadata", {}).get("version")
+    rows = []
+    for i, day in enumerate(agg.days()):
+        tat_count = agg.tat_count[i]
+        rows.append({
+            "date": day.isoformat() + "T00:00:00Z",
+            "volume": agg.volume[i],
+            "cyto_volume": agg.cyto[i],
+            "tat_count": tat_count,
+            "tat_sum_hours": round(agg.tat_sum[i], 4),
+            "avg_tat_hours": round(agg.tat_sum[i] / tat_count, 4) if tat_count else None,
+            "productivity_hours": hours.get(day) if productivity else None,
+            "config_version": str(version) if version is not None else None,
+        })
+    return rows
+
+
+def _row_hash(row: Dict[str, Any]) -> str:
+    content = {k: v for k, v in row.items() if k not in _FEED_COLUMNS}
+    return hashlib.sha1(json.dumps(content, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def _schema_hash(table: str, columns: List[Tuple[str, str]]) -> str:
+    return hashlib.sha1(json.dumps([table, columns]).encode("utf-8")).hexdigest()
+
+
+class PushWatermarkStore:
+    """What was last pushed: {key: [content hash, revision]} plus dataset/schema ids.
+
+    Persisted as JSON (atomic replace); in-memory when path is empty.
+    """
+
+    def __init__(self, path: str = "") -> None:
+        self.path = Path(path) if path else None
+        self._mem: Dict[str, Any] = {}
+
+    def load(self) -> Dict[str, Any]:
+        if self.path is None or not self.path.exists():
+            return dict(self._mem) or {"dataset_id": None, "schema": None, "rows": {}}
+        return json.loads(self.path.read_text(encoding="utf-8"))
+
+    def save(self, state: Dict[str, Any]) -> None:
+        state = {**state, "updatedAt": datetime.utcnow().isoformat() + "Z"}
+        self._mem = state
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps(state), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+class PowerBIPushClient:
+    """Minimal push-dataset REST client with retry/backoff on 429 and 5xx."""
+
+    def __init__(
+        self,
+        cfg: Optional[PowerBISettings] = None,
+        token_provider: Optional[Callable[[PowerBISettings], str]] = None,
+        retries: int = 5,
+        backoff_s: float = 1.0,
+        max_backoff_s: float = 60.0,
+        timeout: float = 30.0,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.cfg = cfg or get_config_from_env()
+        if not (self.cfg.tenant_id and self.cfg.client_id and self.cfg.client_secret and self.cfg.workspace_id):
+            raise ValueError("PowerBI configuration missing. Set PBI_TENANT_ID, PBI_CLIENT_ID, PBI_CLIENT_SECRET, PBI_WORKSPACE_ID.")
+        self._token_provider = token_provider or _access_token
+        self._token: Optional[str] = None
+        self.retries = retries
+        self.backoff_s = backoff_s
+        self.max_backoff_s = max_backoff_s
+        self.timeout = timeout
+        self._sleep = sleep
+        self._session = None
+        self.retried = 0
+
+    def _url(self, path: str) -> str:
+        return f"{self.cfg.api_base.rstrip('/')}/groups/{self.cfg.workspace_id}{path}"
+
+    def _request(self, method: str, path: str, body: Any = None) -> Any:
+        import requests
+
+        if self._session is None:
+            self._session = requests.Session()
+        if self._token is None:
+            self._token = self._token_provider(self.cfg)
+        for attempt in range(self.retries + 1):
+            resp = self._session.request(
+                method, self._url(path), headers=_headers(self._token), json=body, timeout=self.timeout
+            )
+            if resp.status_code == 401 and attempt == 0:
+                self._token = self._token_provider(self.cfg)  # expired token: refresh once
+                continue
+            if resp.status_code != 429 and resp.status_code < 500:
+                if resp.status_code >= 300:
+                    raise RuntimeError(f"PowerBI {method} {path.split('?')[0]} failed: {resp.status_code}")
+                return resp.json() if resp.content else None
+            if attempt == self.retries:
+                break
+            self.retried += 1
+            wait = min(self.max_backoff_s, self.backoff_s * (2 ** attempt))
+            retry_after = resp.headers.get("Retry-After")
+            if retry_after:
+                try:
+                    wait = min(self.max_backoff_s, max(wait, float(retry_after)))
+                except ValueError:
+                    pass
+            logger.warning("PowerBI %s throttled/unavailable (%s); retrying in %.1fs", method, resp.status_code, wait)
+            self._sleep(wait)
+        raise RuntimeError(f"PowerBI {method} {path.split('?')[0]} failed after {self.retries} retries: {resp.status_code}")
+
+    def find_dataset(self, name: str) -> Optional[str]:
+        data = self._request("GET", "/datasets") or {}
+        for ds in data.get("value") or []:
+            if ds.get("name") == name:
+                return ds.get("id")
+        return None
+
+    def create_dataset(self, name: str, table: str, columns: List[Tuple[str, str]]) -> str:
+        body = {
+            "name": name,
+            "defaultMode": "Push",
+            "tables": [{"name": table, "columns": [{"name": n, "dataType": t} for n, t in columns]}],
+        }
+        data = self._request("POST", "/datasets?defaultRetentionPolicy=None", body) or {}
+        if not data.get("id"):
+            raise RuntimeError("PowerBI: dataset id missing from create response")
+        return str(data["id"])
+
+    def add_rows(self, dataset_id: str, table: str, rows: List[Dict[str, Any]]) -> None:
+        self._request("POST", f"/datasets/{dataset_id}/tables/{table}/rows", {"rows": rows})
+
+    def delete_rows(self, dataset_id: str, table: str) -> None:
+        self._request("DELETE", f"/datasets/{dataset_id}/tables/{table}/rows")
+
+
+class PushFeed:
+    def __init__(
+        self,
+        client: Any,
+        store: PushWatermarkStore,
+        dataset_name: str,
+        table: str = KPI_DAILY_TABLE,
+        columns: Optional[List[Tuple[str, str]]] = None,
+        key: str = "date",
+        batch_rows: int = 5000,
+        batch_bytes: int = DEFAULT_BATCH_BYTES,
+        min_interval_s: float = DEFAULT_MIN_INTERVAL_S,
+    ) -> None:
+        if not dataset_name:
+            raise ValueError("PBI_PUSH_DATASET is required for the PowerBI push feed")
+        self.client = client
+        self.store = store
+        self.dataset_name = dataset_name
+        self.table = table
+        self.columns = columns or KPI_DAILY_COLUMNS
+        self.key = key
+        self.batch_rows = max(1, min(batch_rows, MAX_ROWS_PER_REQUEST))
+        self.batch_bytes = batch_bytes
+        self.min_interval_s = min_interval_s
+        self._last_post = 0.0
+
+    def _batches(self, rows: List[Dict[str, Any]]) -> Iterable[List[Dict[str, Any]]]:
+        batch: List[Dict[str, Any]] = []
+        size = 0
+        for row in rows:
+            n = len(json.dumps(row, default=str)) + 1
+            if batch and (len(batch) >= self.batch_rows or size + n > self.batch_bytes):
+                yield batch
+                batch, size = [], 0
+            batch.append(row)
+            size += n
+        if batch:
+            yield batch
+
+    def _pace(self) -> None:
+        wait = self._last_post + self.min_interval_s - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        self._last_post = time.monotonic()
+
+    def push(self, rows: List[Dict[str, Any]], full: bool = False) -> Dict[str, Any]:
+        """Send new/changed rows; returns counts (rows, new, changed, unchanged, pushed, batches, retries)."""
+        t0 = time.perf_counter()
+        state = self.store.load()
+        schema = _schema_hash(self.table, self.columns)
+        dataset_id = self.client.find_dataset(self.dataset_name)
+        if dataset_id is None:
+            dataset_id = self.client.create_dataset(self.dataset_name, self.table, self.columns)
+            full = True
+        if full or state.get("dataset_id") != dataset_id or state.get("schema") != schema:
+            if state.get("rows") and not full:
+                logger.info("PowerBI push: dataset or schema changed; re-pushing all rows")
+            self.client.delete_rows(dataset_id, self.table)
+            state = {"dataset_id": dataset_id, "schema": schema, "rows": {}}
+            self.store.save(state)
+            full = True
+
+        seen: Dict[str, List[Any]] = state["rows"]
+        pending: List[Tuple[str, str, Dict[str, Any]]] = []
+        new = changed = 0
+        for row in rows:
+            k = str(row[self.key])
+            h = _row_hash(row)
+            prev = seen.get(k)
+            if prev is not None and prev[0] == h:
+                continue
+            if prev is None:
+                new += 1
+            else:
+                changed += 1
+            pending.append((k, h, row))
+
+        pushed_at = datetime.utcnow().isoformat() + "Z"
+        out_rows = [
+            {**row, "revision": (seen[k][1] + 1) if k in seen else 1, "pushed_at": pushed_at}
+            for k, _, row in pending
+        ]
+        batches = 0
+        retried_before = getattr(self.client, "retried", 0)
+        offset = 0
+        for batch in self._batches(out_rows):
+            self._pace()
+            self.client.add_rows(dataset_id, self.table, batch)
+            for (k, h, _), sent in zip(pending[offset:offset + len(batch)], batch):
+                seen[k] = [h, sent["revision"]]
+            offset += len(batch)
+            batches += 1
+            self.store.save(state)
+
+        stats = {
+            "dataset_id": dataset_id,
+            "table": self.table,
+            "full": full,
+            "rows": len(rows),
+            "new": new,
+            "changed": changed,
+            "unchanged": len(rows) - new - changed,
+            "pushed": len(out_rows),
+            "batches": batches,
+            "retries": getattr(self.client, "retried", 0) - retried_before,
+            "duration_ms": round((time.perf_counter() - t0) * 1000.0, 1),
+        }
+        logger.info(
+            "PowerBI push ok: table=%s rows=%s pushed=%s new=%s changed=%s batches=%s retries=%s",
+            self.table, stats["rows"], stats["pushed"], new, changed, batches, stats["retries"],
+        )
+        return stats
+
+
+_feed: Optional[PushFeed] = None
+
+
+def get_push_feed() -> PushFeed:
+    """Feed configured from PBI_* settings (built once per process)."""
+    from app.core.config import Settings
+
+    global _feed
+    if _feed is None:
+        _feed = PushFeed(
+            PowerBIPushClient(),
+            PushWatermarkStore(Settings.PBI_PUSH_STATE_PATH),
+            Settings.PBI_PUSH_DATASET,
+            batch_rows=Settings.PBI_PUSH_BATCH_ROWS,
+        )
+    return _feed
+
+
+def push_kpis(
+    config: Dict[str, Any],
+    tests: Iterable[Dict[str, Any]],
+    productivity: Optional[List[Dict[str, Any]]] = None,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    full: bool = False,
+) -> Dict[str, Any]:
+    """Push daily KPI rows for [start, end] (default: the last PBI_PUSH_DAYS days through today)."""
+    from app.core.config import Settings
+
+    end = end or datetime.utcnow().date()
+    start = start or end - timedelta(days=Settings.PBI_PUSH_DAYS - 1)
+    if end < start:
+        raise ValueError("end_date must be on/after start_date")
+    if (end - start).days + 1 > MAX_ROWS_PER_REQUEST:
+        raise ValueError(f"push range must be at most {MAX_ROWS_PER_REQUEST} days")
+    rows = kpi_daily_rows(config, tests, productivity, start, end)
+    return get_push_feed().push(rows, full=full)
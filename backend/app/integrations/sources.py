@@ -0,0 +1,111 @@
+"""Pluggable source-data providers for background KPI snapshots.
+
+A source has a `name` and a `fetch()` returning {"tests": [...], "productivity": [...] | None}.
+Sources are created by name through a small registry so other integrations
+(e.g. a LIS database) can plug in with register_source().
+
+Built in:
+- file: tests (and optionally productivity) from local JSON or CSV exports;
+  productivity can instead come from Google Sheets when a spreadsheet is configured.
+- lis: resulted tests pulled incrementally from the LIS database (app.integrations.lis_db).
+"""
+import csv
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.core.config import Settings
+
+logger = logging.getLogger(__name__)
+
+_SOURCES: Dict[str, Callable[[], Any]] = {}
+
+
+def register_source(name: str, factory: Callable[[], Any]) -> None:
+    """Register a zero-argument factory that builds a configured source."""
+    _SOURCES[name] = factory
+
+
+def create_source(name: str) -> Any:
+    factory = _SOURCES.get(name)
+    if factory is None:
+        raise ValueError(f"Unknown snapshot source '{name}'; expected one of {', '.join(sorted(_SOURCES))}")
+    return factory()
+
+
+def _read_records(path: Path) -> List[Dict[str, Any]]:
+    """JSON (a list, or an object with `tests`/`items`) or CSV with a header row."""
+    if path.suffix.lower() == ".csv":
+        with path.open("r", encoding="utf-8-sig", newline="") as f:
+            return [dict(r) for r in csv.DictReader(f)]
+    data = json.loads(path.read_text(encoding="utf-8"))
+    if isinstance(data, dict):
+        data = data.get("tests") or data.get("items") or []
+    if not isinstance(data, list):
+        raise ValueError(f"{path.name}: expected a list of records")
+    return data
+
+
+class _CachedFile:
+    """Re-parse a file only when its mtime/size change."""
+
+    def __init__(self, path: str) -> None:
+        self.path = Path(path)
+        self._stamp: Optional[Tuple[float, int]] = None
+        self._records: List[Dict[str, Any]] = []
+
+    def read(self) -> List[Dict[str, Any]]:
+        st = self.path.stat()
+        stamp = (st.st_mtime, st.st_size)
+        if stamp != self._stamp:
+            self._records = _read_records(self.path)
+            self._stamp = stamp
+        return self._records
+
+
+class FileSource:
+    name = "file"
+
+    def __init__(self, tests_path: str, productivity_path: str = "", sheets_settings: Any = None) -> None:
+        if not tests_path:
+            raise ValueError("SNAPSHOT_TESTS_PATH is required for the file snapshot source")
+        self._tests = _CachedFile(tests_path)
+        self._productivity = _CachedFile(productivity_path) if productivity_path else None
+        self._sheets = sheets_settings
+
+    def fetch(self) -> Dict[str, Any]:
+        productivity = None
+        if self._productivity is not None:
+            productivity = self._productivity.read()
+        elif self._sheets is not None:
+            from app.integrations.google_sheets import read_productivity
+
+            productivity = read_productivity(self._sheets)["items"]
+        return {"tests": self._tests.read(), "productivity": productivity}
+
+
+def _file_source() -> FileSource:
+    sheets = None
+    spreadsheet_id = os.getenv("GOOGLE_SHEETS_SPREADSHEET_ID", "")
+    if spreadsheet_id:
+        from app.integrations.google_sheets import SheetsSettings
+
+        sheets = SheetsSettings(
+            spreadsheet_id=spreadsheet_id,
+            productivity_worksheet=os.getenv("GOOGLE_SHEETS_PRODUCTIVITY_WORKSHEET", "Productivity"),
+            sa_file=os.getenv("GOOGLE_SERVICE_ACCOUNT_FILE", ""),
+            sa_json=os.getenv("GOOGLE_SERVICE_ACCOUNT_JSON", ""),
+        )
+    return FileSource(Settings.SNAPSHOT_TESTS_PATH, Settings.SNAPSHOT_PRODUCTIVITY_PATH, sheets)
+
+
+def _lis_source() -> Any:
+    from app.integrations.lis_db import source_from_env
+
+    return source_from_env()
+
+
+register_source("file", _file_source)
+register_source("lis", _lis_source)
@@ -3,6 +3,39 @@
 Exports helpers:
 - load_kpi_config: read YAML config for KPI formulas/thresholds
 - compute_kpis: calculate KPIs from provided records (and optional productivity hours)
+- aggregate_kpis / build_kpi_result: the aggregation and threshold-evaluation halves of compute_kpis
+- KPIAggregate: threshold-independent aggregates for one period
+- TestBatch: struct-of-arrays test records accepted by compute_kpis/aggregate_kpis
+- what_if / evaluate_threshold_sets: score cached aggregates against many threshold sets
+- tests_per_fte_breakdown: tests per FTE by staff member, day or staff group
+- tests_per_fte_series: daily/weekly tests-per-FTE series for a period
+- ProductivityIndex: productivity hours indexed by day and staff_id
+- Classifier / get_classifier: category/subtype table compiled from kpi_config.yaml `classification`
+- QualityReport: ingestion data-quality counts returned as `data_quality`
+- CaseIndex: one-pass rollup of test rows to normalized, interned cases
+- DailyAggregates: per-day accumulators with O(1) date-range sums
+- rolling_kpis: trailing-window volume/TAT series with threshold statuses
+- period_to_date_kpis: MTD/QTD/YTD/fiscal-YTD and custom periods vs the same period last year
+- stage_kpis: per-stage durations, daily WIP and backlog age (triage -> analyzed -> reviewed -> QC)
+- export_rows: streamed monthly / per-tech report rows for CSV/XLSX export
+- HistoryStore: month-partitioned columnar test history (memory-mapped .npy) for MoM/YoY periods
 """
+from .classification import Classifier, get_classifier
 from .config_loader import load_kpi_config
-from .engine import compute_kpis
+from .engine import (
+    CaseIndex,
+    KPIAggregate,
+    aggregate_kpis,
+    build_kpi_result,
+    compute_kpis,
+    tests_per_fte_breakdown,
+    tests_per_fte_series,
+)
+from .daily import DailyAggregates, period_to_date_kpis, rolling_kpis
+from .batch import TestBatch
+from .export import export_rows
+from .evaluate import evaluate_threshold_sets, what_if
+from .history import HistoryStore
+from .productivity import ProductivityIndex
+from .quality import QualityReport
+from .stages import stage_kpis
@@ -0,0 +1,367 @@
+"""Struct-of-arrays representation of test records.
+
+TestBatch holds one typed array per field instead of one dict per test:
+
+- ts_us / start_us / end_us: int64 microseconds since 1970-01-01 (naive
+  local-clock values; tz-aware inputs are converted to UTC). MISSING marks
+  absent or unparseable values. ts is the period-placement timestamp
+  (resulted_at, else received/collected), start is received_at else
+  collected_at, end is resulted_at else signed_out_at -- the same fallbacks the
+  engine applies to dict records.
+- category: uint16 codes into `categories` (type, else category; stripped, upper-cased)
+- subtype: uint16 codes into `subtypes` (raw `subtype` values; code 0 = none)
+- case_id: int32 ids into `case_keys` (normalized, interned case numbers; -1 = none)
+- abn: Abn/Norm code (engine ABN_* constants); stat: 0/1
+- tat_hours: explicit tat_hours values (NaN when absent), used for case rollups
+
+compute_kpis / aggregate_kpis accept a TestBatch wherever they accept a list of
+dicts. Build one with from_records (dicts) or from_columns (a column-oriented
+JSON object, without materializing per-row dicts), or wrap existing buffers with
+from_buffers (app.kpi.history). Every column exposes the buffer protocol, so
+memoryview(batch.ts_us) etc. are zero-copy.
+"""
+import math
+import sys
+from array import array
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from .classification import OTHER, CategoryVolumes, Classifier
+from .engine import (
+    CaseIndex,
+    _abn_code,
+    _classify_test,
+    _is_stat,
+    _parse_dt,
+    normalize_case_no,
+)
+from .quality import (
+    REASON_CATEGORY_MISSING,
+    REASON_CATEGORY_UNMATCHED,
+    REASON_NO_TIMESTAMP,
+    REASON_TAT_MISSING_END,
+    REASON_TAT_MISSING_START,
+    REASON_TAT_NEGATIVE,
+    REASON_TIMESTAMP_UNPARSEABLE,
+    QualityReport,
+)
+
+MISSING = -(2 ** 63)
+_EPOCH = datetime(1970, 1, 1)
+_US = timedelta(microseconds=1)
+_NAN = float("nan")
+_MAX_CATEGORIES = 65535
+
+COLUMNS = ("ts_us", "start_us", "end_us", "category", "subtype", "case_id", "abn", "stat", "tat_hours")
+
+
+def to_epoch_us(dt: Optional[datetime]) -> int:
+    if dt is None:
+        return MISSING
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return (dt - _EPOCH) // _US
+
+
+def _parse_us(val: Any) -> Tuple[int, bool]:
+    """(epoch_us or MISSING, failed) where failed means a non-empty value did not parse."""
+    if not val:
+        return MISSING, False
+    dt = _parse_dt(val) if isinstance(val, str) else None
+    return (MISSING, True) if dt is None else (to_epoch_us(dt), False)
+
+
+def _tat_value(val: Any) -> float:
+    if val is None or val == "":
+        return _NAN
+    try:
+        return float(val)
+    except (TypeError, ValueError):
+        return _NAN
+
+
+class _ColumnRow:
+    """Mapping-style view of row i of a column dict (reused across rows; no per-row dicts)."""
+
+    __slots__ = ("cols", "i")
+
+    def __init__(self, cols: Mapping[str, Sequence[Any]]) -> None:
+        self.cols = cols
+        self.i = 0
+
+    def get(self, key: str, default: Any = None) -> Any:
+        col = self.cols.get(key)
+        return default if col is None else col[self.i]
+
+
+class TestBatch:
+    __slots__ = COLUMNS + (
+        "categories", "_category_ids", "subtypes", "_subtype_ids", "case_keys", "_case_ids", "quality",
+    )
+
+    def __init__(self) -> None:
+        self.ts_us = array("q")
+        self.start_us = array("q")
+        self.end_us = array("q")
+        self.category = array("H")
+        self.subtype = array("H")
+        self.case_id = array("i")
+        self.abn = array("B")
+        self.stat = array("B")
+        self.tat_hours = array("d")
+        self.categories: List[str] = []
+        self._category_ids: Dict[str, int] = {}
+        self.subtypes: List[str] = [""]
+        self._subtype_ids: Dict[str, int] = {"": 0}
+        self.case_keys: List[str] = []
+        self._case_ids: Dict[str, int] = {}
+        self.quality = QualityReport()  # ingestion-time reasons/columns; row indices are batch positions
+
+    # ---- building ----
+
+    @classmethod
+    def from_records(cls, records: Iterable[Mapping[str, Any]]) -> "TestBatch":
+        batch = cls()
+        for r in records:
+            batch.append(r)
+        return batch
+
+    @classmethod
+    def from_buffers(
+        cls,
+        columns: Mapping[str, Any],
+        categories: List[str],
+        subtypes: List[str],
+        case_keys: List[str],
+    ) -> "TestBatch":
+        """
+        Wrap existing column buffers (arrays or memoryviews with the COLUMNS
+        typecodes, e.g. memory-mapped .npy files) without copying them. The
+        batch is read-only; quality carries only the row count.
+        """
+        n = len(columns["ts_us"])
+        if any(len(columns[c]) != n for c in COLUMNS):
+            raise ValueError("column buffers must have equal length")
+        batch = cls()
+        for c in COLUMNS:
+            setattr(batch, c, columns[c])
+        batch.categories = list(categories)
+        batch.subtypes = list(subtypes) or [""]
+        batch.case_keys = list(case_keys)
+        batch.quality.rows = n
+        return batch
+
+    @classmethod
+    def from_columns(cls, columns: Mapping[str, Sequence[Any]]) -> "TestBatch":
+        """
+        Build from {"field": [values...]} with engine field names (category/type,
+        case_no, abn_norm, priority, stat, received_at, collected_at, resulted_at,
+        signed_out_at, tat_hours, ...). All columns must have the same length.
+        """
+        if not isinstance(columns, Mapping):
+            raise ValueError("columns must be an object of field -> list")
+        lengths = {len(v) for v in columns.values() if isinstance(v, (list, tuple))}
+        if len(lengths) > 1 or any(not isinstance(v, (list, tuple)) for v in columns.values()):
+            raise ValueError("columns must be lists of equal length")
+        n = lengths.pop() if lengths else 0
+        batch = cls()
+        row = _ColumnRow(columns)
+        for i in range(n):
+            row.i = i
+            batch.append(row)  # type: ignore[arg-type]
+        return batch
+
+    def _category_code(self, cat: str) -> int:
+        code = self._category_ids.get(cat)
+        if code is None:
+            code = len(self.categories)
+            if code > _MAX_CATEGORIES:
+                raise ValueError("too many distinct test categories")
+            self._category_ids[cat] = code
+            self.categories.append(cat)
+        return code
+
+    def _subtype_code(self, sub: Any) -> int:
+        sub = str(sub).strip() if sub else ""
+        code = self._subtype_ids.get(sub)
+        if code is None:
+            code = len(self.subtypes)
+            if code > _MAX_CATEGORIES:
+                raise ValueError("too many distinct test subtypes")
+            self._subtype_ids[sub] = code
+            self.subtypes.append(sub)
+        return code
+
+    def _case_code(self, key: str) -> int:
+        if not key:
+            return -1
+        cid = self._case_ids.get(key)
+        if cid is None:
+            cid = len(self.case_keys)
+            key = sys.intern(key)
+            self._case_ids[key] = cid
+            self.case_keys.append(key)
+        return cid
+
+    def append(self, rec: Mapping[str, Any]) -> None:
+        row = len(self.ts_us)
+        q = self.quality
+        raw_end, raw_received, raw_collected = rec.get("resulted_at"), rec.get("received_at"), rec.get("collected_at")
+        resulted, bad_end = _parse_us(raw_end)
+        received, bad_received = _parse_us(raw_received)
+        collected, bad_collected = _parse_us(raw_collected)
+        signed_out, _ = _parse_us(rec.get("signed_out_at"))
+        # Column tallies follow the dict path: collected_at counts only as the fallback start
+        if raw_end:
+            q.column("resulted_at", not bad_end)
+        if raw_received:
+            q.column("received_at", not bad_received)
+        if received == MISSING and raw_collected:
+            q.column("collected_at", not bad_collected)
+        start = received if received != MISSING else collected
+        # Same rule as the dict path: an unparseable end, or no end and a start
+        # value that does not parse, is a timestamp parse failure
+        raw_start = raw_received or raw_collected
+        if bad_end or (resulted == MISSING and raw_start and start == MISSING):
+            q.issue(REASON_TIMESTAMP_UNPARSEABLE, row)
+        elif not raw_end and not raw_start:
+            q.issue(REASON_NO_TIMESTAMP, row)
+        q.rows += 1
+        self.ts_us.append(resulted if resulted != MISSING else start)
+        self.start_us.append(start)
+        self.end_us.append(resulted if resulted != MISSING else signed_out)
+        self.category.append(self._category_code(str(rec.get("type") or rec.get("category") or "").strip().upper()))
+        self.subtype.append(self._subtype_code(rec.get("subtype")))
+        self.case_id.append(self._case_code(normalize_case_no(rec)))  # type: ignore[arg-type]
+        self.abn.append(_abn_code(rec))  # type: ignore[arg-type]
+        self.stat.append(1 if _is_stat(rec) else 0)  # type: ignore[arg-type]
+        self.tat_hours.append(_tat_value(rec.get("tat_hours")))
+
+    # ---- introspection ----
+
+    def __len__(self) -> int:
+        return len(self.ts_us)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the column arrays (dictionaries excluded)."""
+        return sum(getattr(self, c).itemsize * len(getattr(self, c)) for c in COLUMNS)
+
+    def cyto_codes(self, classifier: Optional[Classifier] = None) -> bytearray:
+        """Lookup table: category code -> 1 if the category classifies as CYTO."""
+        return bytearray(1 if _classify_test({"category": c}, classifier)[0] == "CYTO" else 0 for c in self.categories)
+
+    def _group_of(self, classifier: Classifier) -> Any:
+        """Memoized (category code, subtype code) -> (category, subtype)."""
+        cats, subs = self.categories, self.subtypes
+        memo: Dict[int, Tuple[str, Optional[str]]] = {}
+
+        def group(i: int) -> Tuple[str, Optional[str]]:
+            key = (self.category[i] << 16) | self.subtype[i]
+            hit = memo.get(key)
+            if hit is None:
+                hit = memo[key] = classifier.classify_values(cats[self.category[i]], subs[self.subtype[i]] or None)
+            return hit
+
+        return group
+
+    def tat(self, i: int) -> Optional[float]:
+        """Timestamp TAT in hours for row i (engine _tat_hours semantics)."""
+        s, e = self.start_us[i], self.end_us[i]
+        if s == MISSING or e == MISSING or e < s:
+            return None
+        return ((e - s) / 1_000_000) / 3600.0
+
+    def tat_reason(self, i: int) -> Optional[str]:
+        """Quality reason row i has no timestamp TAT (engine _tat_with_reason semantics), else None."""
+        s, e = self.start_us[i], self.end_us[i]
+        if s == MISSING:
+            return REASON_TAT_MISSING_START
+        if e == MISSING:
+            return REASON_TAT_MISSING_END
+        return REASON_TAT_NEGATIVE if e < s else None
+
+    def _category_reasons(self, classifier: Optional[Classifier]) -> List[Optional[str]]:
+        """Lookup table: category code -> category quality reason (None when the category is known)."""
+        out: List[Optional[str]] = []
+        for c in self.categories:
+            if _classify_test({"category": c}, classifier)[0] != OTHER:
+                out.append(None)
+            else:
+                out.append(REASON_CATEGORY_UNMATCHED if c else REASON_CATEGORY_MISSING)
+        return out
+
+    # ---- aggregation (used by aggregate_kpis) ----
+
+    def rows_in_range(self, start: datetime, end: datetime) -> List[int]:
+        lo, hi = to_epoch_us(start), to_epoch_us(end)
+        ts = self.ts_us
+        return [i for i in range(len(ts)) if lo <= ts[i] <= hi]
+
+    def count_in_range(self, start: datetime, end: datetime, level: str = "row") -> int:
+        rows = self.rows_in_range(start, end)
+        if level == "case":
+            cids = self.case_id
+            return len({cids[i] for i in rows if cids[i] >= 0})
+        return len(rows)
+
+    def volume_and_tat(
+        self,
+        rows: Sequence[int],
+        classifier: Optional[Classifier] = None,
+        groups: Optional[CategoryVolumes] = None,
+        quality: Optional[QualityReport] = None,
+    ) -> Tuple[int, List[float]]:
+        """(CYTO row count, timestamp TATs) over the given rows; also fills `groups` / `quality` when given."""
+        cyto = self.cyto_codes(classifier)
+        cat = self.category
+        group = self._group_of(groups.classifier) if groups is not None else None
+        cat_reasons = self._category_reasons(classifier) if quality is not None else None
+        cyto_total = 0
+        tats: List[float] = []
+        for i in rows:
+            if cyto[cat[i]]:
+                cyto_total += 1
+            t = self.tat(i)
+            if t is not None:
+                tats.append(t)
+            if group is not None:
+                groups.add(*group(i), t)  # type: ignore[union-attr]
+            if cat_reasons is not None:
+                if t is None:
+                    quality.issue(self.tat_reason(i), i)  # type: ignore[union-attr,arg-type]
+                if cat_reasons[cat[i]]:
+                    quality.issue(cat_reasons[cat[i]], i)  # type: ignore[union-attr,arg-type]
+        return cyto_total, tats
+
+    def case_index(
+        self,
+        rows: Sequence[int],
+        classifier: Optional[Classifier] = None,
+        groups: Optional[CategoryVolumes] = None,
+        quality: Optional[QualityReport] = None,
+    ) -> CaseIndex:
+        """CaseIndex over the given rows (same result as CaseIndex.from_records on the dicts)."""
+        idx = CaseIndex()
+        cyto = self.cyto_codes(classifier)
+        cat, cids, abn, stat, th = self.category, self.case_id, self.abn, self.stat, self.tat_hours
+        keys = self.case_keys
+        group = self._group_of(groups.classifier) if groups is not None else None
+        cat_reasons = self._category_reasons(classifier) if quality is not None else None
+        for i in rows:
+            cid = cids[i]
+            if group is not None:
+                groups.add(*group(i), self.tat(i), keys[cid] if cid >= 0 else None)  # type: ignore[union-attr]
+            if cat_reasons is not None:
+                why = self.tat_reason(i)
+                if why is not None:
+                    quality.issue(why, i)  # type: ignore[union-attr]
+                if cat_reasons[cat[i]]:
+                    quality.issue(cat_reasons[cat[i]], i)  # type: ignore[union-attr,arg-type]
+            if cid < 0:
+                idx.rows_without_case += 1
+                continue
+            explicit = th[i]
+            tat = explicit if (not math.isnan(explicit) and explicit > 0) else self.tat(i)
+            idx.add_row(keys[cid], bool(cyto[cat[i]]), abn[i], bool(stat[i]), tat)
+        return idx
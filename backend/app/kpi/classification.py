@@ -0,0 +1,213 @@
+"""Test category / subtype classification compiled from kpi_config.yaml.
+
+The `classification` section maps category names to aliases (matched on a
+record's type/category) and optional subtypes (matched on its `subtype` field,
+or trailing the category, e.g. "FISH PET" / "FISH-URO"). Values are
+normalized (upper-cased, punctuation treated as spaces) and compiled once into
+an alias dict plus a token trie; results are memoized per distinct raw value,
+so classifying a row is a dict lookup.
+
+CategoryVolumes accumulates volume and TAT per (category, subtype) during the
+engine's single pass over the period; category totals are rolled up from the
+subtype cells afterwards.
+"""
+import json
+import re
+from typing import Any, Dict, List, Mapping, Optional, Set, Tuple
+
+OTHER = "OTHER"
+
+DEFAULT_CLASSIFICATION: Dict[str, Any] = {
+    "categories": {
+        "CYTO": {"aliases": ["CYTO", "CYTOGENETICS", "KARYOTYPE", "KARYOTYPING"]},
+    },
+}
+
+_SEP_RE = re.compile(r"[^A-Z0-9]+")
+_MEMO_LIMIT = 4096
+_CACHE_LIMIT = 8
+
+
+def _normalize(val: Any) -> str:
+    return _SEP_RE.sub(" ", str(val).upper()).strip() if val else ""
+
+
+class Classifier:
+    """Compiled classification table; see the module docstring for matching rules."""
+
+    def __init__(self, table: Optional[Mapping[str, Any]] = None) -> None:
+        table = table if table is not None else DEFAULT_CLASSIFICATION
+        cats = table.get("categories") or {}
+        if not isinstance(cats, Mapping):
+            raise ValueError("classification.categories must be a mapping of category -> {aliases, subtypes}")
+        self.categories: List[str] = []
+        self.thresholds: Dict[str, Dict[str, Any]] = {}
+        self._aliases: Dict[str, str] = {}
+        self._trie: Dict[Any, Any] = {}
+        self._subtypes: Dict[str, Dict[str, str]] = {}
+        self.subtypes: Dict[str, List[str]] = {}
+        for name, spec in cats.items():
+            name = _normalize(name)
+            if not name or name == OTHER:
+                raise ValueError(f"classification: invalid category name '{name}'")
+            spec = spec or {}
+            self.categories.append(name)
+            if spec.get("thresholds"):
+                self.thresholds[name] = dict(spec["thresholds"])
+            for alias in list(spec.get("aliases") or []) + [name]:
+                self._add_alias(_normalize(alias), name)
+            subs: Dict[str, str] = {}
+            for sub, aliases in (spec.get("subtypes") or {}).items():
+                sub = _normalize(sub)
+                for alias in list(aliases or []) + [sub]:
+                    subs[_normalize(alias)] = sub
+            self._subtypes[name] = subs
+            self.subtypes[name] = list(dict.fromkeys(subs.values()))
+        self._memo: Dict[Tuple[Any, Any], Tuple[str, Optional[str]]] = {}
+
+    def _add_alias(self, alias: str, category: str) -> None:
+        owner = self._aliases.get(alias)
+        if owner is not None and owner != category:
+            raise ValueError(f"classification: alias '{alias}' is listed under both {owner} and {category}")
+        self._aliases[alias] = category
+        node = self._trie
+        for tok in alias.split():
+            node = node.setdefault(tok, {})
+        node[None] = category
+
+    def _match(self, raw_category: Any, raw_subtype: Any) -> Tuple[str, Optional[str]]:
+        norm = _normalize(raw_category)
+        cat = self._aliases.get(norm)
+        if cat is not None:
+            return cat, self._subtypes[cat].get(_normalize(raw_subtype)) if raw_subtype else None
+        # Longest alias prefix whose remainder is a known subtype of that category
+        tokens = norm.split()
+        node = self._trie
+        found: Optional[Tuple[str, Optional[str]]] = None
+        for i, tok in enumerate(tokens):
+            node = node.get(tok)
+            if node is None:
+                break
+            prefix_cat = node.get(None)
+            if prefix_cat is not None:
+                sub = self._subtypes[prefix_cat].get(" ".join(tokens[i + 1:]))
+                if sub is not None:
+                    found = (prefix_cat, sub)
+        return found or (OTHER, None)
+
+    def classify_values(self, raw_category: Any, raw_subtype: Any = None) -> Tuple[str, Optional[str]]:
+        key = (raw_category, raw_subtype)
+        hit = self._memo.get(key)
+        if hit is None:
+            hit = self._match(raw_category, raw_subtype)
+            if len(self._memo) < _MEMO_LIMIT:
+                self._memo[key] = hit
+        return hit
+
+    def classify(self, rec: Mapping[str, Any]) -> Tuple[str, Optional[str]]:
+        """(category, subtype) for a test record; category is OTHER when unmatched."""
+        return self.classify_values(rec.get("type") or rec.get("category") or "", rec.get("subtype"))
+
+
+_DEFAULT = Classifier()
+_cache: Dict[str, Classifier] = {}
+
+
+def get_classifier(config: Optional[Mapping[str, Any]] = None) -> Classifier:
+    """Classifier for the config's `classification` section (built-in CYTO table when absent)."""
+    table = (config or {}).get("classification")
+    if not table:
+        return _DEFAULT
+    key = json.dumps(table, sort_keys=True, default=str)
+    clf = _cache.get(key)
+    if clf is None:
+        clf = Classifier(table)
+        if len(_cache) >= _CACHE_LIMIT:
+            _cache.clear()
+        _cache[key] = clf
+    return clf
+
+
+class _Cell:
+    __slots__ = ("volume", "tat_sum", "tat_count", "tat_min", "tat_max", "cases")
+
+    def __init__(self, track_cases: bool) -> None:
+        self.volume = 0
+        self.tat_sum = 0.0
+        self.tat_count = 0
+        self.tat_min: Optional[float] = None
+        self.tat_max: Optional[float] = None
+        self.cases: Optional[Set[str]] = set() if track_cases else None
+
+    def merge(self, other: "_Cell") -> None:
+        self.volume += other.volume
+        self.tat_sum += other.tat_sum
+        self.tat_count += other.tat_count
+        if other.tat_min is not None and (self.tat_min is None or other.tat_min < self.tat_min):
+            self.tat_min = other.tat_min
+        if other.tat_max is not None and (self.tat_max is None or other.tat_max > self.tat_max):
+            self.tat_max = other.tat_max
+        if self.cases is not None and other.cases is not None:
+            self.cases |= other.cases
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "total": len(self.cases) if self.cases is not None else self.volume,
+            "tat_count": self.tat_count,
+            "tat_sum": self.tat_sum,
+            "tat_min": self.tat_min,
+            "tat_max": self.tat_max,
+        }
+
+
+class CategoryVolumes:
+    """
+    Volume and TAT per (category, subtype), filled with one add() per row.
+
+    At case level `total` counts distinct case keys in each cell (a case with
+    rows in two categories counts in both); TAT figures are per row.
+    """
+
+    def __init__(self, classifier: Classifier, level: str = "row") -> None:
+        self.classifier = classifier
+        self._track_cases = level == "case"
+        self._cells: Dict[Tuple[str, Optional[str]], _Cell] = {}
+
+    def add(self, category: str, subtype: Optional[str], tat: Optional[float], case_key: Optional[str] = None) -> None:
+        cell = self._cells.get((category, subtype))
+        if cell is None:
+            cell = self._cells[(category, subtype)] = _Cell(self._track_cases)
+        cell.volume += 1
+        if tat is not None:
+            cell.tat_sum += tat
+            cell.tat_count += 1
+            if cell.tat_min is None or tat < cell.tat_min:
+                cell.tat_min = tat
+            if cell.tat_max is None or tat > cell.tat_max:
+                cell.tat_max = tat
+        if case_key and cell.cases is not None:
+            cell.cases.add(case_key)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Raw sums: {category: {total, tat_*, subtypes: {subtype: {...}}, unspecified_subtype}}."""
+        out: Dict[str, Any] = {}
+        order = self.classifier.categories + [OTHER]
+        for cat in order:
+            total = _Cell(self._track_cases)
+            subs: Dict[str, Any] = {}
+            unspecified = 0
+            for sub in self.classifier.subtypes.get(cat, []):
+                cell = self._cells.get((cat, sub))
+                subs[sub] = (cell or _Cell(self._track_cases)).to_dict()
+                if cell is not None:
+                    total.merge(cell)
+            rest = self._cells.get((cat, None))
+            if rest is not None:
+                total.merge(rest)
+                unspecified = rest.to_dict()["total"]
+            entry = total.to_dict()
+            if self.classifier.subtypes.get(cat):
+                entry["subtypes"] = subs
+                entry["unspecified_subtype"] = unspecified
+            out[cat] = entry
+        return out
@@ -1,14 +1,16 @@
+import hashlib
+import json
 import logging
 import os
+from datetime import datetime
 from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict
-
-import yaml
+from typing import Any, Dict, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
 DEFAULT_CONFIG_RELATIVE = Path("config") / "kpi_config.yaml"
+ARTIFACT_FORMAT = 1
 
 
 def _resolve_default_config_path() -> Path:
@@ -39,21 +41,123 @@ def _resolve_default_config_path() -> Path:
     return candidates[0]
 
 
-@lru_cache(maxsize=1)
+def _artifact_path(config_path: Path) -> Path:
+    """Precompiled JSON artifact location (KPI_CONFIG_ARTIFACT or <config>.json)."""
+    env_path = os.getenv("KPI_CONFIG_ARTIFACT")
+    if env_path:
+        return Path(env_path).expanduser().resolve()
+    return config_path.with_suffix(".json")
+
+
+def _read_artifact(path: Path, source_sha256: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Return the artifact's config, or None if it is missing, unreadable or stale."""
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            art = json.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning("Ignoring unreadable KPI config artifact %s: %s", path, e)
+        return None
+    if not isinstance(art, dict) or art.get("format") != ARTIFACT_FORMAT:
+        return None
+    if source_sha256 is not None and art.get("source_sha256") != source_sha256:
+        logger.info("KPI config artifact %s is stale; falling back to YAML", path)
+        return None
+    cfg = art.get("config")
+    return cfg if isinstance(cfg, dict) else None
+
+
+def compile_config_artifact(source: Optional[Path] = None, dest: Optional[Path] = None) -> Path:
+    """Parse the YAML config once and write a JSON artifact next to it.
+
+    The artifact records the SHA-256 of the YAML it was built from, so the loader
+    only trusts it while the YAML is unchanged. Intended to run at build time.
+    """
+    import yaml
+
+    src = source or _resolve_default_config_path()
+    raw = src.read_bytes()
+    data = yaml.safe_load(raw) or {}
+    out = dest or _artifact_path(src)
+    artifact = {
+        "format": ARTIFACT_FORMAT,
+        "source": src.name,
+        "source_sha256": hashlib.sha256(raw).hexdigest(),
+        "built_at": datetime.utcnow().isoformat() + "Z",
+        # YAML scalars JSON cannot represent (e.g. unquoted dates) become strings
+        "config": data,
+    }
+    out.write_text(json.dumps(artifact, default=str, separators=(",", ":")), encoding="utf-8")
+    return out
+
+
+def _file_stamp(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
 def load_kpi_config() -> Dict[str, Any]:
-    """Load and cache KPI config YAML.
+    """Load and cache KPI config.
 
+    Uses the precompiled JSON artifact when it matches the YAML (or when only the
+    artifact is deployed), otherwise parses the YAML.
     Returns a dictionary with keys like 'kpis' and 'metadata'.
     Raises FileNotFoundError or yaml.YAMLError on failure.
+
+    The cache is keyed on the files' mtime/size, so every worker process picks
+    up an edited config on its next call; the loaded version is published to
+    the shared state (see app.core.shared_state) when it is enabled.
     """
     path = _resolve_default_config_path()
-    if not path.exists():
-        raise FileNotFoundError(f"KPI config not found at: {path}")
+    artifact = _artifact_path(path)
+    return _load_kpi_config(path, artifact, _file_stamp(path), _file_stamp(artifact))
+
+
+@lru_cache(maxsize=1)
+def _load_kpi_config(path: Path, artifact: Path, *stamps: Any) -> Dict[str, Any]:
+    sha256 = None
+    if path.exists():
+        raw = path.read_bytes()
+        sha256 = hashlib.sha256(raw).hexdigest()
+        data = _read_artifact(artifact, sha256)
+        source = artifact if data is not None else path
+        if data is None:
+            import yaml
 
-    with path.open("r", encoding="utf-8") as f:
-        data = yaml.safe_load(f) or {}
+            data = yaml.safe_load(raw) or {}
+    else:
+        data = _read_artifact(artifact, None)
+        source = artifact
+        if data is None:
+            raise FileNotFoundError(f"KPI config not found at: {path}")
 
-    logger.info("Loaded KPI config from %s (version=%s)", path, data.get("metadata", {}).get("version"))
+    logger.info("Loaded KPI config from %s (version=%s)", source, data.get("metadata", {}).get("version"))
     # Attach resolved path for debugging
     data.setdefault("_source_path", str(path))
+    data.setdefault("_source_sha256", sha256)
+    _publish_version(data, str(source))
     return data
+
+
+load_kpi_config.cache_clear = _load_kpi_config.cache_clear  # type: ignore[attr-defined]
+
+
+def _publish_version(data: Dict[str, Any], source: str) -> None:
+    from app.core.shared_state import get_shared_state, worker_id
+
+    try:
+        state = get_shared_state()
+        if state is not None:
+            state.set("kpi_config", {
+                "version": data.get("metadata", {}).get("version"),
+                "sha256": data.get("_source_sha256"),
+                "source": Path(source).name,
+                "loaded_at": datetime.utcnow().isoformat() + "Z",
+                "loaded_by": worker_id(),
+            })
+    except Exception as e:
+        logger.warning("Could not publish KPI config version to shared state: %s", e)
@@ -0,0 +1,307 @@
+"""Per-day KPI accumulators with prefix sums.
+
+DailyAggregates buckets tests by day in a single pass (volume, CYTO volume,
+TAT sum/count) and exposes any inclusive date range as O(1) prefix-sum
+differences. Rolling windows, period comparisons and exports build on it
+instead of rescanning the raw records for every period.
+
+period_to_date_kpis answers MTD/QTD/YTD/fiscal-YTD (and arbitrary periods),
+each with its same-period-last-year comparison, from one DailyAggregates pass.
+"""
+from array import array
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .classification import Classifier, get_classifier
+from .engine import (
+    _classify_test,
+    _coerce_period,
+    _pct_change,
+    _record_timestamp,
+    _tat_hours,
+    _tat_status,
+    _volume_status,
+    _year_delta,
+)
+
+DEFAULT_ROLLING_WINDOWS = [7, 30, 90]
+MAX_ROLLING_WINDOW_DAYS = 366
+MAX_PERIOD_TO_DATE_SPAN_DAYS = 366 * 10
+TO_DATE_PERIODS = ("mtd", "qtd", "ytd", "fytd")
+
+
+class DailyAggregates:
+    """
+    Day-indexed accumulators for the inclusive range [start, end].
+
+    Fields: volume (all tests), cyto (CYTO tests), tat_sum / tat_count (tests
+    with a valid TAT). Prefix arrays are built lazily after the last add().
+    """
+
+    FIELDS = ("volume", "cyto", "tat_sum", "tat_count")
+
+    def __init__(self, start: date, end: date) -> None:
+        if end < start:
+            raise ValueError("end must be on/after start")
+        self.start = start
+        self.end = end
+        n = (end - start).days + 1
+        self.volume = array("q", bytes(8 * n))
+        self.cyto = array("q", bytes(8 * n))
+        self.tat_sum = array("d", bytes(8 * n))
+        self.tat_count = array("q", bytes(8 * n))
+        self._prefix: Optional[Dict[str, array]] = None
+
+    @classmethod
+    def from_tests(
+        cls,
+        tests: Iterable[Dict[str, Any]],
+        start: date,
+        end: date,
+        classifier: Optional[Classifier] = None,
+    ) -> "DailyAggregates":
+        agg = cls(start, end)
+        agg.add_tests(tests, classifier)
+        return agg
+
+    def __len__(self) -> int:
+        return len(self.volume)
+
+    def add(self, day: date, is_cyto: bool, tat: Optional[float]) -> bool:
+        """Accumulate one test; returns False if the day is outside the range."""
+        i = (day - self.start).days
+        if i < 0 or i >= len(self.volume):
+            return False
+        self.volume[i] += 1
+        if is_cyto:
+            self.cyto[i] += 1
+        if tat is not None:
+            self.tat_sum[i] += tat
+            self.tat_count[i] += 1
+        self._prefix = None
+        return True
+
+    def add_tests(self, tests: Iterable[Dict[str, Any]], classifier: Optional[Classifier] = None) -> int:
+        """Accumulate engine test records (e.g. a LIS batch); returns how many fell in range."""
+        added = 0
+        for t in tests:
+            ts = _record_timestamp(t)
+            if ts is not None and self.add(ts.date(), _classify_test(t, classifier)[0] == "CYTO", _tat_hours(t)):
+                added += 1
+        return added
+
+    def _prefixes(self) -> Dict[str, array]:
+        if self._prefix is None:
+            out = {}
+            for name in self.FIELDS:
+                col = getattr(self, name)
+                pre = array(col.typecode, bytes(8 * (len(col) + 1)))
+                acc = 0
+                for i, v in enumerate(col):
+                    acc += v
+                    pre[i + 1] = acc
+                out[name] = pre
+            self._prefix = out
+        return self._prefix
+
+    def range_sums(self, start: date, end: date) -> Dict[str, Any]:
+        """Sums over the inclusive [start, end], clipped to the covered range."""
+        lo = max(0, (start - self.start).days)
+        hi = min(len(self.volume), (end - self.start).days + 1)
+        pre = self._prefixes()
+        if hi <= lo:
+            return {name: 0 for name in self.FIELDS}
+        return {name: pre[name][hi] - pre[name][lo] for name in self.FIELDS}
+
+    def cumulative(self, day: date) -> Dict[str, Any]:
+        """Sums from the start of the covered range through `day` (inclusive)."""
+        i = min(len(self.volume), max(0, (day - self.start).days + 1))
+        pre = self._prefixes()
+        return {name: pre[name][i] for name in self.FIELDS}
+
+    def days(self) -> Iterable[date]:
+        for i in range(len(self.volume)):
+            yield self.start + timedelta(days=i)
+
+
+def _rolling_windows(config: Dict[str, Any], windows: Optional[List[int]]) -> List[int]:
+    if windows is None:
+        windows = (config.get("kpis", {}).get("rolling", {}) or {}).get("windows") or DEFAULT_ROLLING_WINDOWS
+    out = sorted({int(w) for w in windows})
+    if not out or out[0] < 1 or out[-1] > MAX_ROLLING_WINDOW_DAYS:
+        raise ValueError(f"windows must be between 1 and {MAX_ROLLING_WINDOW_DAYS} days")
+    return out
+
+
+def rolling_kpis(
+    config: Dict[str, Any],
+    period: Any,
+    tests: List[Dict[str, Any]],
+    windows: Optional[List[int]] = None,
+) -> Dict[str, Any]:
+    """
+    Trailing-window volume and average TAT for every day of the period.
+
+    One pass builds DailyAggregates covering the period plus the largest
+    window's lead-in; each point/window is then a prefix-sum difference, so the
+    total cost is O(records + days * windows). Window sizes default to
+    kpis.rolling.windows in the config. Each window carries threshold statuses
+    for cytogenetics_total_volume (thresholds scaled to the window length, see
+    _volume_status) and tat.
+    """
+    period_obj = _coerce_period(period)
+    s, e = period_obj.to_datetimes()
+    wins = _rolling_windows(config, windows)
+    first_day, last_day = s.date(), e.date()
+    agg = DailyAggregates.from_tests(
+        tests, first_day - timedelta(days=wins[-1] - 1), last_day, classifier=get_classifier(config)
+    )
+
+    points: List[Dict[str, Any]] = []
+    day = first_day
+    while day <= last_day:
+        point: Dict[str, Any] = {"date": day.isoformat(), "windows": {}}
+        for w in wins:
+            sums = agg.range_sums(day - timedelta(days=w - 1), day)
+            avg_tat = sums["tat_sum"] / sums["tat_count"] if sums["tat_count"] else None
+            point["windows"][str(w)] = {
+                "volume": sums["volume"],
+                "cyto_volume": sums["cyto"],
+                "tat_count": sums["tat_count"],
+                "avg_tat_hours": avg_tat,
+                "status": {
+                    "cytogenetics_total_volume": _volume_status(
+                        config, sums["cyto"], "cytogenetics_total_volume", days=w
+                    ),
+                    "tat": _tat_status(config, avg_tat),
+                },
+            }
+        points.append(point)
+        day += timedelta(days=1)
+
+    return {
+        "meta": {
+            "period": {"start_date": period_obj.start_date, "end_date": period_obj.end_date},
+            "generatedAt": datetime.utcnow().isoformat() + "Z",
+            "config_version": config.get("metadata", {}).get("version"),
+            "windows": wins,
+        },
+        "points": points,
+    }
+
+
+# -------------------- Period-to-date --------------------
+
+def fiscal_year_start_month(config: Dict[str, Any]) -> int:
+    """calendar.fiscal_year_start_month from the config (1 = calendar year)."""
+    month = (config.get("calendar") or {}).get("fiscal_year_start_month", 1)
+    try:
+        month = int(month)
+    except (TypeError, ValueError):
+        raise ValueError("calendar.fiscal_year_start_month must be an integer 1-12")
+    if not 1 <= month <= 12:
+        raise ValueError("calendar.fiscal_year_start_month must be an integer 1-12")
+    return month
+
+
+def quarter_start(day: date) -> date:
+    return day.replace(month=3 * ((day.month - 1) // 3) + 1, day=1)
+
+
+def fiscal_year_start(day: date, start_month: int) -> date:
+    year = day.year if day.month >= start_month else day.year - 1
+    return date(year, start_month, 1)
+
+
+def fiscal_year_label(day: date, start_month: int) -> str:
+    """FY named by the calendar year it ends in (FY2027 = Jul 2026 - Jun 2027 for a July start)."""
+    start = fiscal_year_start(day, start_month)
+    return f"FY{start.year if start_month == 1 else start.year + 1}"
+
+
+def same_period_last_year(start: date, end: date) -> Tuple[date, date]:
+    """Shift [start, end] back one year; Feb 29 maps to Feb 28."""
+    return _year_delta(start, -1), _year_delta(end, -1)  # type: ignore[arg-type]
+
+
+def to_date_ranges(as_of: date, fiscal_start_month: int = 1) -> Dict[str, Tuple[date, date]]:
+    """MTD, QTD, calendar YTD and fiscal YTD ranges ending on `as_of`."""
+    return {
+        "mtd": (as_of.replace(day=1), as_of),
+        "qtd": (quarter_start(as_of), as_of),
+        "ytd": (as_of.replace(month=1, day=1), as_of),
+        "fytd": (fiscal_year_start(as_of, fiscal_start_month), as_of),
+    }
+
+
+def _range_summary(config: Dict[str, Any], agg: DailyAggregates, start: date, end: date) -> Dict[str, Any]:
+    sums = agg.range_sums(start, end)
+    avg_tat = sums["tat_sum"] / sums["tat_count"] if sums["tat_count"] else None
+    return {
+        "start_date": start.isoformat(),
+        "end_date": end.isoformat(),
+        "volume": sums["volume"],
+        "cyto_volume": sums["cyto"],
+        "tat_count": sums["tat_count"],
+        "avg_tat_hours": avg_tat,
+        "status": {
+            # Thresholds scaled to the range length: MTD on the 3rd is judged against 3 days' worth
+            "cytogenetics_total_volume": _volume_status(
+                config, sums["cyto"], "cytogenetics_total_volume", days=(end - start).days + 1
+            ),
+            "tat": _tat_status(config, avg_tat),
+        },
+    }
+
+
+def period_to_date_kpis(
+    config: Dict[str, Any],
+    tests: Iterable[Dict[str, Any]],
+    as_of: Optional[date] = None,
+    periods: Optional[List[Any]] = None,
+) -> Dict[str, Any]:
+    """
+    MTD, QTD, YTD and fiscal YTD ending on `as_of` (default today), plus any
+    extra `periods`, each with its same period last year and YoY % change.
+
+    All ranges and their comparisons are resolved first; one DailyAggregates
+    pass covers their union and every figure is then a prefix-sum difference.
+    Row-level volumes (same placement as /kpi/compute). The fiscal year starts
+    on calendar.fiscal_year_start_month.
+    """
+    as_of = as_of or datetime.utcnow().date()
+    fy_month = fiscal_year_start_month(config)
+    ranges = to_date_ranges(as_of, fy_month)
+    custom: List[Tuple[date, date]] = []
+    for p in periods or []:
+        s, e = _coerce_period(p).to_datetimes()
+        custom.append((s.date(), e.date()))
+    spans = list(ranges.values()) + custom
+    spans += [same_period_last_year(s, e) for s, e in spans]
+    lo = min(s for s, _ in spans)
+    hi = max(e for _, e in spans)
+    if (hi - lo).days + 1 > MAX_PERIOD_TO_DATE_SPAN_DAYS:
+        raise ValueError(f"periods must fall within {MAX_PERIOD_TO_DATE_SPAN_DAYS} days of each other")
+    agg = DailyAggregates.from_tests(tests, lo, hi, classifier=get_classifier(config))
+
+    def entry(start: date, end: date) -> Dict[str, Any]:
+        out = _range_summary(config, agg, start, end)
+        prev = _range_summary(config, agg, *same_period_last_year(start, end))
+        out["same_period_last_year"] = prev
+        out["yoy_pct"] = {
+            "volume": _pct_change(out["volume"], prev["volume"]),
+            "cyto_volume": _pct_change(out["cyto_volume"], prev["cyto_volume"]),
+        }
+        return out
+
+    return {
+        "meta": {
+            "as_of": as_of.isoformat(),
+            "fiscal_year_start_month": fy_month,
+            "fiscal_year": fiscal_year_label(as_of, fy_month),
+            "generatedAt": datetime.utcnow().isoformat() + "Z",
+            "config_version": config.get("metadata", {}).get("version"),
+        },
+        "periods": {name: entry(s, e) for name, (s, e) in ranges.items()},
+        "custom": [entry(s, e) for s, e in custom],
+    }
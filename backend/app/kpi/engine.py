@@ -1,10 +1,32 @@
 import logging
+import re
+import sys
+from array import array
 from dataclasses import dataclass
-from datetime import datetime, timedelta
-from typing import Any, Dict, Iterable, List, Optional, Tuple
+from datetime import date, datetime, timedelta
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from .classification import OTHER, CategoryVolumes, Classifier, get_classifier
+from .productivity import UNASSIGNED_STAFF, ProductivityIndex
+from .profiling import NULL_PROFILER, KPIProfiler
+from .quality import (
+    REASON_CATEGORY_MISSING,
+    REASON_CATEGORY_UNMATCHED,
+    REASON_NO_TIMESTAMP,
+    REASON_TAT_MISSING_END,
+    REASON_TAT_MISSING_START,
+    REASON_TAT_NEGATIVE,
+    REASON_TIMESTAMP_UNPARSEABLE,
+    QualityReport,
+)
+
+if TYPE_CHECKING:
+    from .history import HistoryStore
 
 logger = logging.getLogger(__name__)
 
+_DEFAULT_CLASSIFIER = get_classifier()
+
 
 # -------------------- Helpers --------------------
 
@@ -23,6 +45,11 @@ def _parse_dt(val: Optional[str]) -> Optional[datetime]:
         return None
 
 
+def _record_timestamp(rec: Dict[str, Any]) -> Optional[datetime]:
+    """Timestamp used to place a test in a period: resulted_at, else received/collected."""
+    return _parse_dt(rec.get("resulted_at")) or _parse_dt(rec.get("received_at")) or _parse_dt(rec.get("collected_at"))
+
+
 def _daterange_days(start: datetime, end: datetime) -> int:
     return max(0, (end.date() - start.date()).days + 1)
 
@@ -41,6 +68,11 @@ def _month_delta(d: datetime, months: int) -> datetime:
     return d.replace(year=year, month=month, day=day)
 
 
+def _year_delta(d: datetime, years: int) -> datetime:
+    # Feb 29 maps to Feb 28 in non-leap years
+    return _month_delta(d, 12 * years)
+
+
 # -------------------- Core Engine --------------------
 
 @dataclass
@@ -56,54 +88,331 @@ class Period:
         return s, e
 
 
-def _classify_test(rec: Dict[str, Any]) -> Tuple[str, Optional[str]]:
+def _classify_test(rec: Dict[str, Any], classifier: Optional[Classifier] = None) -> Tuple[str, Optional[str]]:
     """
     Return (category, subtype) normalized.
-    category in {CYTO, OTHER}. Subtype is unused.
+    Uses the config's classification table when a classifier is given (see
+    get_classifier), else the built-in table: category in {CYTO, OTHER}.
     """
-    cat = (rec.get("type") or rec.get("category") or "").strip().upper()
-    if cat in {"CYTO", "CYTOGENETICS", "KARYOTYPE"}:
-        return "CYTO", None
-    return "OTHER", None
+    return (classifier or _DEFAULT_CLASSIFIER).classify(rec)
 
 
-def _tat_hours(rec: Dict[str, Any]) -> Optional[float]:
+def _tat_with_reason(rec: Dict[str, Any]) -> Tuple[Optional[float], Optional[str]]:
+    """(TAT hours, None), or (None, quality reason) when no TAT can be computed."""
     # Prefer received_at -> resulted_at, else collected_at -> resulted_at
     start = _parse_dt(rec.get("received_at")) or _parse_dt(rec.get("collected_at"))
+    if start is None:
+        return None, REASON_TAT_MISSING_START
     end = _parse_dt(rec.get("resulted_at")) or _parse_dt(rec.get("signed_out_at"))
-    if start and end and end >= start:
-        return (end - start).total_seconds() / 3600.0
-    return None
+    if end is None:
+        return None, REASON_TAT_MISSING_END
+    if end < start:
+        return None, REASON_TAT_NEGATIVE
+    return (end - start).total_seconds() / 3600.0, None
+
+
+def _tat_hours(rec: Dict[str, Any]) -> Optional[float]:
+    return _tat_with_reason(rec)[0]
 
 
 def _sum_hours_productivity(entries: Iterable[Dict[str, Any]], start: datetime, end: datetime) -> float:
-    total = 0.0
-    for r in entries:
-        d = r.get("date")
-        dt = None
+    index = entries if isinstance(entries, ProductivityIndex) else ProductivityIndex(entries)
+    return index.total_hours(start.date(), end.date())
+
+
+def _hours_per_fte_day(config: Dict[str, Any]) -> Any:
+    tpf_cfg = config.get("kpis", {}).get("tests_per_fte", {}) or {}
+    return tpf_cfg.get("hours_per_fte_day", tpf_cfg.get("baseline_per_fte_per_day", 8))
+
+
+_TECH_SPLIT_RE = re.compile(r"[/;&]|\band\b", re.IGNORECASE)
+
+
+def _test_staff_keys(rec: Dict[str, Any]) -> List[str]:
+    """Staff identifiers credited with a test: staff_id, else analyzed_techs / analyzed_by names."""
+    sid = rec.get("staff_id")
+    if sid not in (None, ""):
+        return [str(sid)]
+    techs = rec.get("analyzed_techs")
+    if isinstance(techs, list) and techs:
+        return [str(x).strip() for x in techs if str(x).strip()]
+    raw = rec.get("analyzed_by")
+    if raw:
+        return [p.strip() for p in _TECH_SPLIT_RE.split(str(raw)) if p.strip()]
+    return []
+
+
+# -------------------- Case Index --------------------
+
+# Per-case flag bits (mirrors the dashboard's case-level aggregation)
+CASE_CYTO = 1
+CASE_ABNORMAL = 2
+CASE_FAILURE = 4
+CASE_STAT = 8
+CASE_CANCELED = 16
+CASE_BLANK_RESULT = 32  # at least one row with an empty Abn/Norm value
+
+_STAT_TEXT_FIELDS = ("result", "final_result", "interpretation", "comment", "flag",
+                     "result_flag", "status", "outcome", "notes")
+_STAT_RE = re.compile(r"\bstat\b")
+
+
+def normalize_case_no(rec: Dict[str, Any]) -> str:
+    """Case key as the dashboard normalizes it: trimmed, upper-cased case_no/case/case_number."""
+    raw = rec.get("case_no") or rec.get("case") or rec.get("case_number") or ""
+    return str(raw).strip().upper()
+
+
+def _is_stat(rec: Dict[str, Any]) -> bool:
+    prio = rec.get("priority")
+    if prio is not None and str(prio).strip() != "":
         try:
-            if d:
-                dt = datetime.fromisoformat(str(d))
-        except Exception:
-            dt = None
-        if dt and start.date() <= dt.date() <= end.date():
-            # hours_worked preferred; else remote+in_lab; else total_hours
-            def _to_float(x):
-                try:
-                    return float(x)
-                except Exception:
-                    return 0.0
-            hours = r.get("hours_worked")
-            if hours is not None and str(hours) != "":
-                total += _to_float(hours)
-                continue
-            remote = _to_float(r.get("remote_hours"))
-            in_lab = _to_float(r.get("in_lab_hours"))
-            if remote or in_lab:
-                total += remote + in_lab
+            if float(prio) == 0:
+                return True
+        except (TypeError, ValueError):
+            if "stat" in str(prio).lower():
+                return True
+    if rec.get("stat") is True or "stat" in str(rec.get("order_priority") or "").lower():
+        return True
+    return any(_STAT_RE.search(str(rec.get(f) or "").lower()) for f in _STAT_TEXT_FIELDS)
+
+
+# Abn/Norm codes: first letter of the (upper-cased) value
+ABN_BLANK, ABN_ABNORMAL, ABN_FAILURE, ABN_CANCELED, ABN_OTHER = range(5)
+_ABN_FLAGS = (CASE_BLANK_RESULT, CASE_ABNORMAL, CASE_FAILURE, CASE_CANCELED, 0)
+_ABN_LETTERS = {"A": ABN_ABNORMAL, "F": ABN_FAILURE, "C": ABN_CANCELED}
+
+
+def _abn_code(rec: Dict[str, Any]) -> int:
+    abn = str(rec.get("abn_norm") or "").strip().upper()
+    if not abn:
+        return ABN_BLANK
+    return _ABN_LETTERS.get(abn[0], ABN_OTHER)
+
+
+def _explicit_tat(rec: Dict[str, Any]) -> Optional[float]:
+    """Positive tat_hours value, if the record carries one."""
+    th = rec.get("tat_hours")
+    if th is not None and th != "":
+        try:
+            v = float(th)
+            if v > 0:
+                return v
+        except (TypeError, ValueError):
+            pass
+    return None
+
+
+def _case_row_tat(rec: Dict[str, Any]) -> Optional[float]:
+    """Per-row TAT for case rollups: positive tat_hours if given, else timestamp TAT."""
+    v = _explicit_tat(rec)
+    return v if v is not None else _tat_hours(rec)
+
+
+class CaseIndex:
+    """
+    Rows rolled up to cases in one pass.
+
+    Normalized case keys are interned and mapped to dense integer ids; per-case
+    state lives in parallel typed arrays (flag bitmask, TAT sum/count, row count).
+    Rows without a case number are counted in `rows_without_case` only.
+    """
+
+    __slots__ = ("_ids", "keys", "flags", "tat_sum", "tat_count", "rows", "rows_without_case")
+
+    def __init__(self) -> None:
+        self._ids: Dict[str, int] = {}
+        self.keys: List[str] = []
+        self.flags = array("B")
+        self.tat_sum = array("d")
+        self.tat_count = array("I")
+        self.rows = array("I")
+        self.rows_without_case = 0
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]], classifier: Optional[Classifier] = None) -> "CaseIndex":
+        idx = cls()
+        for r in records:
+            idx.add(r, classifier)
+        return idx
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def case_id(self, key: str) -> int:
+        cid = self._ids.get(key)
+        if cid is None:
+            cid = len(self.keys)
+            key = sys.intern(key)
+            self._ids[key] = cid
+            self.keys.append(key)
+            self.flags.append(0)
+            self.tat_sum.append(0.0)
+            self.tat_count.append(0)
+            self.rows.append(0)
+        return cid
+
+    def add(self, rec: Dict[str, Any], classifier: Optional[Classifier] = None) -> Optional[int]:
+        key = normalize_case_no(rec)
+        if not key:
+            self.rows_without_case += 1
+            return None
+        return self.add_row(
+            key,
+            _classify_test(rec, classifier)[0] == "CYTO",
+            _abn_code(rec),
+            _is_stat(rec),
+            _case_row_tat(rec),
+        )
+
+    def add_row(self, key: str, is_cyto: bool, abn: int, is_stat: bool, tat: Optional[float]) -> int:
+        """Fold one pre-classified row into case `key` (abn is an ABN_* code)."""
+        cid = self.case_id(key)
+        f = self.flags[cid]
+        if is_cyto:
+            f |= CASE_CYTO
+        f |= _ABN_FLAGS[abn]
+        if is_stat:
+            f |= CASE_STAT
+        self.flags[cid] = f
+        self.rows[cid] += 1
+        if tat is not None:
+            self.tat_sum[cid] += tat
+            self.tat_count[cid] += 1
+        return cid
+
+    def count(self, mask: int = 0) -> int:
+        """Number of cases having all bits in mask set."""
+        if not mask:
+            return len(self.keys)
+        return sum(1 for f in self.flags if f & mask == mask)
+
+    def case_tats(self, mask: int = 0) -> List[float]:
+        """Average TAT per case (cases without any TAT are skipped)."""
+        out = []
+        for i, n in enumerate(self.tat_count):
+            if n and (self.flags[i] & mask) == mask:
+                out.append(self.tat_sum[i] / n)
+        return out
+
+    def summary(self, tat_standard_hours: Optional[float] = None) -> Dict[str, Any]:
+        """Dashboard-style case metrics over CYTO cases."""
+        total = abnormal = failures = stat = canceled = negative = 0
+        tat_sum = stat_tat_sum = 0.0
+        tat_n = stat_tat_n = over_std = 0
+        for i, f in enumerate(self.flags):
+            if not f & CASE_CYTO:
                 continue
-            total += _to_float(r.get("total_hours"))
-    return total
+            total += 1
+            if f & CASE_ABNORMAL:
+                abnormal += 1
+            if f & CASE_FAILURE:
+                failures += 1
+            if f & CASE_CANCELED:
+                canceled += 1
+            if f & CASE_BLANK_RESULT and not f & (CASE_ABNORMAL | CASE_FAILURE):
+                negative += 1
+            n = self.tat_count[i]
+            avg = self.tat_sum[i] / n if n else None
+            if avg is not None:
+                tat_sum += avg
+                tat_n += 1
+                if tat_standard_hours is not None and avg > tat_standard_hours:
+                    over_std += 1
+            if f & CASE_STAT:
+                stat += 1
+                if avg is not None:
+                    stat_tat_sum += avg
+                    stat_tat_n += 1
+        return {
+            "total": total,
+            "abnormal": abnormal,
+            "percent_abnormal": abnormal * 100.0 / total if total else None,
+            "failures": failures,
+            "failure_pct": failures * 100.0 / total if total else None,
+            "stat": stat,
+            "canceled": canceled,
+            "negative": negative,
+            "avg_tat_hours": tat_sum / tat_n if tat_n else None,
+            "stat_avg_tat_hours": stat_tat_sum / stat_tat_n if stat_tat_n else None,
+            "tat_over_standard_pct": over_std * 100.0 / tat_n if tat_n and tat_standard_hours is not None else None,
+            "rows_without_case": self.rows_without_case,
+        }
+
+
+def _volume_period_days(config: Dict[str, Any], k: str) -> float:
+    """kpis.<k>.period_days: length of the period the volume thresholds are set for (default 30)."""
+    days = (config.get("kpis", {}).get(k, {}) or {}).get("period_days", 30)
+    try:
+        days = float(days)
+    except (TypeError, ValueError):
+        raise ValueError(f"kpis.{k}.period_days must be a positive number")
+    if not days > 0:
+        raise ValueError(f"kpis.{k}.period_days must be a positive number")
+    return days
+
+
+def _volume_status(config: Dict[str, Any], value: int, k: str, days: Optional[int] = None) -> str:
+    """
+    Lower-is-worse status for a volume KPI using kpis.<k>.thresholds. With
+    `days`, the thresholds are scaled from kpis.<k>.period_days to a range of
+    that many days (a 7-day window gets 7/30 of a monthly threshold).
+    """
+    th = (config.get("kpis", {}).get(k, {}).get("thresholds") or {})
+    warn = th.get("warning")
+    crit = th.get("critical")
+    if days is not None:
+        scale = days / _volume_period_days(config, k)
+        warn = None if warn is None else warn * scale
+        crit = None if crit is None else crit * scale
+    if crit is not None and value <= crit:
+        return "critical"
+    if warn is not None and value <= warn:
+        return "warning"
+    return "ok"
+
+
+def _tat_status(config: Dict[str, Any], avg_hours: Optional[float]) -> str:
+    """Higher-is-worse status for average TAT using kpis.tat.thresholds."""
+    th = (config.get("kpis", {}).get("tat", {}).get("thresholds") or {})
+    warn = th.get("warning")
+    crit = th.get("critical")
+    if avg_hours is None:
+        return "unknown"
+    if crit is not None and avg_hours >= float(crit):
+        return "critical"
+    if warn is not None and avg_hours >= float(warn):
+        return "warning"
+    return "ok"
+
+
+@dataclass
+class KPIAggregate:
+    """Threshold-independent aggregates for one period.
+
+    Produced by aggregate_kpis; build_kpi_result turns it into the API response and
+    app.kpi.evaluate scores many aggregates against alternative thresholds.
+    """
+
+    period: Period
+    level: str
+    cyto_total: int
+    total_volume: int
+    tat_count: int
+    tat_sum: float
+    tat_min: Optional[float]
+    tat_max: Optional[float]
+    prev_month_total: Optional[int]
+    prev_year_total: Optional[int]
+    total_hours: Optional[float]
+    hours_per_fte_day: Any
+    case_index: Optional[CaseIndex] = None
+    categories: Optional[Dict[str, Any]] = None  # CategoryVolumes.to_dict()
+    quality: Optional[QualityReport] = None
+
+    @property
+    def tat_avg(self) -> Optional[float]:
+        return self.tat_sum / self.tat_count if self.tat_count else None
 
 
 def _coerce_period(p: Any) -> Period:
@@ -119,85 +428,290 @@ def _coerce_period(p: Any) -> Period:
         raise ValueError("Invalid period; expected {start_date, end_date}")
 
 
-def compute_kpis(
+def _note_category(quality: QualityReport, rec: Dict[str, Any], category: str, row: int) -> None:
+    if category == OTHER:
+        # Stripped like TestBatch.append, so whitespace-only is "missing" on both paths
+        raw = str(rec.get("type") or rec.get("category") or "").strip()
+        quality.issue(REASON_CATEGORY_UNMATCHED if raw else REASON_CATEGORY_MISSING, row)
+
+
+def _aggregate_records(
+    tests: List[Dict[str, Any]],
+    s: datetime,
+    e: datetime,
+    level: str,
+    prof: Any,
+    classifier: Classifier,
+    quality: QualityReport,
+) -> Tuple[int, int, List[float], Optional["CaseIndex"], CategoryVolumes]:
+    """Period filter, volumes and TAT values over dict records: (cyto, total, tats, case index, groups).
+
+    Fills `quality` in the same loops (see app.kpi.quality for the reasons).
+    """
+    # Filter tests within the period by resulted_at or received_at if missing
+    tests_in_period: List[Dict[str, Any]] = []
+    period_rows: List[int] = []
+    with prof.stage("filter_period"):
+        for i, t in enumerate(tests):
+            raw_end = t.get("resulted_at")
+            ended = _parse_dt(raw_end)
+            if raw_end:
+                quality.column("resulted_at", ended is not None)
+            raw_received = t.get("received_at")
+            started = _parse_dt(raw_received)
+            if raw_received:
+                quality.column("received_at", started is not None)
+            raw_collected = t.get("collected_at")
+            if started is None:  # collected_at is only read as the fallback start
+                started = _parse_dt(raw_collected)
+                if raw_collected:
+                    quality.column("collected_at", started is not None)
+            raw_start = raw_received or raw_collected
+            if (raw_end and ended is None) or (not ended and raw_start and started is None):
+                quality.issue(REASON_TIMESTAMP_UNPARSEABLE, i)
+            elif not raw_end and not raw_start:
+                quality.issue(REASON_NO_TIMESTAMP, i)
+            timestamp = ended or started
+            if _within_period(timestamp, s, e):
+                tests_in_period.append(t)
+                period_rows.append(i)
+    prof.parse_failure("timestamp", quality.count(REASON_TIMESTAMP_UNPARSEABLE))
+    prof.count("tests", len(tests))
+    prof.count("tests_in_period", len(tests_in_period))
+
+    # --- Volumes (CYTO-only indicators) ---
+    cyto_total = 0
+
+    tat_values: List[float] = []
+
+    case_index: Optional[CaseIndex] = None
+    groups = CategoryVolumes(classifier, level)
+    if level == "case":
+        with prof.stage("case_rollup"):
+            case_index = CaseIndex()
+            for t, i in zip(tests_in_period, period_rows):
+                cat, sub = _classify_test(t, classifier)
+                tat, why = _tat_with_reason(t)
+                if why is not None:
+                    quality.issue(why, i)
+                _note_category(quality, t, cat, i)
+                key = normalize_case_no(t)
+                if key:
+                    row_tat = _explicit_tat(t)
+                    # Same fold as CaseIndex.add, reusing the row's classification and TAT
+                    case_index.add_row(
+                        key, cat == "CYTO", _abn_code(t), _is_stat(t), tat if row_tat is None else row_tat
+                    )
+                else:
+                    case_index.rows_without_case += 1
+                groups.add(cat, sub, tat, key or None)
+            cyto_total = case_index.count(CASE_CYTO)
+            tat_values = case_index.case_tats()
+        prof.count("cases", len(case_index))
+        # Total volume counts all cases in period (not category-specific)
+        total_volume = len(case_index)
+    else:
+        with prof.stage("volume_and_tat"):
+            for t, i in zip(tests_in_period, period_rows):
+                cat, sub = _classify_test(t, classifier)
+                if cat == "CYTO":
+                    cyto_total += 1
+                # TAT
+                tat, why = _tat_with_reason(t)
+                if tat is not None:
+                    tat_values.append(tat)
+                else:
+                    quality.issue(why, i)  # type: ignore[arg-type]
+                _note_category(quality, t, cat, i)
+                groups.add(cat, sub, tat)
+        prof.parse_failure("tat", len(tests_in_period) - len(tat_values))
+        # Total volume counts all tests in period (not category-specific)
+        total_volume = len(tests_in_period)
+    prof.count("tat_values", len(tat_values))
+    quality.rows += len(tests)
+    quality.rows_in_period += len(tests_in_period)
+    return cyto_total, total_volume, tat_values, case_index, groups
+
+
+def aggregate_kpis(
     config: Dict[str, Any],
     period: Any,
     tests: List[Dict[str, Any]],
     productivity: Optional[List[Dict[str, Any]]] = None,
-) -> Dict[str, Any]:
+    profiler: Optional[KPIProfiler] = None,
+    level: str = "row",
+    history: Optional["HistoryStore"] = None,
+) -> KPIAggregate:
     """
-    Compute KPIs for the provided period and input data.
+    Aggregate the provided period and input data without evaluating thresholds.
 
     Inputs:
       - config: loaded YAML config
       - period: date range
-      - tests: list of test dicts. Fields used: type/category, received_at/collected_at, resulted_at
+      - tests: list of test dicts. Fields used: type/category, received_at/collected_at, resulted_at.
+        A TestBatch (app.kpi.batch) is accepted as well and gives the same results
       - productivity: optional list of productivity entries with hours fields
+      - profiler: optional KPIProfiler; when given, per-stage timings, record
+        counts and parse failures are recorded and returned under meta.profile
+      - level: "row" counts test rows; "case" rolls rows up to unique cases first
+        (volumes and MoM/YoY count cases, TAT averages per-case TAT, and a
+        `cases` metric with abnormal/failure/STAT/canceled counts is added)
+      - history: optional HistoryStore (app.kpi.history). MoM/YoY comparison
+        periods it fully covers are counted from it; with no tests the period
+        itself is read from it
 
-    Returns a dict with metrics and statuses.
+    Returns a KPIAggregate; see build_kpi_result / compute_kpis for the metrics dict.
     """
+    if level not in {"row", "case"}:
+        raise ValueError("level must be one of: row, case")
+    prof = profiler or NULL_PROFILER
     period_obj = _coerce_period(period)
     s, e = period_obj.to_datetimes()
+    classifier = get_classifier(config)
+    quality = QualityReport()
 
-    # Filter tests within the period by resulted_at or received_at if missing
-    tests_in_period: List[Dict[str, Any]] = []
-    for t in tests:
-        ended = _parse_dt(t.get("resulted_at"))
-        started = _parse_dt(t.get("received_at")) or _parse_dt(t.get("collected_at"))
-        timestamp = ended or started
-        if _within_period(timestamp, s, e):
-            tests_in_period.append(t)
+    from .batch import TestBatch
 
-    # --- Volumes (CYTO-only indicators) ---
-    cyto_total = 0
+    if history is not None and not len(tests):
+        with prof.stage("history_load"):
+            tests = history.batch(s, e)
+    if isinstance(tests, TestBatch):
+        # Columnar input: timestamps/categories/case ids were parsed when the batch was built
+        with prof.stage("filter_period"):
+            rows = tests.rows_in_range(s, e)
+        quality.merge(tests.quality)
+        quality.rows_in_period += len(rows)
+        prof.parse_failure("timestamp", quality.count(REASON_TIMESTAMP_UNPARSEABLE))
+        prof.count("tests", len(tests))
+        prof.count("tests_in_period", len(rows))
+        case_index: Optional[CaseIndex] = None
+        groups = CategoryVolumes(classifier, level)
+        if level == "case":
+            with prof.stage("case_rollup"):
+                case_index = tests.case_index(rows, classifier, groups, quality)
+                cyto_total = case_index.count(CASE_CYTO)
+                tat_values = case_index.case_tats()
+            prof.count("cases", len(case_index))
+            total_volume = len(case_index)
+        else:
+            with prof.stage("volume_and_tat"):
+                cyto_total, tat_values = tests.volume_and_tat(rows, classifier, groups, quality)
+            prof.parse_failure("tat", len(rows) - len(tat_values))
+            total_volume = len(rows)
+        prof.count("tat_values", len(tat_values))
+    else:
+        cyto_total, total_volume, tat_values, case_index, groups = _aggregate_records(
+            tests, s, e, level, prof, classifier, quality
+        )
 
-    tat_values: List[float] = []
+    # --- Percent change MoM/YoY inputs (based on total volume) ---
+    # Define previous periods
+    ps, pe = s, e
+    prev_month_s = _month_delta(ps, -1)
+    prev_month_e = _month_delta(pe, -1)
+    prev_year_s = _year_delta(ps, -1)
+    prev_year_e = _year_delta(pe, -1)
 
-    for t in tests_in_period:
-        cat, _ = _classify_test(t)
-        if cat == "CYTO":
-            cyto_total += 1
-        # TAT
-        tat = _tat_hours(t)
-        if tat is not None:
-            tat_values.append(tat)
+    def _count_in_range(_s: datetime, _e: datetime) -> int:
+        if history is not None and history.covers(_s, _e):
+            return history.count_in_range(_s, _e, level)
+        if isinstance(tests, TestBatch):
+            return tests.count_in_range(_s, _e, level)
+        if level == "case":
+            keys = set()
+            for t in tests:
+                if _within_period(_record_timestamp(t), _s, _e):
+                    k = normalize_case_no(t)
+                    if k:
+                        keys.add(k)
+            return len(keys)
+        cnt = 0
+        for t in tests:
+            if _within_period(_record_timestamp(t), _s, _e):
+                cnt += 1
+        return cnt
+
+    with prof.stage("mom_yoy"):
+        prev_month_total = _count_in_range(prev_month_s, prev_month_e)
+        prev_year_total = _count_in_range(prev_year_s, prev_year_e)
+
+    # --- Productivity hours ---
+    total_hours = None
+    if productivity:
+        with prof.stage("productivity"):
+            total_hours = _sum_hours_productivity(productivity, s, e)
+        prof.count("productivity", len(productivity))
+
+    return KPIAggregate(
+        period=period_obj,
+        level=level,
+        cyto_total=cyto_total,
+        total_volume=total_volume,
+        tat_count=len(tat_values),
+        tat_sum=sum(tat_values),
+        tat_min=min(tat_values) if tat_values else None,
+        tat_max=max(tat_values) if tat_values else None,
+        prev_month_total=prev_month_total,
+        prev_year_total=prev_year_total,
+        total_hours=total_hours,
+        hours_per_fte_day=_hours_per_fte_day(config),
+        case_index=case_index,
+        categories=groups.to_dict(),
+        quality=quality,
+    )
+
+
+def _pct_change(current: int, previous: Optional[int]) -> Optional[float]:
+    if previous is None or previous == 0:
+        return None
+    return (current - previous) * 100.0 / previous
+
+
+def _group_metrics(config: Dict[str, Any], raw: Dict[str, Any], thresholds: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    avg = raw["tat_sum"] / raw["tat_count"] if raw["tat_count"] else None
+    out: Dict[str, Any] = {"total": raw["total"]}
+    if thresholds:
+        out["status"] = _volume_status({"kpis": {"_group": {"thresholds": thresholds}}}, raw["total"], "_group")
+    out["tat"] = {
+        "count": raw["tat_count"],
+        "avg_hours": avg,
+        "min_hours": raw["tat_min"],
+        "max_hours": raw["tat_max"],
+        "status": _tat_status(config, avg),
+    }
+    return out
+
+
+def _category_metrics(config: Dict[str, Any], categories: Dict[str, Any]) -> Dict[str, Any]:
+    """Render CategoryVolumes sums with volume statuses (classification thresholds) and TAT statuses."""
+    thresholds = get_classifier(config).thresholds
+    out: Dict[str, Any] = {}
+    for cat, raw in categories.items():
+        entry = _group_metrics(config, raw, thresholds.get(cat))
+        if "subtypes" in raw:
+            entry["subtypes"] = {sub: _group_metrics(config, v, None) for sub, v in raw["subtypes"].items()}
+            entry["unspecified_subtype"] = raw["unspecified_subtype"]
+        out[cat] = entry
+    return out
 
-    # Total volume counts all tests in period (not category-specific)
-    total_volume = len(tests_in_period)
 
+def build_kpi_result(config: Dict[str, Any], agg: KPIAggregate) -> Dict[str, Any]:
+    """Evaluate thresholds for an aggregate and build the /kpi/compute metrics dict."""
     # --- Threshold evaluation helpers ---
     def volume_status(value: int, k: str) -> str:
-        th = (config.get("kpis", {}).get(k, {}).get("thresholds") or {})
-        warn = th.get("warning")
-        crit = th.get("critical")
-        if crit is not None and value <= crit:
-            return "critical"
-        if warn is not None and value <= warn:
-            return "warning"
-        return "ok"
+        return _volume_status(config, value, k)
 
     def tat_status(avg_hours: Optional[float]) -> str:
-        th = (config.get("kpis", {}).get("tat", {}).get("thresholds") or {})
-        warn = th.get("warning")
-        crit = th.get("critical")
-        if avg_hours is None:
-            return "unknown"
-        if crit is not None and avg_hours >= float(crit):
-            return "critical"
-        if warn is not None and avg_hours >= float(warn):
-            return "warning"
-        return "ok"
+        return _tat_status(config, avg_hours)
 
     # --- TAT aggregates ---
     tat_agg = None
-    if tat_values:
-        tat_min = min(tat_values)
-        tat_max = max(tat_values)
-        tat_avg = sum(tat_values) / len(tat_values)
+    if agg.tat_count:
+        tat_avg = agg.tat_avg
         tat_agg = {
-            "count": len(tat_values),
-            "min_hours": tat_min,
-            "max_hours": tat_max,
+            "count": agg.tat_count,
+            "min_hours": agg.tat_min,
+            "max_hours": agg.tat_max,
             "avg_hours": tat_avg,
             "status": tat_status(tat_avg),
         }
@@ -210,65 +724,37 @@ def compute_kpis(
             "status": "unknown",
         }
 
-    # --- Percent change MoM/YoY (based on total volume) ---
-    # Define previous periods
-    ps, pe = s, e
-    prev_month_s = _month_delta(ps, -1)
-    prev_month_e = _month_delta(pe, -1)
-    prev_year_s = ps.replace(year=ps.year - 1)
-    prev_year_e = pe.replace(year=pe.year - 1)
-
-    def _count_in_range(_s: datetime, _e: datetime) -> int:
-        cnt = 0
-        for t in tests:
-            ended = _parse_dt(t.get("resulted_at"))
-            started = _parse_dt(t.get("received_at")) or _parse_dt(t.get("collected_at"))
-            timestamp = ended or started
-            if _within_period(timestamp, _s, _e):
-                cnt += 1
-        return cnt
-
-    prev_month_total = _count_in_range(prev_month_s, prev_month_e)
-    prev_year_total = _count_in_range(prev_year_s, prev_year_e)
-
-    def pct_change(current: int, previous: int) -> Optional[float]:
-        if previous is None or previous == 0:
-            return None
-        return (current - previous) * 100.0 / previous
-
-    mom = pct_change(total_volume, prev_month_total) if prev_month_total is not None else None
-    yoy = pct_change(total_volume, prev_year_total) if prev_year_total is not None else None
+    mom = _pct_change(agg.total_volume, agg.prev_month_total)
+    yoy = _pct_change(agg.total_volume, agg.prev_year_total)
 
     # --- Tests per FTE ---
     tests_per_fte = None
     fte_equivalents = None
-    total_hours = None
-    tpf_cfg = config.get("kpis", {}).get("tests_per_fte", {}) or {}
-    fte_hours_per_day = tpf_cfg.get("hours_per_fte_day", tpf_cfg.get("baseline_per_fte_per_day", 8))
-    if productivity:
-        total_hours = _sum_hours_productivity(productivity, s, e)
-        if total_hours and fte_hours_per_day:
-            fte_equivalents = total_hours / float(fte_hours_per_day)
-            if fte_equivalents > 0:
-                tests_per_fte = total_volume / fte_equivalents
+    total_hours = agg.total_hours
+    fte_hours_per_day = agg.hours_per_fte_day
+    if total_hours and fte_hours_per_day:
+        fte_equivalents = total_hours / float(fte_hours_per_day)
+        if fte_equivalents > 0:
+            tests_per_fte = agg.total_volume / fte_equivalents
 
     # --- Build result ---
     result = {
         "meta": {
-            "period": {"start_date": period_obj.start_date, "end_date": period_obj.end_date},
+            "period": {"start_date": agg.period.start_date, "end_date": agg.period.end_date},
             "generatedAt": datetime.utcnow().isoformat() + "Z",
             "config_version": config.get("metadata", {}).get("version"),
+            "level": agg.level,
         },
         "metrics": {
             "cytogenetics_total_volume": {
-                "total": cyto_total,
-                "status": volume_status(cyto_total, "cytogenetics_total_volume"),
+                "total": agg.cyto_total,
+                "status": volume_status(agg.cyto_total, "cytogenetics_total_volume"),
             },
-            "total_volume": {"total": total_volume},
+            "total_volume": {"total": agg.total_volume},
             "tat": tat_agg,
             "percent_change": {"mom": mom, "yoy": yoy},
             "tests_per_fte": {
-                "tests": total_volume,
+                "tests": agg.total_volume,
                 "total_hours": total_hours,
                 "fte_equivalents": fte_equivalents,
                 "hours_per_fte_day": fte_hours_per_day,
@@ -277,6 +763,47 @@ def compute_kpis(
         },
     }
 
+    if agg.categories is not None:
+        result["metrics"]["categories"] = _category_metrics(config, agg.categories)
+
+    if agg.quality is not None:
+        result["data_quality"] = agg.quality.to_dict()
+
+    if agg.case_index is not None:
+        tat_th = config.get("kpis", {}).get("tat", {}).get("thresholds") or {}
+        std = tat_th.get("standard")
+        result["metrics"]["cases"] = agg.case_index.summary(float(std) if std is not None else None)
+
+    return result
+
+
+def compute_kpis(
+    config: Dict[str, Any],
+    period: Any,
+    tests: List[Dict[str, Any]],
+    productivity: Optional[List[Dict[str, Any]]] = None,
+    profiler: Optional[KPIProfiler] = None,
+    level: str = "row",
+    history: Optional["HistoryStore"] = None,
+) -> Dict[str, Any]:
+    """
+    Compute KPIs for the provided period and input data.
+
+    Inputs are as for aggregate_kpis. Aggregation and threshold evaluation are
+    separate steps (aggregate_kpis + build_kpi_result) so aggregates can be
+    cached and re-scored against other thresholds (see app.kpi.evaluate).
+
+    Returns a dict with metrics and statuses.
+    """
+    prof = profiler or NULL_PROFILER
+    agg = aggregate_kpis(
+        config, period, tests, productivity=productivity, profiler=profiler, level=level, history=history
+    )
+    with prof.stage("evaluate"):
+        result = build_kpi_result(config, agg)
+    period_obj = agg.period
+    cyto_total = agg.cyto_total
+
     # Logging & Monitoring: emit warnings/errors for threshold breaches (no PHI)
     try:
         cyto_status = result["metrics"]["cytogenetics_total_volume"]["status"]
@@ -307,4 +834,192 @@ def compute_kpis(
         # Never fail KPI compute due to logging issues
         pass
 
+    if prof.enabled:
+        result["meta"]["profile"] = prof.to_dict()
+
     return result
+
+
+def _fte_row(key: Any, tests: float, hours: Optional[float], hours_per_fte_day: Any) -> Dict[str, Any]:
+    fte = None
+    value = None
+    if hours and hours_per_fte_day:
+        fte = hours / float(hours_per_fte_day)
+        if fte > 0:
+            value = tests / fte
+    return {
+        "key": key,
+        "tests": tests,
+        "total_hours": hours,
+        "fte_equivalents": fte,
+        "value": value,
+    }
+
+
+def tests_per_fte_breakdown(
+    config: Dict[str, Any],
+    period: Any,
+    tests: List[Dict[str, Any]],
+    productivity: Any,
+    by: str = "staff",
+    groups: Optional[Mapping[str, str]] = None,
+) -> Dict[str, Any]:
+    """
+    Tests per FTE broken down by staff member, day or arbitrary staff group.
+
+    Inputs:
+      - productivity: list of productivity entries or a prebuilt ProductivityIndex
+      - by: "staff" | "day" | "group"
+      - groups: staff_id -> group name (required for by="group")
+
+    Tests are credited to staff via staff_id, else analyzed_techs/analyzed_by matched
+    against productivity staff_id or staff_name; a test analyzed by several techs is
+    split evenly between them. Uncredited tests are reported under "unassigned".
+    """
+    if by not in {"staff", "day", "group"}:
+        raise ValueError("by must be one of: staff, day, group")
+    if by == "group" and not groups:
+        raise ValueError("groups mapping (staff_id -> group) is required for by=group")
+
+    period_obj = _coerce_period(period)
+    s, e = period_obj.to_datetimes()
+    sd, ed = s.date(), e.date()
+    index = productivity if isinstance(productivity, ProductivityIndex) else ProductivityIndex(productivity or [])
+    hours_per_fte_day = _hours_per_fte_day(config)
+
+    counts: Dict[Any, float] = {}
+    in_period = 0
+    for t in tests:
+        ts = _record_timestamp(t)
+        if not _within_period(ts, s, e):
+            continue
+        in_period += 1
+        if by == "day":
+            d = ts.date()  # type: ignore[union-attr]
+            counts[d] = counts.get(d, 0.0) + 1
+            continue
+        # Split across every credited tech; shares of techs that do not resolve go to UNASSIGNED_STAFF
+        staff = [index.resolve_staff(k) or UNASSIGNED_STAFF for k in _test_staff_keys(t)] or [UNASSIGNED_STAFF]
+        share = 1.0 / len(staff)
+        for sid in staff:
+            key = groups.get(sid, UNASSIGNED_STAFF) if by == "group" and groups else sid
+            counts[key] = counts.get(key, 0.0) + share
+
+    hours: Dict[Any, float]
+    if by == "day":
+        hours = dict(index.hours_by_day(sd, ed))
+    elif by == "group":
+        hours = index.hours_by_group(sd, ed, groups or {})
+    else:
+        hours = index.hours_by_staff(sd, ed)
+
+    keys = sorted(set(counts) | set(hours), key=str)
+    rows = []
+    for k in keys:
+        row = _fte_row(k.isoformat() if isinstance(k, date) else k, counts.get(k, 0.0), hours.get(k), hours_per_fte_day)
+        rows.append(row)
+
+    return {
+        "meta": {
+            "period": {"start_date": period_obj.start_date, "end_date": period_obj.end_date},
+            "generatedAt": datetime.utcnow().isoformat() + "Z",
+            "config_version": config.get("metadata", {}).get("version"),
+            "by": by,
+            "hours_per_fte_day": hours_per_fte_day,
+        },
+        "rows": rows,
+        "totals": _fte_row("total", in_period, index.total_hours(sd, ed), hours_per_fte_day),
+    }
+
+
+def _series_point(tests: int, hours: float, hours_per_fte_day: Any) -> Dict[str, Any]:
+    row = _fte_row(None, tests, hours if hours else None, hours_per_fte_day)
+    row.pop("key")
+    row["hours_status"] = "ok" if hours else "missing"
+    return row
+
+
+def tests_per_fte_series(
+    config: Dict[str, Any],
+    period: Any,
+    tests: List[Dict[str, Any]],
+    productivity: Any,
+    granularity: str = "daily",
+) -> Dict[str, Any]:
+    """
+    Daily or weekly tests-per-FTE series for a period.
+
+    Per-day test counts (bucketed by day offset, so already in date order) are
+    sort-merge joined with the ProductivityIndex's sorted per-day hours in
+    O(days + hour-days). Every day/week in the period is emitted; when no hours
+    were logged, total_hours/fte_equivalents/value are null and hours_status is
+    "missing". Weeks start on Monday; weeks cut by the period bounds are marked partial.
+    hours_per_fte_day comes from kpis.tests_per_fte in the config.
+    """
+    if granularity not in {"daily", "weekly"}:
+        raise ValueError("granularity must be one of: daily, weekly")
+
+    period_obj = _coerce_period(period)
+    s, e = period_obj.to_datetimes()
+    start_ord, end_ord = s.date().toordinal(), e.date().toordinal()
+    n_days = end_ord - start_ord + 1
+    index = productivity if isinstance(productivity, ProductivityIndex) else ProductivityIndex(productivity or [])
+    hours_per_fte_day = _hours_per_fte_day(config)
+
+    day_tests = [0] * n_days
+    for t in tests:
+        ts = _record_timestamp(t)
+        if _within_period(ts, s, e):
+            day_tests[ts.toordinal() - start_ord] += 1  # type: ignore[union-attr]
+
+    # Merge: both sides are ordered by day
+    day_hours = index.hours_by_day(s.date(), e.date())
+    merged: List[Tuple[int, int, float]] = []
+    j = 0
+    for i in range(n_days):
+        ordinal = start_ord + i
+        hours = 0.0
+        while j < len(day_hours) and day_hours[j][0].toordinal() < ordinal:
+            j += 1
+        if j < len(day_hours) and day_hours[j][0].toordinal() == ordinal:
+            hours = day_hours[j][1]
+            j += 1
+        merged.append((ordinal, day_tests[i], hours))
+
+    points: List[Dict[str, Any]] = []
+    if granularity == "daily":
+        for ordinal, cnt, hours in merged:
+            p = {"date": date.fromordinal(ordinal).isoformat()}
+            p.update(_series_point(cnt, hours, hours_per_fte_day))
+            points.append(p)
+    else:
+        week_start = None
+        w_tests, w_hours, w_days = 0, 0.0, 0
+        for ordinal, cnt, hours in merged + [(None, 0, 0.0)]:  # sentinel flushes the last week
+            ws = None if ordinal is None else ordinal - date.fromordinal(ordinal).weekday()
+            if week_start is not None and ws != week_start:
+                p = {
+                    "week_start": date.fromordinal(week_start).isoformat(),
+                    "week_end": date.fromordinal(week_start + 6).isoformat(),
+                    "days": w_days,
+                    "partial": w_days < 7,
+                }
+                p.update(_series_point(w_tests, w_hours, hours_per_fte_day))
+                points.append(p)
+                w_tests, w_hours, w_days = 0, 0.0, 0
+            week_start = ws
+            w_tests += cnt
+            w_hours += hours
+            w_days += 1
+
+    return {
+        "meta": {
+            "period": {"start_date": period_obj.start_date, "end_date": period_obj.end_date},
+            "generatedAt": datetime.utcnow().isoformat() + "Z",
+            "config_version": config.get("metadata", {}).get("version"),
+            "granularity": granularity,
+            "hours_per_fte_day": hours_per_fte_day,
+            "points_without_hours": sum(1 for p in points if p["hours_status"] == "missing"),
+        },
+        "points": points,
+    }
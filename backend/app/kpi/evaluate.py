@@ -0,0 +1,267 @@
+"""What-if threshold evaluation over cached KPI aggregates.
+
+aggregate_kpis produces threshold-independent KPIAggregate objects; this module
+scores many aggregates (one per period) against many threshold sets in a single
+call. The KPI value columns are extracted and sorted once, so per-set status
+counts are a few bisects regardless of the number of periods; per-period
+statuses reuse the engine's own status functions so they always agree with
+/kpi/compute.
+
+A threshold set mirrors the `kpis` section of kpi_config.yaml and only needs the
+keys it overrides, e.g. {"name": "strict", "kpis": {"tat": {"thresholds": {"warning": 36}}}}.
+"""
+import json
+import logging
+import secrets
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from dataclasses import asdict, replace
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .engine import KPIAggregate, Period, _tat_status, _volume_status, aggregate_kpis
+
+logger = logging.getLogger(__name__)
+
+EVALUATED_KPIS = ("cytogenetics_total_volume", "tat")
+_STATUS_WEIGHTS = {"warning": 1, "critical": 2}
+
+
+def _thresholds(config: Dict[str, Any], k: str) -> Dict[str, Any]:
+    return dict((config.get("kpis", {}).get(k, {}) or {}).get("thresholds") or {})
+
+
+def resolve_thresholds(config: Dict[str, Any], threshold_set: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+    """Base config thresholds for each evaluated KPI, overridden by the set's `kpis` entries."""
+    overrides = threshold_set.get("kpis") or {}
+    if not isinstance(overrides, dict):
+        raise ValueError("threshold set 'kpis' must be an object")
+    out: Dict[str, Dict[str, Any]] = {}
+    for k in EVALUATED_KPIS:
+        th = _thresholds(config, k)
+        o = (overrides.get(k) or {}).get("thresholds") or {}
+        for name, val in o.items():
+            if val is not None:
+                try:
+                    val = float(val)
+                except (TypeError, ValueError):
+                    raise ValueError(f"threshold {k}.{name} must be numeric")
+            th[name] = val
+        out[k] = th
+    return out
+
+
+def _count_volume(sorted_vals: List[float], th: Dict[str, Any]) -> Dict[str, int]:
+    """Lower-is-worse counts: critical if v <= critical, warning if v <= warning."""
+    crit, warn = th.get("critical"), th.get("warning")
+    n_crit = bisect_right(sorted_vals, float(crit)) if crit is not None else 0
+    n_warn = max(0, bisect_right(sorted_vals, float(warn)) - n_crit) if warn is not None else 0
+    return {"ok": len(sorted_vals) - n_crit - n_warn, "warning": n_warn, "critical": n_crit}
+
+
+def _count_tat(sorted_vals: List[float], unknown: int, th: Dict[str, Any]) -> Dict[str, int]:
+    """Higher-is-worse counts: critical if avg >= critical, warning if avg >= warning."""
+    n = len(sorted_vals)
+    crit, warn = th.get("critical"), th.get("warning")
+    crit_at = bisect_left(sorted_vals, float(crit)) if crit is not None else n
+    warn_at = bisect_left(sorted_vals, float(warn)) if warn is not None else n
+    n_crit = n - crit_at
+    n_warn = max(0, crit_at - warn_at)
+    return {"ok": n - n_crit - n_warn, "warning": n_warn, "critical": n_crit, "unknown": unknown}
+
+
+def evaluate_threshold_sets(
+    config: Dict[str, Any],
+    aggregates: Sequence[KPIAggregate],
+    threshold_sets: Sequence[Dict[str, Any]],
+    include_periods: bool = True,
+) -> List[Dict[str, Any]]:
+    """
+    Score every threshold set against every aggregate.
+
+    Each result carries the resolved thresholds, status counts per KPI, the number
+    of breaches (warning + critical) and a weighted score (warning=1, critical=2;
+    lower is better). With include_periods, per-period statuses are included in
+    the order of `aggregates`.
+    """
+    cyto = [a.cyto_total for a in aggregates]
+    tat = [a.tat_avg for a in aggregates]
+    cyto_sorted = sorted(cyto)
+    tat_sorted = sorted(v for v in tat if v is not None)
+    tat_unknown = len(tat) - len(tat_sorted)
+
+    results: List[Dict[str, Any]] = []
+    for i, ts in enumerate(threshold_sets):
+        th = resolve_thresholds(config, ts)
+        counts = {
+            "cytogenetics_total_volume": _count_volume(cyto_sorted, th["cytogenetics_total_volume"]),
+            "tat": _count_tat(tat_sorted, tat_unknown, th["tat"]),
+        }
+        breaches = sum(c["warning"] + c["critical"] for c in counts.values())
+        score = sum(c[s] * w for c in counts.values() for s, w in _STATUS_WEIGHTS.items())
+        res: Dict[str, Any] = {
+            "name": ts.get("name") or f"set_{i + 1}",
+            "thresholds": th,
+            "counts": counts,
+            "breaches": breaches,
+            "score": score,
+        }
+        if include_periods:
+            cfg = {"kpis": {k: {"thresholds": v} for k, v in th.items()}}
+            res["periods"] = [
+                {
+                    "start_date": a.period.start_date,
+                    "end_date": a.period.end_date,
+                    "cytogenetics_total_volume": _volume_status(cfg, c, "cytogenetics_total_volume"),
+                    "tat": _tat_status(cfg, t),
+                }
+                for a, c, t in zip(aggregates, cyto, tat)
+            ]
+        results.append(res)
+    return results
+
+
+def aggregate_periods(
+    config: Dict[str, Any],
+    periods: Sequence[Any],
+    tests: List[Dict[str, Any]],
+    productivity: Optional[List[Dict[str, Any]]] = None,
+    level: str = "row",
+) -> List[KPIAggregate]:
+    """aggregate_kpis for each period, in order."""
+    return [aggregate_kpis(config, p, tests, productivity=productivity, level=level) for p in periods]
+
+
+class AggregateCache:
+    """
+    Small thread-safe LRU of aggregate lists keyed by an opaque token, with a TTL.
+
+    With shared state enabled entries are also written to its result cache as
+    JSON, so an aggregate_key issued by one worker resolves on every other
+    worker. The shared copy leaves out case_index and quality (per-case keys,
+    not used by what-if); an entry that no longer matches KPIAggregate (e.g.
+    after a deploy) is treated as a miss.
+    """
+
+    def __init__(self, capacity: int = 32, ttl_s: float = 900.0) -> None:
+        self.capacity = capacity
+        self.ttl_s = ttl_s
+        self._items: "OrderedDict[str, Tuple[float, List[KPIAggregate]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, aggregates: List[KPIAggregate]) -> str:
+        key = secrets.token_hex(8)
+        self._put_local(key, aggregates)
+        state = _shared_state()
+        if state is not None:
+            try:
+                state.cache_put(f"whatif:{key}", _dump_aggregates(aggregates), self.ttl_s)
+            except Exception as e:
+                logger.warning("Failed to share what-if aggregates: %s", e)
+        return key
+
+    def _put_local(self, key: str, aggregates: List[KPIAggregate]) -> None:
+        with self._lock:
+            self._items[key] = (time.monotonic(), aggregates)
+            while len(self._items) > self.capacity:
+                self._items.popitem(last=False)
+
+    def get(self, key: str) -> Optional[List[KPIAggregate]]:
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None and time.monotonic() - item[0] > self.ttl_s:
+                del self._items[key]
+                item = None
+            if item is not None:
+                self._items.move_to_end(key)
+                return item[1]
+        state = _shared_state()
+        if state is None:
+            return None
+        try:
+            raw = state.cache_get(f"whatif:{key}")
+        except Exception as e:
+            logger.warning("Failed to read shared what-if aggregates: %s", e)
+            return None
+        if raw is None:
+            return None
+        try:
+            aggregates = _load_aggregates(raw)
+        except (TypeError, ValueError, KeyError) as e:
+            logger.warning("Ignoring unreadable shared what-if aggregates: %s", type(e).__name__)
+            return None
+        self._put_local(key, aggregates)
+        return aggregates
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+def _dump_aggregates(aggregates: List[KPIAggregate]) -> bytes:
+    rows = [asdict(replace(a, case_index=None, quality=None)) for a in aggregates]
+    return json.dumps(rows, separators=(",", ":")).encode("utf-8")
+
+
+def _load_aggregates(raw: bytes) -> List[KPIAggregate]:
+    return [KPIAggregate(**{**d, "period": Period(**d["period"])}) for d in json.loads(raw)]
+
+
+def _shared_state():
+    from app.core.shared_state import get_shared_state
+
+    return get_shared_state()
+
+
+aggregate_cache = AggregateCache()
+
+
+def what_if(
+    config: Dict[str, Any],
+    threshold_sets: Sequence[Dict[str, Any]],
+    periods: Optional[Sequence[Any]] = None,
+    tests: Optional[List[Dict[str, Any]]] = None,
+    productivity: Optional[List[Dict[str, Any]]] = None,
+    level: str = "row",
+    aggregate_key: Optional[str] = None,
+    include_periods: bool = True,
+    cache: AggregateCache = aggregate_cache,
+) -> Dict[str, Any]:
+    """
+    Evaluate threshold sets over aggregates for `periods`.
+
+    Aggregates are looked up by `aggregate_key` when given; otherwise they are
+    built from tests (+ productivity) and cached, and the new key is returned in
+    meta so follow-up what-if calls can skip re-aggregation. The configured
+    thresholds are always evaluated first under the name "current".
+    """
+    cached = False
+    aggregates: Optional[List[KPIAggregate]] = None
+    if aggregate_key:
+        aggregates = cache.get(aggregate_key)
+        if aggregates is None:
+            raise ValueError("aggregate_key not found or expired; resend periods and tests")
+        cached = True
+    else:
+        if not periods:
+            raise ValueError("periods are required when aggregate_key is not given")
+        aggregates = aggregate_periods(config, periods, tests or [], productivity=productivity, level=level)
+        aggregate_key = cache.put(aggregates)
+
+    sets = [{"name": "current", "kpis": {}}] + [
+        dict(ts, name=ts.get("name") or f"set_{i + 1}") for i, ts in enumerate(threshold_sets)
+    ]
+    return {
+        "meta": {
+            "generatedAt": datetime.utcnow().isoformat() + "Z",
+            "config_version": config.get("metadata", {}).get("version"),
+            "aggregate_key": aggregate_key,
+            "cached": cached,
+            "level": aggregates[0].level if aggregates else level,
+            "periods": len(aggregates),
+            "threshold_sets": len(sets),
+        },
+        "results": evaluate_threshold_sets(config, aggregates, sets, include_periods=include_periods),
+    }
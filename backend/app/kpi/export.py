@@ -0,0 +1,200 @@
+"""Multi-period KPI report export (CSV / XLSX), streamed row by row.
+
+export_rows validates the request up front and returns a generator that yields
+the header row immediately; the single pass over the records that builds the
+per-day aggregates runs when the second row is requested, and every period row
+is then a prefix-sum difference (DailyAggregates / ProductivityIndex), so memory
+is bounded by days x staff rather than by the number of rows exported. The API
+drains it on the compute pool and streams only the CSV/XLSX encoding.
+
+Reports:
+- monthly: one row per calendar month (clipped to the range) with volume, CYTO
+  volume and status, TAT and status, MoM/YoY % change and tests per FTE --
+  row-level figures, as /kpi/compute with level=row gives for that month
+- tech: one row per month and staff_id with credited tests, hours and tests per
+  FTE, credited as in /kpi/tests-per-fte/breakdown (staff_id only, no names)
+"""
+import csv
+import io
+from array import array
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .classification import get_classifier
+from .daily import DailyAggregates
+from .engine import (
+    _hours_per_fte_day,
+    _month_delta,
+    _pct_change,
+    _record_timestamp,
+    _tat_status,
+    _test_staff_keys,
+    _volume_status,
+    _year_delta,
+)
+from .productivity import UNASSIGNED_STAFF, ProductivityIndex
+
+EXPORT_REPORTS = ("monthly", "tech")
+EXPORT_FORMATS = ("csv", "xlsx")
+MAX_EXPORT_SPAN_DAYS = 366 * 10
+
+MONTHLY_COLUMNS = [
+    "month", "start_date", "end_date", "total_volume", "cyto_volume", "cyto_status",
+    "tat_count", "avg_tat_hours", "tat_status", "mom_pct", "yoy_pct",
+    "total_hours", "fte_equivalents", "tests_per_fte",
+]
+TECH_COLUMNS = ["month", "staff_id", "tests", "total_hours", "fte_equivalents", "tests_per_fte"]
+
+_CSV_FLUSH_ROWS = 200
+_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _round(val: Optional[float], ndigits: int = 2) -> Optional[float]:
+    return None if val is None else round(val, ndigits)
+
+
+def month_periods(start: date, end: date) -> Iterator[Tuple[date, date]]:
+    """Calendar months overlapping [start, end], clipped to the range."""
+    cur = start
+    while cur <= end:
+        next_month = _month_delta(cur.replace(day=1), 1)
+        last = min(end, next_month - timedelta(days=1))  # type: ignore[operator]
+        yield cur, last
+        cur = next_month  # type: ignore[assignment]
+
+
+def _fte(tests: float, hours: Optional[float], hours_per_fte_day: Any) -> Tuple[Optional[float], Optional[float]]:
+    if hours and hours_per_fte_day:
+        fte = hours / float(hours_per_fte_day)
+        if fte > 0:
+            return fte, tests / fte
+    return None, None
+
+
+def _monthly_rows(
+    config: Dict[str, Any],
+    start: date,
+    end: date,
+    tests: Iterable[Dict[str, Any]],
+    productivity: Optional[List[Dict[str, Any]]],
+) -> Iterator[List[Any]]:
+    # One pass covers the range plus the year before it (MoM/YoY comparisons)
+    agg = DailyAggregates.from_tests(tests, _year_delta(start, -1), end, classifier=get_classifier(config))  # type: ignore[arg-type]
+    index = ProductivityIndex(productivity) if productivity else None
+    hours_per_fte_day = _hours_per_fte_day(config)
+    for ms, me in month_periods(start, end):
+        sums = agg.range_sums(ms, me)
+        prev_month = agg.range_sums(_month_delta(ms, -1), _month_delta(me, -1))  # type: ignore[arg-type]
+        prev_year = agg.range_sums(_year_delta(ms, -1), _year_delta(me, -1))  # type: ignore[arg-type]
+        avg_tat = sums["tat_sum"] / sums["tat_count"] if sums["tat_count"] else None
+        hours = index.total_hours(ms, me) if index is not None else None
+        fte, per_fte = _fte(sums["volume"], hours, hours_per_fte_day)
+        yield [
+            ms.strftime("%Y-%m"),
+            ms.isoformat(),
+            me.isoformat(),
+            sums["volume"],
+            sums["cyto"],
+            _volume_status(config, sums["cyto"], "cytogenetics_total_volume"),
+            sums["tat_count"],
+            _round(avg_tat),
+            _tat_status(config, avg_tat),
+            _round(_pct_change(sums["volume"], prev_month["volume"])),
+            _round(_pct_change(sums["volume"], prev_year["volume"])),
+            _round(hours),
+            _round(fte),
+            _round(per_fte),
+        ]
+
+
+def _tech_rows(
+    config: Dict[str, Any],
+    start: date,
+    end: date,
+    tests: Iterable[Dict[str, Any]],
+    productivity: Optional[List[Dict[str, Any]]],
+) -> Iterator[List[Any]]:
+    index = ProductivityIndex(productivity or [])
+    hours_per_fte_day = _hours_per_fte_day(config)
+    n_days = (end - start).days + 1
+    credits: Dict[str, array] = {}
+    resolved: Dict[str, Optional[str]] = {}
+    for t in tests:
+        ts = _record_timestamp(t)
+        if ts is None:
+            continue
+        i = (ts.date() - start).days
+        if i < 0 or i >= n_days:
+            continue
+        staff: List[str] = []
+        for k in _test_staff_keys(t):
+            if k not in resolved:
+                resolved[k] = index.resolve_staff(k)
+            staff.append(resolved[k] or UNASSIGNED_STAFF)
+        staff = staff or [UNASSIGNED_STAFF]
+        share = 1.0 / len(staff)
+        for sid in staff:
+            col = credits.get(sid)
+            if col is None:
+                col = credits[sid] = array("d", bytes(8 * n_days))
+            col[i] += share
+    for ms, me in month_periods(start, end):
+        lo, hi = (ms - start).days, (me - start).days + 1
+        hours = index.hours_by_staff(ms, me)
+        month_tests = {sid: sum(col[lo:hi]) for sid, col in credits.items()}
+        for sid in sorted({k for k, v in month_tests.items() if v} | set(hours)):
+            n = month_tests.get(sid, 0.0)
+            h = hours.get(sid)
+            fte, per_fte = _fte(n, h, hours_per_fte_day)
+            yield [ms.strftime("%Y-%m"), sid, _round(n), _round(h), _round(fte), _round(per_fte)]
+
+
+def export_rows(
+    config: Dict[str, Any],
+    report: str,
+    start: date,
+    end: date,
+    tests: Iterable[Dict[str, Any]],
+    productivity: Optional[List[Dict[str, Any]]] = None,
+) -> Iterator[List[Any]]:
+    """
+    Header row followed by one row per month (monthly) or per month and staff
+    member (tech) for the inclusive [start, end]. Arguments are validated
+    before the generator is returned, so errors surface as ValueError here
+    rather than mid-stream.
+    """
+    if report not in EXPORT_REPORTS:
+        raise ValueError(f"report must be one of: {', '.join(EXPORT_REPORTS)}")
+    if end < start:
+        raise ValueError("end_date must be on/after start_date")
+    if (end - start).days + 1 > MAX_EXPORT_SPAN_DAYS:
+        raise ValueError(f"export range must be at most {MAX_EXPORT_SPAN_DAYS} days")
+    columns = MONTHLY_COLUMNS if report == "monthly" else TECH_COLUMNS
+    body = _monthly_rows if report == "monthly" else _tech_rows
+
+    def gen() -> Iterator[List[Any]]:
+        yield list(columns)
+        yield from body(config, start, end, tests, productivity)
+
+    return gen()
+
+
+def _csv_safe(val: Any) -> Any:
+    # Spreadsheet formula injection: text cells must not start with a formula character
+    if isinstance(val, str) and val.startswith(_FORMULA_PREFIXES):
+        return "'" + val
+    return val
+
+
+def iter_csv(rows: Iterable[Sequence[Any]], flush_rows: int = _CSV_FLUSH_ROWS) -> Iterator[bytes]:
+    """Encode rows as UTF-8 CSV; the first chunk (header) is yielded on its own."""
+    buf = io.StringIO()
+    writer = csv.writer(buf, lineterminator="\r\n")
+    for i, row in enumerate(rows):
+        writer.writerow([_csv_safe(v) for v in row])
+        if i == 0 or i % flush_rows == 0:
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate()
+    if buf.tell():
+        yield buf.getvalue().encode("utf-8")
@@ -0,0 +1,402 @@
+"""Columnar test history on local disk, partitioned by month.
+
+HistoryStore keeps parsed test records (TestBatch columns) under HISTORY_PATH:
+
+    <root>/2025-03/partition.json   row count, category/subtype tables, content hash
+    <root>/2025-03/cases.json       case tokens (read only when case keys are needed)
+    <root>/2025-03/ts_us.npy ...    one .npy file per TestBatch column
+
+Rows are sorted by ts_us within a partition and the .npy files are
+memory-mapped on first use (app.core.npy), so counting a prior-year period is
+two bisects over pages the OS reads on demand: no JSON/CSV parsing, no copy.
+A single-month batch wraps the mapped columns directly (TestBatch.from_buffers).
+
+A month is written whole: ingesting records for a month replaces its partition
+(built in a temp directory, then swapped in), and months whose content hash is
+unchanged are skipped. Only months the input fully covers are written: the
+input is taken to be complete for [since, until) (by default from its earliest
+timestamp to the end of the last month before its latest one), and a month
+that starts before `since` or ends after `until` is reported as partial, with
+the reason, and left as stored, so a rolling-window fetch never replaces a
+stored month with its tail. Rows without a usable timestamp are not stored; they
+never fall in a period. Case numbers are stored as truncated SHA-256 tokens,
+which is enough for distinct counts; no other record fields are kept.
+
+aggregate_kpis / compute_kpis take `history=`: a MoM/YoY comparison period that
+stored months fully cover is counted from history, otherwise from the request's
+records; with no records at all the period itself is read from history.
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import secrets
+import shutil
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from .batch import COLUMNS, MISSING, TestBatch, to_epoch_us
+
+logger = logging.getLogger(__name__)
+
+_MONTH_RE = re.compile(r"^\d{4}-\d{2}$")
+_EPOCH = datetime(1970, 1, 1)
+PARTITION_META = "partition.json"
+PARTITION_CASES = "cases.json"
+FORMAT_VERSION = 1
+
+
+def _month_of(dt: datetime) -> str:
+    return f"{dt.year:04d}-{dt.month:02d}"
+
+
+def _next_month(dt: datetime) -> datetime:
+    return datetime(dt.year + (dt.month == 12), dt.month % 12 + 1, 1)
+
+
+def months_between(start: datetime, end: datetime) -> List[str]:
+    """Month keys ("YYYY-MM") overlapping [start, end]."""
+    out: List[str] = []
+    cur = datetime(start.year, start.month, 1)
+    while cur <= end:
+        out.append(_month_of(cur))
+        cur = _next_month(cur)
+    return out
+
+
+def _case_token(key: str) -> str:
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+
+class _Partition:
+    """One month on disk; columns are memory-mapped on first access."""
+
+    __slots__ = ("path", "stamp", "meta", "_columns", "_cases")
+
+    def __init__(self, path: Path, meta: Dict[str, Any], stamp: Tuple[int, int]) -> None:
+        self.path = path
+        self.stamp = stamp
+        self.meta = meta
+        self._columns: Dict[str, memoryview] = {}
+        self._cases: Optional[List[str]] = None
+
+    @property
+    def rows(self) -> int:
+        return self.meta["rows"]
+
+    def column(self, name: str) -> memoryview:
+        from app.core.npy import map_npy
+
+        col = self._columns.get(name)
+        if col is None:
+            col = self._columns[name] = map_npy(self.path / f"{name}.npy")
+        return col
+
+    def case_keys(self) -> List[str]:
+        if self._cases is None:
+            self._cases = json.loads((self.path / PARTITION_CASES).read_text(encoding="utf-8"))
+        return self._cases
+
+    def span(self, lo_us: int, hi_us: int) -> Tuple[int, int]:
+        """Row slice [i, j) with lo_us <= ts_us <= hi_us."""
+        ts = self.column("ts_us")
+        return bisect_left(ts, lo_us), bisect_right(ts, hi_us)
+
+
+def _remap(values: memoryview, table: List[int], typecode: str) -> Union[memoryview, array]:
+    """values mapped through table (values as-is when table is the identity; -1 stays -1)."""
+    if all(i == v for i, v in enumerate(table)):
+        return values
+    return array(typecode, [table[v] if v >= 0 else v for v in values])
+
+
+class HistoryStore:
+    def __init__(self, root: Union[str, Path]) -> None:
+        self.root = Path(root)
+        self._parts: Dict[str, _Partition] = {}
+        self._lock = threading.Lock()
+
+    # ---- reading ----
+
+    def months(self) -> List[str]:
+        if not self.root.is_dir():
+            return []
+        return sorted(
+            p.name for p in self.root.iterdir() if _MONTH_RE.match(p.name) and (p / PARTITION_META).is_file()
+        )
+
+    def partition(self, month: str) -> Optional[_Partition]:
+        """The partition for `month`, reopened when it has been rewritten since it was mapped."""
+        path = self.root / month
+        try:
+            st = (path / PARTITION_META).stat()
+        except OSError:
+            with self._lock:
+                self._parts.pop(month, None)
+            return None
+        stamp = (st.st_ino, st.st_mtime_ns)
+        with self._lock:
+            part = self._parts.get(month)
+            if part is not None and part.stamp == stamp:
+                return part
+        meta = json.loads((path / PARTITION_META).read_text(encoding="utf-8"))
+        if meta.get("format") != FORMAT_VERSION:
+            logger.warning("Ignoring history partition %s with format %s", month, meta.get("format"))
+            return None
+        part = _Partition(path, meta, stamp)
+        with self._lock:
+            self._parts[month] = part
+        return part
+
+    def covers(self, start: datetime, end: datetime) -> bool:
+        """True when every month overlapping [start, end] is stored."""
+        return all(self.partition(m) is not None for m in months_between(start, end))
+
+    def count_in_range(self, start: datetime, end: datetime, level: str = "row") -> int:
+        """Rows (or distinct cases) with ts in [start, end], read from the mapped ts_us/case_id columns."""
+        lo, hi = to_epoch_us(start), to_epoch_us(end)
+        total = 0
+        seen = set()
+        for month in months_between(start, end):
+            part = self.partition(month)
+            if part is None:
+                continue
+            i, j = part.span(lo, hi)
+            if level == "case":
+                keys = part.case_keys()
+                seen.update(keys[c] for c in part.column("case_id")[i:j] if c >= 0)
+            else:
+                total += j - i
+        return len(seen) if level == "case" else total
+
+    def batch(self, start: datetime, end: datetime) -> TestBatch:
+        """
+        TestBatch of stored rows with ts in [start, end]. A single month is a
+        zero-copy view of the mapped files; several months are concatenated
+        (category/subtype/case codes remapped to one table).
+        """
+        lo, hi = to_epoch_us(start), to_epoch_us(end)
+        slices: List[Tuple[_Partition, int, int]] = []
+        for month in months_between(start, end):
+            part = self.partition(month)
+            if part is not None:
+                i, j = part.span(lo, hi)
+                if j > i:
+                    slices.append((part, i, j))
+        if len(slices) == 1:
+            part, i, j = slices[0]
+            return TestBatch.from_buffers(
+                {c: part.column(c)[i:j] for c in COLUMNS},
+                part.meta["categories"], part.meta["subtypes"], part.case_keys(),
+            )
+        out = TestBatch()
+        for part, i, j in slices:
+            cat_table = [out._category_code(c) for c in part.meta["categories"]]
+            sub_table = [out._subtype_code(s) for s in part.meta["subtypes"]]
+            case_table = [out._case_code(k) for k in part.case_keys()]
+            for c in COLUMNS:
+                col = part.column(c)[i:j]
+                if c == "category":
+                    col = _remap(col, cat_table, "H")
+                elif c == "subtype":
+                    col = _remap(col, sub_table, "H")
+                elif c == "case_id":
+                    col = _remap(col, case_table, "i")
+                getattr(out, c).frombytes(memoryview(col).cast("B"))
+        out.quality.rows = len(out)
+        return out
+
+    def status(self) -> Dict[str, Any]:
+        months = []
+        for m in self.months():
+            part = self.partition(m)
+            if part is not None:
+                months.append({"month": m, "rows": part.rows, "written_at": part.meta.get("written_at")})
+        return {"path": str(self.root), "months": months, "rows": sum(m["rows"] for m in months)}
+
+    # ---- writing ----
+
+    def ingest(
+        self,
+        tests: Union[TestBatch, Iterable[Dict[str, Any]]],
+        months: Optional[Iterable[str]] = None,
+        before: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> Dict[str, Any]:
+        """
+        Store records by month, replacing each month of `tests` that lies
+        within [since, until), the span the input is complete for. Defaults:
+        since = the earliest timestamp, until = the start of the latest
+        timestamp's month (the end of the latest complete month; pass `until`
+        to store that month too). Other months are "partial".
+
+        months: only these months ("YYYY-MM"); before: only months earlier than
+        this one (e.g. the current month, so only closed months are stored).
+        Returns {"written", "unchanged", "partial": [{"month", "reason"}],
+        "coverage": {"since", "until"}, "rows", "skipped_rows"}.
+        """
+        batch = tests if isinstance(tests, TestBatch) else TestBatch.from_records(tests)
+        wanted = set(months) if months is not None else None
+        for m in (wanted or set()) | ({before} if before else set()):
+            if not _MONTH_RE.match(m):
+                raise ValueError(f"month must be YYYY-MM, got {m!r}")
+
+        by_month: Dict[str, List[int]] = {}
+        skipped = 0
+        ts = batch.ts_us
+        lo = hi = 0
+        key = ""
+        for i in range(len(ts)):
+            t = ts[i]
+            if t == MISSING:
+                skipped += 1
+                continue
+            if not lo <= t < hi:
+                start = _EPOCH + timedelta(microseconds=t)
+                start = datetime(start.year, start.month, 1)
+                lo, hi, key = to_epoch_us(start), to_epoch_us(_next_month(start)), _month_of(start)
+            by_month.setdefault(key, []).append(i)
+
+        valid = [t for t in ts if t != MISSING]
+        if since is None:
+            since = _EPOCH + timedelta(microseconds=min(valid, default=0))
+        if until is None:
+            latest = _EPOCH + timedelta(microseconds=max(valid, default=0))
+            until = datetime(latest.year, latest.month, 1)
+        since_us, until_us = to_epoch_us(since), to_epoch_us(until)
+
+        written: List[str] = []
+        unchanged: List[str] = []
+        partial: List[Dict[str, str]] = []
+        rows = 0
+        for month in sorted(by_month):
+            if (wanted is not None and month not in wanted) or (before and month >= before):
+                continue
+            start = datetime.strptime(month, "%Y-%m")
+            if to_epoch_us(start) < since_us:
+                partial.append({"month": month, "reason": f"input starts {since.isoformat()}, after the month starts"})
+                continue
+            if to_epoch_us(_next_month(start)) > until_us:
+                partial.append({
+                    "month": month,
+                    "reason": f"input complete until {until.isoformat()}, before the month ends (pass until)",
+                })
+                continue
+            idx = by_month[month]
+            idx.sort(key=ts.__getitem__)
+            if self._write_partition(month, batch, idx):
+                written.append(month)
+            else:
+                unchanged.append(month)
+            rows += len(idx)
+        if partial:
+            logger.info(
+                "History months not fully covered by the input, left as stored: %s",
+                ", ".join(p["month"] for p in partial),
+            )
+        return {
+            "written": written,
+            "unchanged": unchanged,
+            "partial": partial,
+            "coverage": {"since": since.isoformat(), "until": until.isoformat()},
+            "rows": rows,
+            "skipped_rows": skipped,
+        }
+
+    def _write_partition(self, month: str, batch: TestBatch, idx: List[int]) -> bool:
+        """Write one month (rows `idx` of `batch`, sorted by ts); False when its content is unchanged."""
+        categories: List[str] = []
+        cat_ids: Dict[int, int] = {}
+        subtypes: List[str] = [""]
+        sub_ids: Dict[int, int] = {0: 0}
+        cases: List[str] = []
+        case_ids: Dict[int, int] = {}
+        cols = {c: array(getattr(batch, c).typecode) for c in COLUMNS}
+        for i in idx:
+            for c in ("ts_us", "start_us", "end_us", "abn", "stat", "tat_hours"):
+                cols[c].append(getattr(batch, c)[i])
+            code = batch.category[i]
+            if code not in cat_ids:
+                cat_ids[code] = len(categories)
+                categories.append(batch.categories[code])
+            cols["category"].append(cat_ids[code])
+            code = batch.subtype[i]
+            if code not in sub_ids:
+                sub_ids[code] = len(subtypes)
+                subtypes.append(batch.subtypes[code])
+            cols["subtype"].append(sub_ids[code])
+            cid = batch.case_id[i]
+            if cid >= 0 and cid not in case_ids:
+                case_ids[cid] = len(cases)
+                cases.append(_case_token(batch.case_keys[cid]))
+            cols["case_id"].append(case_ids[cid] if cid >= 0 else -1)
+
+        h = hashlib.sha256()
+        for c in COLUMNS:
+            h.update(cols[c].tobytes())
+        h.update(json.dumps([categories, subtypes, cases]).encode("utf-8"))
+        digest = h.hexdigest()
+        current = self.partition(month)
+        if current is not None and current.meta.get("sha256") == digest:
+            return False
+
+        from app.core.npy import write_npy
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        token = f"{os.getpid()}.{secrets.token_hex(4)}"
+        tmp = self.root / f".{month}.{token}.tmp"
+        tmp.mkdir()
+        try:
+            for c in COLUMNS:
+                write_npy(tmp / f"{c}.npy", cols[c])
+            (tmp / PARTITION_CASES).write_text(json.dumps(cases), encoding="utf-8")
+            meta = {
+                "format": FORMAT_VERSION,
+                "month": month,
+                "rows": len(idx),
+                "categories": categories,
+                "subtypes": subtypes,
+                "sha256": digest,
+                "written_at": datetime.utcnow().isoformat() + "Z",
+            }
+            (tmp / PARTITION_META).write_text(json.dumps(meta), encoding="utf-8")
+            target = self.root / month
+            old = self.root / f".{month}.{token}.old"
+            if target.exists():
+                # Readers that already mapped the old files keep valid mappings
+                os.rename(target, old)
+            try:
+                os.rename(tmp, target)
+            except OSError:
+                if old.exists() and not target.exists():
+                    os.rename(old, target)
+                raise
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+            shutil.rmtree(self.root / f".{month}.{token}.old", ignore_errors=True)
+        logger.info("History partition written: month=%s rows=%s", month, len(idx))
+        return True
+
+
+_store: Optional[HistoryStore] = None
+_store_lock = threading.Lock()
+
+
+def get_history_store() -> Optional[HistoryStore]:
+    """Process-wide HistoryStore for HISTORY_PATH, or None when it is not set."""
+    global _store
+    from app.core.config import Settings
+
+    if not Settings.HISTORY_PATH:
+        return None
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = HistoryStore(Settings.HISTORY_PATH)
+    return _store
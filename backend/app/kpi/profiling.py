@@ -0,0 +1,143 @@
+"""Opt-in stage profiling for KPI computations.
+
+compute_kpis accepts an optional profiler. When none is given the shared
+NULL_PROFILER is used: every hook is a no-op, so the default path only pays for
+a few attribute lookups per request.
+
+cProfile runs are serialized: only one profiler can be active per process
+(Python 3.12+ rejects a second one), so a sampled call made while another is
+being profiled raises ProfilerBusy instead of profiling.
+"""
+import cProfile
+import io
+import pstats
+import random
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+
+class KPIProfiler:
+    """Collect per-stage wall time, record counts and parse-failure counts."""
+
+    enabled = True
+
+    def __init__(self) -> None:
+        self._stages: Dict[str, float] = {}
+        self._order: List[str] = []
+        self._counts: Dict[str, int] = {}
+        self._parse_failures: Dict[str, int] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - t0
+            if name not in self._stages:
+                self._order.append(name)
+                self._stages[name] = 0.0
+            self._stages[name] += elapsed
+
+    def count(self, name: str, value: int) -> None:
+        self._counts[name] = self._counts.get(name, 0) + int(value)
+
+    def parse_failure(self, field: str, n: int = 1) -> None:
+        if n:
+            self._parse_failures[field] = self._parse_failures.get(field, 0) + int(n)
+
+    def to_dict(self) -> Dict[str, Any]:
+        stages = [{"name": n, "wall_ms": round(self._stages[n] * 1000.0, 3)} for n in self._order]
+        return {
+            "stages": stages,
+            "total_ms": round(sum(self._stages.values()) * 1000.0, 3),
+            "records": dict(self._counts),
+            "parse_failures": dict(self._parse_failures),
+        }
+
+
+class _NullProfiler:
+    """Profiler stand-in used when profiling is off."""
+
+    enabled = False
+    _ctx = nullcontext()
+
+    def stage(self, name: str):
+        return self._ctx
+
+    def count(self, name: str, value: int) -> None:
+        pass
+
+    def parse_failure(self, field: str, n: int = 1) -> None:
+        pass
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {}
+
+
+NULL_PROFILER = _NullProfiler()
+
+_CPROFILE_LOCK = threading.Lock()
+
+
+class ProfilerBusy(Exception):
+    """A cProfile run was requested while another one is active."""
+
+
+def run_with_cprofile(
+    fn: Callable[..., Any],
+    *args: Any,
+    sample_rate: float = 1.0,
+    top: int = 15,
+    **kwargs: Any,
+) -> Tuple[Any, Optional[Dict[str, Any]]]:
+    """Call fn, profiling it with cProfile for a sampled fraction of calls.
+
+    Returns (result, summary). summary is None when the call was not sampled;
+    otherwise it lists the top functions by cumulative time (no arguments or
+    data values are included, only code locations). Raises ProfilerBusy,
+    before fn is called, when the call is sampled but another cProfile run is
+    active.
+    """
+    if sample_rate <= 0 or (sample_rate < 1 and random.random() >= sample_rate):
+        return fn(*args, **kwargs), None
+
+    if not _CPROFILE_LOCK.acquire(blocking=False):
+        raise ProfilerBusy("Another cProfile run is in progress")
+    try:
+        prof = cProfile.Profile()
+        try:
+            prof.enable()
+        except ValueError:
+            # 3.12+: a profiler outside this module (debugger, coverage) is active
+            raise ProfilerBusy("Another profiling tool is active")
+        try:
+            result = fn(*args, **kwargs)
+        finally:
+            prof.disable()
+    finally:
+        _CPROFILE_LOCK.release()
+
+    stats = pstats.Stats(prof, stream=io.StringIO())
+    stats.sort_stats("cumulative")
+    rows: List[Dict[str, Any]] = []
+    # fcn_list is populated by sort_stats; entries are (file, line, func)
+    for func in stats.fcn_list[:top]:  # type: ignore[attr-defined]
+        cc, nc, tt, ct, _ = stats.stats[func]  # type: ignore[attr-defined]
+        filename, line, name = func
+        rows.append({
+            "function": f"{filename}:{line}({name})",
+            "calls": nc,
+            "primitive_calls": cc,
+            "tottime_ms": round(tt * 1000.0, 3),
+            "cumtime_ms": round(ct * 1000.0, 3),
+        })
+    summary = {
+        "sort": "cumulative",
+        "total_calls": stats.total_calls,  # type: ignore[attr-defined]
+        "total_ms": round(stats.total_tt * 1000.0, 3),  # type: ignore[attr-defined]
+        "top": rows,
+    }
+    return result, summary
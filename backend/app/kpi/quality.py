@@ -0,0 +1,98 @@
+"""Data-quality report built during ingestion.
+
+QualityReport is filled by the same loop that filters and aggregates records,
+so bad rows are explained without a second pass. It keeps counts only: failure
+reasons, per-column present/parsed tallies and up to `sample_size` row indices
+(positions in the input) per reason -- never field values, so no PHI.
+
+Reasons used by the KPI engine:
+- timestamp_unparseable: resulted_at (or the start timestamp when there is no
+  end) is present but does not parse
+- no_timestamp: none of resulted_at / received_at / collected_at is present
+- tat_missing_start / tat_missing_end: in-period row without a usable start or end
+- tat_negative: in-period row whose end is before its start
+- category_unmatched: in-period row with a category the classification table does not know
+- category_missing: in-period row without type/category (or only whitespace)
+
+Reasons used by the productivity readers (at most once per row each):
+- hours_unparseable: one or more hour columns are present but not numeric
+- date_invalid / date_missing: entry date does not parse / is absent
+- staff_id_missing: entry without staff_id
+"""
+from typing import Any, Dict, List
+
+DEFAULT_SAMPLE_SIZE = 5
+
+REASON_TIMESTAMP_UNPARSEABLE = "timestamp_unparseable"
+REASON_NO_TIMESTAMP = "no_timestamp"
+REASON_TAT_MISSING_START = "tat_missing_start"
+REASON_TAT_MISSING_END = "tat_missing_end"
+REASON_TAT_NEGATIVE = "tat_negative"
+REASON_CATEGORY_UNMATCHED = "category_unmatched"
+REASON_CATEGORY_MISSING = "category_missing"
+REASON_HOURS_UNPARSEABLE = "hours_unparseable"
+REASON_DATE_INVALID = "date_invalid"
+REASON_DATE_MISSING = "date_missing"
+REASON_STAFF_ID_MISSING = "staff_id_missing"
+
+
+class QualityReport:
+    __slots__ = ("rows", "rows_in_period", "reasons", "samples", "columns", "sample_size")
+
+    def __init__(self, sample_size: int = DEFAULT_SAMPLE_SIZE) -> None:
+        self.rows = 0
+        self.rows_in_period = 0
+        self.reasons: Dict[str, int] = {}
+        self.samples: Dict[str, List[int]] = {}
+        self.columns: Dict[str, List[int]] = {}  # name -> [present, parsed]
+        self.sample_size = sample_size
+
+    def issue(self, reason: str, row: int) -> None:
+        n = self.reasons.get(reason, 0)
+        self.reasons[reason] = n + 1
+        if n < self.sample_size:
+            self.samples.setdefault(reason, []).append(row)
+
+    def column(self, name: str, parsed: bool) -> None:
+        """Tally one present (non-empty) value of `name` and whether it parsed."""
+        c = self.columns.get(name)
+        if c is None:
+            c = self.columns[name] = [0, 0]
+        c[0] += 1
+        if parsed:
+            c[1] += 1
+
+    def count(self, reason: str) -> int:
+        return self.reasons.get(reason, 0)
+
+    def merge(self, other: "QualityReport", offset: int = 0) -> None:
+        """Fold another report in (row indices shifted by `offset`)."""
+        self.rows += other.rows
+        self.rows_in_period += other.rows_in_period
+        for reason, n in other.reasons.items():
+            have = self.reasons.get(reason, 0)
+            self.reasons[reason] = have + n
+            room = self.sample_size - len(self.samples.get(reason, []))
+            if room > 0 and other.samples.get(reason):
+                self.samples.setdefault(reason, []).extend(i + offset for i in other.samples[reason][:room])
+        for name, (present, parsed) in other.columns.items():
+            c = self.columns.setdefault(name, [0, 0])
+            c[0] += present
+            c[1] += parsed
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "rows": self.rows,
+            "rows_in_period": self.rows_in_period,
+            "issues": sum(self.reasons.values()),
+            "reasons": dict(sorted(self.reasons.items())),
+            "columns": {
+                name: {
+                    "present": present,
+                    "parsed": parsed,
+                    "parse_rate": round(parsed / present, 4) if present else None,
+                }
+                for name, (present, parsed) in sorted(self.columns.items())
+            },
+            "sample_rows": {k: list(v) for k, v in sorted(self.samples.items())},
+        }
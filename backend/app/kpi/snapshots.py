@@ -0,0 +1,130 @@
+"""Precomputed dashboard KPI snapshots.
+
+snapshot_periods defines the standard dashboard periods relative to a day;
+build_snapshot computes all of them from one batch of source records and
+SnapshotStore keeps the latest result in memory (optionally persisted to a JSON
+file so a restarted worker can serve it before its first refresh).
+"""
+import json
+import logging
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .daily import fiscal_year_start_month, to_date_ranges
+from .engine import Period, aggregate_kpis, build_kpi_result
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_PERIODS = ("current_month", "previous_month", "qtd", "ytd", "fytd")
+
+
+def snapshot_periods(today: date, fiscal_start_month: int = 1) -> Dict[str, Period]:
+    """Current month, previous month, QTD, YTD and fiscal YTD, each ending today (or month end)."""
+    ranges = to_date_ranges(today, fiscal_start_month)
+    prev_end = ranges["mtd"][0] - timedelta(days=1)
+    out = {
+        "current_month": ranges["mtd"],
+        "previous_month": (prev_end.replace(day=1), prev_end),
+        "qtd": ranges["qtd"],
+        "ytd": ranges["ytd"],
+        "fytd": ranges["fytd"],
+    }
+    return {name: Period(s.isoformat(), e.isoformat()) for name, (s, e) in out.items()}
+
+
+def build_snapshot(
+    config: Dict[str, Any],
+    tests: List[Dict[str, Any]],
+    productivity: Optional[List[Dict[str, Any]]] = None,
+    today: Optional[date] = None,
+    level: str = "row",
+    source: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Compute every snapshot period; each entry has the same shape as /kpi/compute."""
+    today = today or datetime.utcnow().date()
+    t0 = time.perf_counter()
+    periods: Dict[str, Any] = {}
+    for name, period in snapshot_periods(today, fiscal_year_start_month(config)).items():
+        agg = aggregate_kpis(config, period, tests, productivity=productivity, level=level)
+        periods[name] = build_kpi_result(config, agg)
+    return {
+        "meta": {
+            "generatedAt": datetime.utcnow().isoformat() + "Z",
+            "asOf": today.isoformat(),
+            "source": source,
+            "level": level,
+            "config_version": config.get("metadata", {}).get("version"),
+            "tests": len(tests),
+            "productivity_items": 0 if productivity is None else len(productivity),
+            "duration_ms": round((time.perf_counter() - t0) * 1000.0, 1),
+        },
+        "periods": periods,
+    }
+
+
+SHARED_SNAPSHOT_KEY = "snapshot:latest"
+
+
+class SnapshotStore:
+    """
+    Latest snapshot, held in memory and optionally mirrored to `path` (atomic replace).
+
+    With shared state enabled put() also publishes it there and latest() picks
+    up a newer snapshot published by another worker.
+    """
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = Path(path) if path else None
+        self._lock = threading.Lock()
+        self._latest: Optional[Dict[str, Any]] = None
+        self._shared_stamp: Optional[float] = None
+        if self.path is not None and self.path.exists():
+            try:
+                self._latest = json.loads(self.path.read_text(encoding="utf-8"))
+            except Exception as e:
+                logger.warning("Ignoring unreadable snapshot file %s: %s", self.path, e)
+
+    def put(self, snapshot: Dict[str, Any]) -> None:
+        with self._lock:
+            self._latest = snapshot
+        if self.path is not None:
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                tmp = self.path.with_name(self.path.name + f".{os.getpid()}.tmp")
+                tmp.write_text(json.dumps(snapshot), encoding="utf-8")
+                os.replace(tmp, self.path)
+            except Exception as e:
+                logger.warning("Failed to persist snapshot to %s: %s", self.path, e)
+        state = _shared_state()
+        if state is not None:
+            try:
+                state.set(SHARED_SNAPSHOT_KEY, snapshot)
+                stamp = state.stamp(SHARED_SNAPSHOT_KEY)
+                with self._lock:
+                    self._shared_stamp = stamp
+            except Exception as e:
+                logger.warning("Failed to share snapshot: %s", e)
+
+    def latest(self) -> Optional[Dict[str, Any]]:
+        state = _shared_state()
+        if state is not None:
+            try:
+                stamp = state.stamp(SHARED_SNAPSHOT_KEY)
+                if stamp is not None and stamp != self._shared_stamp:
+                    snapshot = state.get(SHARED_SNAPSHOT_KEY)
+                    with self._lock:
+                        self._latest, self._shared_stamp = snapshot, stamp
+            except Exception as e:
+                logger.warning("Failed to read shared snapshot: %s", e)
+        with self._lock:
+            return self._latest
+
+
+def _shared_state():
+    from app.core.shared_state import get_shared_state
+
+    return get_shared_state()
@@ -0,0 +1,277 @@
+"""Stage-level turnaround: per-stage durations, WIP and backlog age.
+
+The workflow is an ordered list of stages from the config's `stages` section
+`workflow` (default: analysis = triage -> analyzed, review = analyzed ->
+reviewed, qc = reviewed -> QC). Each stage ends at a milestone timestamp (first
+parseable of its `end` fields) and starts where the previous stage ended; the
+first stage starts at its `start` fields. An optional `duration_field` (e.g.
+the pending list's Review Time / QC TAT columns, in hours) is used instead of
+the timestamp difference.
+
+stage_kpis makes one pass over the records. Per record and stage it:
+- counts a completion when the stage's end falls in the period (duration
+  stats: count/avg/min/max/p50/p90 hours)
+- adds the time the record sat in the stage -- from its start until the next
+  milestone reached, or still open -- to a per-day difference array, so daily
+  WIP over the whole period is one prefix sum
+- if still in the stage at the end of the period, records its age (backlog)
+
+Records are rows (no case roll-up). A record that skips a stage leaves it at
+the next milestone it reaches, so skipped stages never look stuck. The
+terminal milestone (`terminal`, default resulted_at / signed_out_at) closes any
+stage still open without counting as a completion or duration, so resulted
+records are never WIP or backlog. Records with none of the stage end
+milestones (the usual /kpi/compute shape) are reported under
+`without_stage_data`; resulted ones stay out of the stages, unresulted ones are
+still waiting in the first stage.
+"""
+from array import array
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+from .engine import _coerce_period, _parse_dt, _within_period
+from .quality import QualityReport
+
+REASON_STAGE_UNPARSEABLE = "stage_timestamp_unparseable"
+REASON_STAGE_OUT_OF_ORDER = "stage_out_of_order"
+
+DEFAULT_STAGES: List[Dict[str, Any]] = [
+    {"name": "analysis", "start": ["triaged_at", "received_at"], "end": ["analyzed_at"]},
+    {"name": "review", "end": ["reviewed_at"], "duration_field": "review_time_hours"},
+    {"name": "qc", "end": ["qc_at"], "duration_field": "qc_tat_hours"},
+]
+DEFAULT_TERMINAL = ["resulted_at", "signed_out_at"]
+DEFAULT_AGE_BUCKETS_HOURS = [24, 72, 168]
+MAX_STAGE_PERIOD_DAYS = 366 * 2
+
+
+def _fields(val: Any, what: str) -> List[str]:
+    if isinstance(val, str):
+        val = [val]
+    if not isinstance(val, Sequence) or not val or not all(isinstance(f, str) and f for f in val):
+        raise ValueError(f"stages: {what} must be a field name or a non-empty list of field names")
+    return list(val)
+
+
+class StagePipeline:
+    """Compiled stage list: milestone field lists (stage i runs from milestone i to i + 1)."""
+
+    def __init__(
+        self,
+        stages: Optional[Sequence[Mapping[str, Any]]] = None,
+        age_buckets_hours: Any = None,
+        terminal: Any = None,
+    ) -> None:
+        stages = stages or DEFAULT_STAGES
+        self.names: List[str] = []
+        self.milestones: List[List[str]] = []
+        self.duration_fields: List[Optional[str]] = []
+        for i, spec in enumerate(stages):
+            name = str(spec.get("name") or "").strip()
+            if not name or name in self.names:
+                raise ValueError(f"stages: stage {i + 1} needs a unique name")
+            if i == 0:
+                self.milestones.append(_fields(spec.get("start"), f"{name}.start"))
+            elif spec.get("start"):
+                raise ValueError(f"stages: only the first stage takes 'start' ({name} starts where the previous stage ends)")
+            self.milestones.append(_fields(spec.get("end"), f"{name}.end"))
+            self.names.append(name)
+            self.duration_fields.append(spec.get("duration_field") or None)
+        buckets = sorted({float(b) for b in (age_buckets_hours or DEFAULT_AGE_BUCKETS_HOURS)})
+        if buckets[0] <= 0:
+            raise ValueError("stages: age_buckets_hours must be positive")
+        self.age_buckets = buckets
+        self.terminal = _fields(terminal or DEFAULT_TERMINAL, "terminal")
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "StagePipeline":
+        section = config.get("stages") or {}
+        return cls(section.get("workflow"), section.get("age_buckets_hours"), section.get("terminal"))
+
+    def bucket_labels(self) -> List[str]:
+        edges = [0.0] + self.age_buckets
+        labels = [f"{_num(lo)}-{_num(hi)}h" for lo, hi in zip(edges, edges[1:])]
+        return labels + [f"{_num(edges[-1])}h+"]
+
+    def milestone_times(self, rec: Mapping[str, Any], row: int, quality: QualityReport) -> List[Optional[datetime]]:
+        return [_first_time(rec, fields, row, quality) for fields in self.milestones]
+
+    def terminal_time(self, rec: Mapping[str, Any], row: int, quality: QualityReport) -> Optional[datetime]:
+        return _first_time(rec, self.terminal, row, quality)
+
+
+def _first_time(rec: Mapping[str, Any], fields: List[str], row: int, quality: QualityReport) -> Optional[datetime]:
+    """First parseable timestamp of `fields` (unparseable values are tallied)."""
+    ts = None
+    unparsed = False
+    for f in fields:
+        raw = rec.get(f)
+        if not raw:
+            continue
+        ts = _parse_dt(raw)
+        quality.column(f, ts is not None)
+        if ts is not None:
+            break
+        unparsed = True
+    if ts is None and unparsed:
+        quality.issue(REASON_STAGE_UNPARSEABLE, row)
+    return ts
+
+
+def _num(x: float) -> str:
+    return str(int(x)) if x == int(x) else str(x)
+
+
+def _explicit_hours(val: Any) -> Optional[float]:
+    if val is None or val == "":
+        return None
+    try:
+        v = float(val)
+    except (TypeError, ValueError):
+        return None
+    return v if v >= 0 else None
+
+
+class _StageStats:
+    __slots__ = ("completed", "durations", "explicit", "wip_diff", "ages", "age_buckets")
+
+    def __init__(self, n_days: int, n_buckets: int) -> None:
+        self.completed = 0
+        self.durations: List[float] = []
+        self.explicit = 0
+        self.wip_diff = array("q", bytes(8 * (n_days + 1)))
+        self.ages: List[float] = []
+        self.age_buckets = [0] * n_buckets
+
+    def to_dict(self, first_day: date, labels: List[str]) -> Dict[str, Any]:
+        vals = sorted(self.durations)
+
+        def pct(p: float) -> Optional[float]:
+            return vals[min(len(vals) - 1, int(p / 100.0 * len(vals)))] if vals else None
+
+        wip = 0
+        series: List[int] = []
+        for d in self.wip_diff[:-1]:
+            wip += d
+            series.append(wip)
+        peak = max(series) if series else 0
+        return {
+            "completed": self.completed,
+            "duration_hours": {
+                "count": len(vals),
+                "avg": sum(vals) / len(vals) if vals else None,
+                "min": vals[0] if vals else None,
+                "max": vals[-1] if vals else None,
+                "p50": pct(50),
+                "p90": pct(90),
+                "from_duration_field": self.explicit,
+            },
+            "wip": {
+                "end_of_period": series[-1] if series else 0,
+                "avg_daily": sum(series) / len(series) if series else 0.0,
+                "peak": peak,
+                "peak_date": (first_day + timedelta(days=series.index(peak))).isoformat() if peak else None,
+            },
+            "backlog_age_hours": {
+                "count": len(self.ages),
+                "avg": sum(self.ages) / len(self.ages) if self.ages else None,
+                "max": max(self.ages) if self.ages else None,
+                "buckets": dict(zip(labels, self.age_buckets)),
+            },
+        }
+
+
+def stage_kpis(config: Dict[str, Any], period: Any, tests: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Per-stage durations, daily WIP and end-of-period backlog age for a period.
+
+    Durations cover stages completed in the period; WIP counts records in a
+    stage at the end of each day; backlog age is measured at the period end.
+    See the module docstring for how stages and milestones are resolved.
+    """
+    period_obj = _coerce_period(period)
+    s, e = period_obj.to_datetimes()
+    first_day = s.date()
+    n_days = (e.date() - first_day).days + 1
+    if n_days > MAX_STAGE_PERIOD_DAYS:
+        raise ValueError(f"period must be at most {MAX_STAGE_PERIOD_DAYS} days")
+    pipeline = StagePipeline.from_config(config)
+    buckets = pipeline.age_buckets
+    stats = [_StageStats(n_days, len(buckets) + 1) for _ in pipeline.names]
+    quality = QualityReport()
+    n_milestones = len(pipeline.milestones)
+    no_stage_data = no_stage_data_resulted = 0
+
+    for row, rec in enumerate(tests):
+        times = pipeline.milestone_times(rec, row, quality)
+        done = pipeline.terminal_time(rec, row, quality)
+        if all(t is None for t in times[1:]):
+            no_stage_data += 1
+            if done is not None:
+                no_stage_data_resulted += 1
+                continue
+        # exits[i]: first milestone reached after milestone i, else the terminal one
+        # (None while still in stage i)
+        exits: List[Optional[datetime]] = [None] * n_milestones
+        nxt: Optional[datetime] = done
+        for i in range(n_milestones - 1, -1, -1):
+            exits[i] = nxt
+            if times[i] is not None:
+                nxt = times[i]
+        touched = False
+        for i, st in enumerate(stats):
+            start, end = times[i], times[i + 1]
+            if end is not None and _within_period(end, s, e):
+                touched = True
+                st.completed += 1
+                explicit = _explicit_hours(rec.get(pipeline.duration_fields[i])) if pipeline.duration_fields[i] else None
+                if explicit is not None:
+                    st.durations.append(explicit)
+                    st.explicit += 1
+                elif start is not None:
+                    if end < start:
+                        quality.issue(REASON_STAGE_OUT_OF_ORDER, row)
+                    else:
+                        st.durations.append((end - start).total_seconds() / 3600.0)
+            if start is None or start > e:
+                continue
+            leave = exits[i]
+            if leave is not None and leave < start:
+                continue  # out-of-order milestones; not counted as WIP
+            lo = max(0, (start.date() - first_day).days)
+            hi = n_days if leave is None else min(n_days, (leave.date() - first_day).days)
+            if hi > lo:
+                st.wip_diff[lo] += 1
+                st.wip_diff[hi] -= 1
+            if leave is None or leave > e:
+                touched = True
+                age = (e - start).total_seconds() / 3600.0
+                st.ages.append(age)
+                b = 0
+                while b < len(buckets) and age >= buckets[b]:
+                    b += 1
+                st.age_buckets[b] += 1
+        if touched:
+            quality.rows_in_period += 1
+    quality.rows += len(tests)
+
+    labels = pipeline.bucket_labels()
+    return {
+        "meta": {
+            "period": {"start_date": period_obj.start_date, "end_date": period_obj.end_date},
+            "generatedAt": datetime.utcnow().isoformat() + "Z",
+            "config_version": config.get("metadata", {}).get("version"),
+            "stages": [
+                {"name": name, "start": pipeline.milestones[i], "end": pipeline.milestones[i + 1]}
+                for i, name in enumerate(pipeline.names)
+            ],
+            "terminal": pipeline.terminal,
+        },
+        "stages": {name: stats[i].to_dict(first_day, labels) for i, name in enumerate(pipeline.names)},
+        "without_stage_data": {
+            "records": no_stage_data,
+            "resulted": no_stage_data_resulted,
+            "open": no_stage_data - no_stage_data_resulted,
+        },
+        "data_quality": quality.to_dict(),
+    }
@@ -8,9 +8,11 @@ load_dotenv()
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from app.core.compute_pool import compute_pool
 from app.core.config import Settings
 from app.api.v1.routes import router as api_router
 from app.core.log_store import init_logging_buffer
+from app.core.snapshot_service import start_snapshot_scheduler, stop_snapshot_scheduler
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
@@ -29,6 +31,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Let the dashboard read cache/serialization/back-pressure headers
+    expose_headers=["Server-Timing", "X-KPI-Body-Bytes", "X-KPI-Cache", "Retry-After"],
 )
 
 app.include_router(api_router, prefix=Settings.API_V1_STR)
@@ -51,3 +55,16 @@ async def startup_event():
         logger.info("Log buffer initialized: capacity=%s", Settings.LOG_BUFFER_CAPACITY)
     except Exception as e:
         logger.warning("Failed to initialize log buffer: %s", e)
+    try:
+        start_snapshot_scheduler()
+    except Exception as e:
+        logger.warning("Failed to start snapshot scheduler: %s", e)
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    stop_snapshot_scheduler()
+    compute_pool.shutdown()
+    from app.alerts.service import stop_alerts
+
+    stop_alerts()
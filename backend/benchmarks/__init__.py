@@ -0,0 +1,4 @@
+"""Benchmarks for the KPI engine, config loader and log store.
+
+Run from the backend directory: ``python -m benchmarks.run --help``.
+"""
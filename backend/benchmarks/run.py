@@ -0,0 +1,279 @@
+"""Benchmark runner.
+
+Usage (from backend/):
+    python -m benchmarks.run                       # 10k,100k rows
+    python -m benchmarks.run --sizes 10k,100k,1m,10m
+    python -m benchmarks.run --only engine --compare --fail-threshold 15
+    python -m benchmarks.run --only serialize      # response formats: time and size
+
+Each run appends one JSON line to benchmarks/results/history.jsonl tagged with
+the current git commit, so regressions between commits show up with --compare.
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core import log_store
+from app.kpi import compute_kpis, load_kpi_config
+
+from .synthetic import generate_productivity, generate_tests
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+DEFAULT_HISTORY = RESULTS_DIR / "history.jsonl"
+SUITES = ("engine", "config", "log_store", "serialize")
+
+
+def _parse_size(s: str) -> int:
+    s = s.strip().lower()
+    mult = 1
+    if s.endswith("k"):
+        mult, s = 1_000, s[:-1]
+    elif s.endswith("m"):
+        mult, s = 1_000_000, s[:-1]
+    return int(float(s) * mult)
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def _git(*args: str) -> Optional[str]:
+    try:
+        out = subprocess.run(["git", *args], capture_output=True, text=True, timeout=10)
+        return out.stdout.strip() if out.returncode == 0 else None
+    except Exception:
+        return None
+
+
+def _measure(name: str, fn: Callable[[], Any], repeats: int, size: Optional[int] = None) -> Dict[str, Any]:
+    times: List[float] = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    res: Dict[str, Any] = {
+        "name": name,
+        "size": size,
+        "repeats": repeats,
+        "min_s": min(times),
+        "median_s": statistics.median(times),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+    }
+    if size:
+        res["rows_per_s"] = round(size / res["min_s"]) if res["min_s"] > 0 else None
+    print(f"  {name:<40} min={res['min_s'] * 1000:10.2f} ms  median={res['median_s'] * 1000:10.2f} ms  rss={res['peak_rss_mb']} MB")
+    return res
+
+
+def bench_engine(sizes: List[int], repeats: Optional[int]) -> List[Dict[str, Any]]:
+    cfg = load_kpi_config()
+    period = {"start_date": "2025-06-01", "end_date": "2025-06-30"}
+    productivity = generate_productivity()
+    results = []
+    for n in sizes:
+        t0 = time.perf_counter()
+        tests = generate_tests(n)
+        print(f"  generated {n:,} tests in {time.perf_counter() - t0:.1f}s")
+        reps = repeats or (5 if n <= 100_000 else 1)
+        results.append(_measure(
+            f"engine.compute_kpis[{n}]",
+            lambda: compute_kpis(cfg, period=period, tests=tests),
+            reps, n,
+        ))
+        results.append(_measure(
+            f"engine.compute_kpis+productivity[{n}]",
+            lambda: compute_kpis(cfg, period=period, tests=tests, productivity=productivity),
+            reps, n,
+        ))
+        del tests
+    return results
+
+
+def bench_config(repeats: Optional[int]) -> List[Dict[str, Any]]:
+    reps = repeats or 50
+
+    def cold():
+        load_kpi_config.cache_clear()
+        load_kpi_config()
+
+    res = [_measure("config.load_kpi_config[cold]", cold, reps)]
+    load_kpi_config()
+    res.append(_measure("config.load_kpi_config[cached]", load_kpi_config, reps * 100))
+    return res
+
+
+def bench_log_store(repeats: Optional[int]) -> List[Dict[str, Any]]:
+    reps = repeats or 5
+    capacity = 1000
+    log_store.init_logging_buffer(capacity)
+    handler = log_store.RingBufferHandler()
+    lg = logging.getLogger("benchmarks.log_store")
+    records = [
+        lg.makeRecord(lg.name, logging.WARNING if i % 10 == 0 else logging.INFO, __file__, i,
+                      "KPI compute ok: tests=%s", (i,), None)
+        for i in range(10_000)
+    ]
+
+    def emit():
+        for r in records:
+            handler.emit(r)
+
+    res = [_measure("log_store.emit[10000]", emit, reps, len(records))]
+    res.append(_measure("log_store.get_recent_logs[limit=500]",
+                        lambda: log_store.get_recent_logs(limit=500), reps * 20))
+    res.append(_measure("log_store.get_recent_logs[level+since]",
+                        lambda: log_store.get_recent_logs(limit=100, level="WARNING", since="2000-01-01T00:00:00Z"),
+                        reps * 20))
+    return res
+
+
+def _load_history(path: Path) -> List[Dict[str, Any]]:
+    if not path.exists():
+        return []
+    runs = []
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                try:
+                    runs.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+    return runs
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], threshold_pct: Optional[float]) -> int:
+    """Print per-benchmark deltas vs baseline; return number of regressions over threshold."""
+    base = {r["name"]: r for r in baseline.get("results", [])}
+    print(f"\nCompared with {baseline.get('git_sha') or '?'} ({baseline.get('timestamp')}):")
+    regressions = 0
+    for r in current["results"]:
+        b = base.get(r["name"])
+        if not b or not b.get("min_s"):
+            continue
+        delta = (r["min_s"] - b["min_s"]) * 100.0 / b["min_s"]
+        flag = ""
+        if threshold_pct is not None and delta > threshold_pct:
+            flag = "  <-- REGRESSION"
+            regressions += 1
+        print(f"  {r['name']:<40} {b['min_s'] * 1000:10.2f} -> {r['min_s'] * 1000:10.2f} ms  ({delta:+.1f}%){flag}")
+    return regressions
+
+
+def bench_serialize(repeats: Optional[int]) -> List[Dict[str, Any]]:
+    """Encode bulk results (daily per-tech breakdown, year of rolling points) in every response format."""
+    import gzip
+
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+
+    from app.core.config import Settings
+    from app.core.serialization import MEDIA_COLUMNAR, MEDIA_JSON, MEDIA_MSGPACK, _has_msgpack, encode
+    from app.kpi import rolling_kpis, tests_per_fte_breakdown
+
+    cfg = load_kpi_config()
+    tests = generate_tests(100_000)
+    productivity = generate_productivity()
+    payloads = {
+        "fte_by_day": tests_per_fte_breakdown(
+            cfg, {"start_date": "2025-01-01", "end_date": "2025-06-30"}, tests, productivity, by="day"
+        ),
+        "rolling_year": rolling_kpis(cfg, {"start_date": "2024-07-01", "end_date": "2025-06-30"}, tests),
+    }
+    formats: Dict[str, Callable[[Any], bytes]] = {
+        # What a plain `return result` costs in FastAPI
+        "fastapi": lambda obj: JSONResponse(jsonable_encoder(obj)).body,
+        "json": lambda obj: encode(obj, MEDIA_JSON)[0],
+        "columnar": lambda obj: encode(obj, MEDIA_COLUMNAR)[0],
+    }
+    if _has_msgpack():
+        formats["msgpack"] = lambda obj: encode(obj, MEDIA_MSGPACK)[0]
+    reps = repeats or 20
+    res = []
+    for pname, obj in payloads.items():
+        for fname, fn in formats.items():
+            r = _measure(f"serialize.{pname}.{fname}", lambda: fn(obj), reps)
+            body = fn(obj)
+            r["bytes"] = len(body)
+            r["gzip_bytes"] = len(gzip.compress(body, Settings.GZIP_LEVEL))
+            print(f"  {'':<40} bytes={r['bytes']:,}  gzip={r['gzip_bytes']:,}")
+            res.append(r)
+    return res
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="KPI backend benchmarks")
+    ap.add_argument("--sizes", default="10k,100k", help="Comma-separated row counts (e.g. 10k,100k,1m,10m)")
+    ap.add_argument("--only", default=",".join(SUITES), help=f"Comma-separated suites: {', '.join(SUITES)}")
+    ap.add_argument("--repeats", type=int, default=None, help="Override repeat count per benchmark")
+    ap.add_argument("--output", default=str(DEFAULT_HISTORY), help="History file (JSON lines)")
+    ap.add_argument("--no-save", action="store_true", help="Do not append this run to the history file")
+    ap.add_argument("--compare", nargs="?", const="previous", default=None,
+                    help="Compare with the previous run, or with the last run at the given git sha")
+    ap.add_argument("--fail-threshold", type=float, default=None,
+                    help="Exit non-zero if any benchmark is slower than the baseline by more than this percent")
+    args = ap.parse_args(argv)
+
+    # Keep engine warnings from flooding the terminal
+    logging.getLogger("app").setLevel(logging.CRITICAL)
+
+    suites = {s.strip() for s in args.only.split(",") if s.strip()}
+    sizes = [_parse_size(s) for s in args.sizes.split(",") if s.strip()]
+    results: List[Dict[str, Any]] = []
+    if "config" in suites:
+        print("config:")
+        results += bench_config(args.repeats)
+    if "log_store" in suites:
+        print("log_store:")
+        results += bench_log_store(args.repeats)
+    if "engine" in suites:
+        print("engine:")
+        results += bench_engine(sizes, args.repeats)
+    if "serialize" in suites:
+        print("serialize:")
+        results += bench_serialize(args.repeats)
+
+    run = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_sha": _git("rev-parse", "--short", "HEAD"),
+        "git_dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+
+    history_path = Path(args.output)
+    regressions = 0
+    if args.compare:
+        history = _load_history(history_path)
+        if args.compare != "previous":
+            history = [h for h in history if str(h.get("git_sha", "")).startswith(args.compare)]
+        if history:
+            regressions = compare(run, history[-1], args.fail_threshold)
+        else:
+            print("\nNo baseline run found to compare with.")
+
+    if not args.no_save:
+        history_path.parent.mkdir(parents=True, exist_ok=True)
+        with history_path.open("a", encoding="utf-8") as f:
+            f.write(json.dumps(run) + "\n")
+        print(f"\nSaved results to {history_path}")
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""Synthetic Karyo-style workload generator (no PHI).
+
+Records mirror what the frontend sends to /kpi/compute after parsing the
+pending list export: case numbers like ``C25-10639``, tech initials, Abn/Norm
+flags, priority 0 (STAT) .. 6, and a mix of timestamp formats including blanks
+and values the engine cannot parse.
+"""
+import random
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional
+
+CASE_PREFIXES = ["C", "CM", "PR"]
+TECHS = ["HA", "YA", "EF", "NS", "DS", "MT", "BX", "KR", "LS", "OT"]
+ABN_FLAGS = ["", "", "", "", "A", "F", "L", "C"]
+CATEGORIES = ["CYTO", "CYTO", "CYTO", "Karyotype", "FISH", "FISH-PET", "FISH-ST", "FISH-URO", ""]
+
+
+def _fmt_ts(rng: random.Random, dt: datetime) -> Optional[str]:
+    """Render a timestamp in one of the formats seen in uploads (or blank)."""
+    r = rng.random()
+    if r < 0.04:
+        return None
+    if r < 0.06:
+        return ""
+    if r < 0.07:
+        # US-style sheet value; unparseable by the engine on purpose
+        return f"{dt.month}/{dt.day}/{dt.year % 100} {dt.hour}:{dt.minute:02d}"
+    if r < 0.45:
+        return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+    if r < 0.75:
+        return dt.strftime("%Y-%m-%d %H:%M:%S")
+    if r < 0.90:
+        return dt.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+    return dt.strftime("%Y-%m-%dT%H:%M")
+
+
+def iter_tests(
+    n: int,
+    start: date = date(2024, 1, 1),
+    end: date = date(2025, 12, 31),
+    seed: int = 42,
+    rows_per_case: float = 1.3,
+) -> Iterator[Dict[str, Any]]:
+    """Yield n synthetic test records spread uniformly over [start, end]."""
+    rng = random.Random(seed)
+    span_s = int((datetime.combine(end, datetime.min.time()) - datetime.combine(start, datetime.min.time())).total_seconds()) + 86399
+    base = datetime.combine(start, datetime.min.time())
+    n_cases = max(1, int(n / rows_per_case))
+    for _ in range(n):
+        received = base + timedelta(seconds=rng.randrange(span_s))
+        tat_h = rng.lognormvariate(3.7, 0.5)  # median ~40h, long right tail
+        if rng.random() < 0.01:
+            tat_h = -rng.random() * 5  # clock skew / data entry error
+        resulted = received + timedelta(hours=tat_h)
+        priority = rng.choice([0, 1, 2, 3, 3, 3, 6, 6])
+        techs = rng.sample(TECHS, k=1 if rng.random() < 0.7 else 2)
+        case_no = f"{rng.choice(CASE_PREFIXES)}{received.year % 100}-{rng.randrange(n_cases):05d}"
+        rec: Dict[str, Any] = {
+            "category": rng.choice(CATEGORIES),
+            "case_no": case_no if rng.random() > 0.02 else "",
+            "abn_norm": rng.choice(ABN_FLAGS) or None,
+            "priority": priority,
+            "stat": priority == 0,
+            "received_at": _fmt_ts(rng, received),
+            "resulted_at": _fmt_ts(rng, resulted),
+            "work_date": resulted.date().isoformat(),
+            "analyzed_by": "/".join(techs),
+            "analyzed_techs": techs,
+        }
+        if rng.random() < 0.05:
+            rec["collected_at"] = _fmt_ts(rng, received - timedelta(hours=rng.randrange(1, 48)))
+        yield rec
+
+
+def generate_tests(n: int, **kwargs: Any) -> List[Dict[str, Any]]:
+    return list(iter_tests(n, **kwargs))
+
+
+def iter_productivity(
+    start: date = date(2024, 1, 1),
+    end: date = date(2025, 12, 31),
+    techs: Optional[List[str]] = None,
+    seed: int = 7,
+) -> Iterator[Dict[str, Any]]:
+    """Yield one productivity row per tech per working day (with some gaps/blanks)."""
+    rng = random.Random(seed)
+    staff = techs or TECHS
+    d = start
+    while d <= end:
+        if d.weekday() < 5 or rng.random() < 0.2:
+            for i, tech in enumerate(staff):
+                if rng.random() < 0.08:
+                    continue  # day off
+                remote = rng.choice([0, 0, 2, 4])
+                in_lab = rng.choice([4, 6, 8]) - remote if remote < 4 else 4
+                row: Dict[str, Any] = {
+                    "date": d.isoformat(),
+                    "staff_id": f"EMP-{i + 1:03d}",
+                    "staff_name": tech,
+                    "remote_hours": remote,
+                    "in_lab_hours": in_lab,
+                }
+                r = rng.random()
+                if r < 0.5:
+                    row["hours_worked"] = remote + in_lab
+                elif r < 0.55:
+                    row["hours_worked"] = ""
+                elif r < 0.57:
+                    row["hours_worked"] = "n/a"
+                yield row
+        d += timedelta(days=1)
+
+
+def generate_productivity(**kwargs: Any) -> List[Dict[str, Any]]:
+    return list(iter_productivity(**kwargs))
@@ -0,0 +1,4 @@
+"""End-to-end load-test harness with local integration stand-ins.
+
+Run from the backend directory: ``python -m loadtest.run --help``.
+"""
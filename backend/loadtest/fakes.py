@@ -0,0 +1,413 @@
+"""Local stand-ins for external services used by the backend.
+
+- FakeSheetsServer: serves a productivity worksheet in the Sheets v4
+  ``values.get`` response shape.
+- FakePowerBIServer: serves both the AAD endpoints msal needs for the client
+  credentials flow (OpenID discovery + token) and the PowerBI report /
+  GenerateToken endpoints. It runs over TLS because msal only accepts https
+  authorities; a throwaway self-signed certificate is generated at startup and
+  the app trusts it through REQUESTS_CA_BUNDLE.
+
+  It also implements the push-dataset endpoints (list/create datasets, add and
+  delete table rows) and can answer the next N row posts with 429 +
+  Retry-After to exercise throttling.
+
+Both servers are threaded and accept an artificial latency to mimic upstream
+round-trips. They hold no PHI.
+
+- FakeWebhookServer: accepts JSON POSTs (alert webhook sink) and keeps the
+  payloads; can be told to fail the next N requests with a status code.
+- create_sqlite_lis: a SQLite file with the LIS test table layout expected by
+  app.integrations.lis_db (LIS_DB_DRIVER=sqlite).
+"""
+import json
+import re
+import sqlite3
+import ssl
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+def make_self_signed_cert(directory: Path) -> Tuple[Path, Path]:
+    """Create a self-signed cert/key for localhost and 127.0.0.1 (uses `cryptography`, an msal dependency)."""
+    import ipaddress
+
+    from cryptography import x509
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+    from cryptography.x509.oid import NameOID
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+    now = datetime.now(timezone.utc)
+    cert = (
+        x509.CertificateBuilder()
+        .subject_name(name)
+        .issuer_name(name)
+        .public_key(key.public_key())
+        .serial_number(x509.random_serial_number())
+        .not_valid_before(now - timedelta(minutes=5))
+        .not_valid_after(now + timedelta(days=1))
+        .add_extension(
+            x509.SubjectAlternativeName([
+                x509.DNSName("localhost"),
+                x509.IPAddress(ipaddress.ip_address("127.0.0.1")),
+            ]),
+            critical=False,
+        )
+        .add_extension(x509.BasicConstraints(ca=True, path_length=None), critical=True)
+        .sign(key, hashes.SHA256())
+    )
+    cert_path = directory / "fake-cert.pem"
+    key_path = directory / "fake-key.pem"
+    cert_path.write_bytes(cert.public_bytes(serialization.Encoding.PEM))
+    key_path.write_bytes(key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ))
+    return cert_path, key_path
+
+
+class _JSONHandler(BaseHTTPRequestHandler):
+    server_version = "FakeService/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, fmt: str, *args: Any) -> None:  # keep harness output clean
+        pass
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send_json(self, status: int, payload: Any, headers: Optional[Dict[str, str]] = None) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _delay(self) -> None:
+        latency = getattr(self.server, "latency_s", 0.0)
+        if latency:
+            time.sleep(latency)
+
+
+class _BaseFakeServer:
+    handler_cls: type = _JSONHandler
+    scheme = "http"
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_ms: float = 0.0) -> None:
+        self.httpd = ThreadingHTTPServer((host, port), self.handler_cls)
+        self.httpd.daemon_threads = True
+        self.httpd.latency_s = latency_ms / 1000.0  # type: ignore[attr-defined]
+        self.httpd.fake = self  # type: ignore[attr-defined]
+        self._thread: Optional[threading.Thread] = None
+        self.request_count = 0
+        self._count_lock = threading.Lock()
+
+    def record_request(self) -> None:
+        with self._count_lock:
+            self.request_count += 1
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"{self.scheme}://{host}:{port}"
+
+    def start(self) -> "_BaseFakeServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name=type(self).__name__, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+
+# -------------------- Google Sheets --------------------
+
+class _SheetsHandler(_JSONHandler):
+    _values_re = re.compile(r"^/v4/spreadsheets/([^/]+)/values/([^/?]+)")
+
+    def do_GET(self) -> None:
+        fake: FakeSheetsServer = self.server.fake  # type: ignore[attr-defined]
+        fake.record_request()
+        self._delay()
+        m = self._values_re.match(self.path)
+        if not m:
+            self._send_json(404, {"error": {"code": 404, "message": "Not found"}})
+            return
+        self._send_json(200, {
+            "range": m.group(2),
+            "majorDimension": "ROWS",
+            "values": fake.values,
+        })
+
+
+class FakeSheetsServer(_BaseFakeServer):
+    handler_cls = _SheetsHandler
+
+    HEADERS = ["date", "staff_id", "staff_name", "hours_worked", "remote_hours", "in_lab_hours", "total_hours"]
+
+    def __init__(self, rows: List[Dict[str, Any]], **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.values: List[List[Any]] = [self.HEADERS] + [
+            ["" if r.get(h) is None else r.get(h) for h in self.HEADERS] for r in rows
+        ]
+
+    def values_url(self, spreadsheet_id: str = "fake-sheet", worksheet: str = "Productivity") -> str:
+        return f"{self.base_url}/v4/spreadsheets/{spreadsheet_id}/values/{worksheet}"
+
+
+def sheet_values_to_rows(values: List[List[Any]]) -> List[Dict[str, Any]]:
+    """Convert a values.get payload back into productivity dicts."""
+    if not values:
+        return []
+    headers = [str(h) for h in values[0]]
+    return [dict(zip(headers, row)) for row in values[1:]]
+
+
+# -------------------- AAD + PowerBI --------------------
+
+class _PowerBIHandler(_JSONHandler):
+    _oidc_re = re.compile(r"^/([^/]+)/v2\.0/\.well-known/openid-configuration")
+    _token_re = re.compile(r"^/([^/]+)/oauth2/v2\.0/token")
+    _report_re = re.compile(r"^/v1\.0/myorg/groups/([^/]+)/reports/([^/]+)$")
+    _gen_token_re = re.compile(r"^/v1\.0/myorg/groups/([^/]+)/reports/([^/]+)/GenerateToken$")
+    _datasets_re = re.compile(r"^/v1\.0/myorg/groups/([^/]+)/datasets$")
+    _rows_re = re.compile(r"^/v1\.0/myorg/groups/([^/]+)/datasets/([^/]+)/tables/([^/]+)/rows$")
+
+    def do_GET(self) -> None:
+        fake: FakePowerBIServer = self.server.fake  # type: ignore[attr-defined]
+        fake.record_request()
+        path = self.path.split("?", 1)[0]
+        m = self._oidc_re.match(path)
+        if m:
+            tenant = m.group(1)
+            base = f"{fake.base_url}/{tenant}"
+            self._send_json(200, {
+                "issuer": f"{base}/v2.0",
+                "authorization_endpoint": f"{base}/oauth2/v2.0/authorize",
+                "token_endpoint": f"{base}/oauth2/v2.0/token",
+                "device_authorization_endpoint": f"{base}/oauth2/v2.0/devicecode",
+            })
+            return
+        if self._datasets_re.match(path):
+            with fake._count_lock:
+                value = [{"id": i, "name": d["name"]} for i, d in fake.datasets.items()]
+            self._send_json(200, {"value": value})
+            return
+        m = self._report_re.match(path)
+        if m:
+            self._delay()
+            ws, rid = m.groups()
+            self._send_json(200, {
+                "id": rid,
+                "embedUrl": f"{fake.base_url}/reportEmbed?reportId={rid}&groupId={ws}",
+                "datasetId": "fake-dataset",
+            })
+            return
+        self._send_json(404, {"error": {"code": "NotFound"}})
+
+    def do_POST(self) -> None:
+        fake: FakePowerBIServer = self.server.fake  # type: ignore[attr-defined]
+        fake.record_request()
+        body = self._read_body()
+        path = self.path.split("?", 1)[0]
+        if self._datasets_re.match(path):
+            spec = json.loads(body or b"{}")
+            with fake._count_lock:
+                ds_id = f"ds-{len(fake.datasets) + 1}"
+                fake.datasets[ds_id] = {
+                    "name": spec.get("name"),
+                    "tables": {t["name"]: {"columns": t.get("columns", []), "rows": []} for t in spec.get("tables", [])},
+                }
+            self._send_json(201, {"id": ds_id, "name": spec.get("name"), "defaultMode": spec.get("defaultMode")})
+            return
+        m = self._rows_re.match(path)
+        if m:
+            self._delay()
+            _, ds_id, table = m.groups()
+            with fake._count_lock:
+                throttled = fake.throttle_next > 0
+                if throttled:
+                    fake.throttle_next -= 1
+                tbl = fake.datasets.get(ds_id, {}).get("tables", {}).get(table)
+                if tbl is not None and not throttled:
+                    rows = json.loads(body or b"{}").get("rows") or []
+                    tbl["rows"].extend(rows)
+                    fake.row_posts.append(len(rows))
+            if throttled:
+                self._send_json(429, {"error": {"code": "TooManyRequests"}}, {"Retry-After": str(fake.retry_after)})
+            elif tbl is None:
+                self._send_json(404, {"error": {"code": "ItemNotFound"}})
+            else:
+                self._send_json(200, {})
+            return
+        if self._token_re.match(path):
+            self._delay()
+            self._send_json(200, {"token_type": "Bearer", "expires_in": 3600, "access_token": "fake-access-token"})
+            return
+        if self._gen_token_re.match(path):
+            self._delay()
+            exp = (datetime.now(timezone.utc) + timedelta(hours=1)).strftime("%Y-%m-%dT%H:%M:%SZ")
+            self._send_json(200, {"token": "fake-embed-token", "expiration": exp})
+            return
+        self._send_json(404, {"error": {"code": "NotFound"}})
+
+    def do_DELETE(self) -> None:
+        fake: FakePowerBIServer = self.server.fake  # type: ignore[attr-defined]
+        fake.record_request()
+        m = self._rows_re.match(self.path.split("?", 1)[0])
+        tbl = None
+        if m:
+            _, ds_id, table = m.groups()
+            with fake._count_lock:
+                tbl = fake.datasets.get(ds_id, {}).get("tables", {}).get(table)
+                if tbl is not None:
+                    tbl["rows"] = []
+        if tbl is None:
+            self._send_json(404, {"error": {"code": "ItemNotFound"}})
+        else:
+            self._send_json(200, {})
+
+
+class FakePowerBIServer(_BaseFakeServer):
+    handler_cls = _PowerBIHandler
+    scheme = "https"
+
+    def __init__(self, cert_dir: Optional[Path] = None, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self._tmp = None
+        if cert_dir is None:
+            self._tmp = tempfile.TemporaryDirectory(prefix="fake-pbi-")
+            cert_dir = Path(self._tmp.name)
+        self.cert_path, key_path = make_self_signed_cert(cert_dir)
+        ctx = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        ctx.load_cert_chain(str(self.cert_path), str(key_path))
+        self.httpd.socket = ctx.wrap_socket(self.httpd.socket, server_side=True)
+        # Push datasets: id -> {"name", "tables": {name: {"columns", "rows"}}}
+        self.datasets: Dict[str, Dict[str, Any]] = {}
+        self.row_posts: List[int] = []  # rows per accepted POST rows request
+        self.throttle_next = 0
+        self.retry_after = 1
+
+    def table_rows(self, dataset_name: str, table: str) -> List[Dict[str, Any]]:
+        for ds in self.datasets.values():
+            if ds["name"] == dataset_name:
+                return list(ds["tables"][table]["rows"])
+        return []
+
+    @property
+    def api_base(self) -> str:
+        return f"{self.base_url}/v1.0/myorg"
+
+    def app_env(self) -> Dict[str, str]:
+        """Environment variables pointing the backend's PowerBI integration at this server."""
+        return {
+            "PBI_TENANT_ID": "fake-tenant",
+            "PBI_CLIENT_ID": "fake-client",
+            "PBI_CLIENT_SECRET": "fake-secret",
+            "PBI_WORKSPACE_ID": "fake-workspace",
+            "PBI_REPORT_ID": "fake-report",
+            "PBI_API_BASE": self.api_base,
+            "PBI_AUTHORITY_HOST": self.base_url,
+            "REQUESTS_CA_BUNDLE": str(self.cert_path),
+        }
+
+    def stop(self) -> None:
+        super().stop()
+        if self._tmp is not None:
+            self._tmp.cleanup()
+
+
+# -------------------- Webhook --------------------
+
+class _WebhookHandler(_JSONHandler):
+    def do_POST(self) -> None:
+        fake: FakeWebhookServer = self.server.fake  # type: ignore[attr-defined]
+        fake.record_request()
+        body = self._read_body()
+        self._delay()
+        with fake._count_lock:
+            failing = fake.fail_next > 0
+            if failing:
+                fake.fail_next -= 1
+            else:
+                fake.received.append(json.loads(body or b"null"))
+        if failing:
+            self._send_json(fake.fail_status, {"error": "induced failure"})
+        else:
+            self._send_json(200, {"ok": True})
+
+
+class FakeWebhookServer(_BaseFakeServer):
+    handler_cls = _WebhookHandler
+
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.received: List[Any] = []
+        self.fail_next = 0
+        self.fail_status = 503
+
+    @property
+    def url(self) -> str:
+        return f"{self.base_url}/hook"
+
+
+# -------------------- LIS database --------------------
+
+LIS_COLUMNS = [
+    "id", "case_no", "category", "priority", "abn_norm", "collected_at", "received_at",
+    "resulted_at", "analyzed_by", "reviewers", "qc_by",
+]
+
+
+def _lis_ts(val: Any) -> Optional[str]:
+    """Normalize a synthetic timestamp to the 'YYYY-MM-DD HH:MM:SS' form a DATETIME column returns."""
+    if not val:
+        return None
+    s = str(val).rstrip("Z").replace("T", " ")
+    try:
+        return datetime.fromisoformat(s).strftime("%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        return None
+
+
+def create_sqlite_lis(path: Path, records: Iterable[Dict[str, Any]], table: str = "lis_tests", start_id: int = 1) -> int:
+    """Create (or append to) a SQLite LIS stand-in from test records; returns rows written."""
+    conn = sqlite3.connect(str(path))
+    try:
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} (id INTEGER PRIMARY KEY, case_no TEXT, category TEXT, "
+            "priority INTEGER, abn_norm TEXT, collected_at TEXT, received_at TEXT, resulted_at TEXT, "
+            "analyzed_by TEXT, reviewers TEXT, qc_by TEXT)"
+        )
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {table}_resulted ON {table} (resulted_at, id)")
+        rows = []
+        for i, r in enumerate(records, start=start_id):
+            rows.append((
+                i, r.get("case_no"), r.get("category"), r.get("priority"), r.get("abn_norm"),
+                _lis_ts(r.get("collected_at")), _lis_ts(r.get("received_at")), _lis_ts(r.get("resulted_at")),
+                r.get("analyzed_by"), r.get("reviewers"), r.get("qc_by"),
+            ))
+        conn.executemany(f"INSERT INTO {table} ({', '.join(LIS_COLUMNS)}) VALUES ({', '.join('?' * len(LIS_COLUMNS))})", rows)
+        conn.commit()
+        return len(rows)
+    finally:
+        conn.close()
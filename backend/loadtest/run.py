@@ -0,0 +1,300 @@
+"""Load-test the FastAPI app under concurrent dashboard traffic.
+
+Starts local fake Google Sheets and AAD/PowerBI servers, launches the app with
+uvicorn pointed at them, then replays a weighted mix of requests at each
+concurrency level and reports per-endpoint latency percentiles, error rate,
+throughput and peak server RSS.
+
+Usage (from backend/):
+    python -m loadtest.run
+    python -m loadtest.run --concurrency 1,8,32 --duration 20 \
+        --mix compute=5,config=2,logs=2,embed=1 --tests-per-request 5000
+    python -m loadtest.run --workers 4 --json loadtest-results.json
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import date
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import requests
+
+from benchmarks.synthetic import generate_productivity, generate_tests
+
+from .fakes import FakePowerBIServer, FakeSheetsServer, sheet_values_to_rows
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+API = "/api/v1"
+ENDPOINTS = ("compute", "config", "logs", "embed", "health")
+
+
+# -------------------- Server process --------------------
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _proc_rss_kb(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def _proc_children(pid: int) -> List[int]:
+    kids: List[int] = []
+    try:
+        for tid in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{tid}/children", "r") as f:
+                kids.extend(int(x) for x in f.read().split())
+    except OSError:
+        pass
+    return kids
+
+
+def tree_rss_mb(pid: int) -> Optional[float]:
+    """RSS of a process and its descendants in MB (Linux only; None elsewhere)."""
+    if not os.path.exists("/proc"):
+        return None
+    total, stack = 0, [pid]
+    while stack:
+        p = stack.pop()
+        total += _proc_rss_kb(p)
+        stack.extend(_proc_children(p))
+    return total / 1024.0
+
+
+def start_app(port: int, env_extra: Dict[str, str], workers: int, log_path: Optional[str] = None) -> subprocess.Popen:
+    env = dict(os.environ)
+    env.update(env_extra)
+    cmd = [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+           "--port", str(port), "--log-level", "warning"]
+    if workers > 1:
+        cmd += ["--workers", str(workers)]
+    out = open(log_path, "ab") if log_path else subprocess.DEVNULL
+    proc = subprocess.Popen(cmd, cwd=str(BACKEND_DIR), env=env, stdout=out, stderr=subprocess.STDOUT)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"App exited during startup (code {proc.returncode})")
+        try:
+            if requests.get(f"http://127.0.0.1:{port}{API}/health", timeout=1).status_code == 200:
+                return proc
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("App did not become healthy within 30s")
+
+
+# -------------------- Workload --------------------
+
+def parse_mix(spec: str) -> List[Tuple[str, float]]:
+    mix = []
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint '{name}'; expected one of {', '.join(ENDPOINTS)}")
+        mix.append((name, float(weight or 1)))
+    if not mix:
+        raise ValueError("Empty mix")
+    return mix
+
+
+def build_requests(base: str, productivity: List[Dict[str, Any]], n_tests: int) -> Dict[str, Callable[[requests.Session], requests.Response]]:
+    tests = generate_tests(n_tests, start=date(2024, 6, 1), end=date(2025, 8, 31))
+    compute_body = json.dumps({
+        "period": {"start_date": "2025-08-01", "end_date": "2025-08-31"},
+        "tests": tests,
+        "productivity": productivity,
+    })
+    headers = {"Content-Type": "application/json"}
+    return {
+        "compute": lambda s: s.post(f"{base}{API}/kpi/compute", data=compute_body, headers=headers, timeout=120),
+        "config": lambda s: s.get(f"{base}{API}/kpi/config", timeout=30),
+        "logs": lambda s: s.get(f"{base}{API}/logs", params={"limit": 200}, timeout=30),
+        "embed": lambda s: s.get(f"{base}{API}/powerbi/embed-info", timeout=30),
+        "health": lambda s: s.get(f"{base}{API}/health", timeout=30),
+    }
+
+
+def _percentile(sorted_vals: List[float], pct: float) -> Optional[float]:
+    if not sorted_vals:
+        return None
+    k = max(0, min(len(sorted_vals) - 1, int(round(pct / 100.0 * len(sorted_vals) + 0.5)) - 1))
+    return sorted_vals[k]
+
+
+def run_level(
+    calls: Dict[str, Callable[[requests.Session], requests.Response]],
+    mix: List[Tuple[str, float]],
+    concurrency: int,
+    duration_s: float,
+    server_pid: int,
+    seed: int,
+) -> Dict[str, Any]:
+    names = [m[0] for m in mix]
+    weights = [m[1] for m in mix]
+    lat: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    shed: Dict[str, int] = defaultdict(int)  # 429/503 from compute admission control (not errors)
+    peak_rss: Dict[str, float] = defaultdict(float)
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration_s
+
+    def worker(idx: int) -> None:
+        rng = random.Random(seed + idx)
+        session = requests.Session()
+        while time.perf_counter() < stop_at:
+            name = rng.choices(names, weights)[0]
+            t0 = time.perf_counter()
+            rejected = False
+            try:
+                status = calls[name](session).status_code
+                rejected = status in (429, 503)
+                ok = status < 400 or rejected
+            except requests.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - t0
+            rss = tree_rss_mb(server_pid)
+            with lock:
+                lat[name].append(elapsed)
+                if not ok:
+                    errors[name] += 1
+                if rejected:
+                    shed[name] += 1
+                if rss is not None and rss > peak_rss[name]:
+                    peak_rss[name] = rss
+
+    t_start = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - t_start
+
+    endpoints = {}
+    total = 0
+    for name in names:
+        vals = sorted(lat.get(name, []))
+        n = len(vals)
+        total += n
+        endpoints[name] = {
+            "requests": n,
+            "errors": errors.get(name, 0),
+            "error_rate": (errors.get(name, 0) / n) if n else None,
+            "shed": shed.get(name, 0),
+            "rps": n / wall if wall > 0 else None,
+            "p50_ms": None if not n else _percentile(vals, 50) * 1000,
+            "p90_ms": None if not n else _percentile(vals, 90) * 1000,
+            "p99_ms": None if not n else _percentile(vals, 99) * 1000,
+            "max_ms": None if not n else vals[-1] * 1000,
+            "peak_rss_mb": round(peak_rss[name], 1) if name in peak_rss else None,
+        }
+    return {"concurrency": concurrency, "wall_s": wall, "requests": total,
+            "throughput_rps": total / wall if wall > 0 else None, "endpoints": endpoints}
+
+
+def _fmt(v: Optional[float], spec: str = "8.1f") -> str:
+    return format(v, spec) if v is not None else " " * (int(spec.split(".")[0]) - 1) + "-"
+
+
+def print_level(res: Dict[str, Any]) -> None:
+    print(f"\nconcurrency={res['concurrency']}  requests={res['requests']}  "
+          f"throughput={res['throughput_rps']:.1f} req/s")
+    print(f"  {'endpoint':<10}{'reqs':>7}{'err%':>7}{'shed':>6}{'rps':>8}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}{'RSS MB':>9}")
+    for name, e in res["endpoints"].items():
+        err_pct = None if e["error_rate"] is None else e["error_rate"] * 100
+        print(f"  {name:<10}{e['requests']:>7}{_fmt(err_pct, '7.1f')}{e['shed']:>6}{_fmt(e['rps'], '8.1f')}"
+              f"{_fmt(e['p50_ms'], '9.1f')}{_fmt(e['p90_ms'], '9.1f')}{_fmt(e['p99_ms'], '9.1f')}"
+              f"{_fmt(e['max_ms'], '9.1f')}{_fmt(e['peak_rss_mb'], '9.1f')}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="End-to-end load test for the KPI API")
+    ap.add_argument("--concurrency", default="1,4,16", help="Comma-separated concurrency levels")
+    ap.add_argument("--duration", type=float, default=10.0, help="Seconds per concurrency level")
+    ap.add_argument("--mix", default="compute=4,config=2,logs=3,embed=1",
+                    help="Weighted endpoint mix: compute, config, logs, embed, health")
+    ap.add_argument("--tests-per-request", type=int, default=2000, help="Test records in each /kpi/compute body")
+    ap.add_argument("--workers", type=int, default=1, help="uvicorn worker processes")
+    ap.add_argument("--upstream-latency-ms", type=float, default=20.0, help="Artificial latency of fake services")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--json", default=None, help="Write full results to this JSON file")
+    ap.add_argument("--app-log", default=None, help="Append the app's stdout/stderr to this file")
+    args = ap.parse_args(argv)
+
+    mix = parse_mix(args.mix)
+    levels = [int(x) for x in args.concurrency.split(",") if x.strip()]
+
+    sheets = FakeSheetsServer(generate_productivity(start=date(2025, 7, 1), end=date(2025, 8, 31)),
+                              latency_ms=args.upstream_latency_ms).start()
+    pbi = FakePowerBIServer(latency_ms=args.upstream_latency_ms).start()
+    port = _free_port()
+    proc = None
+    try:
+        proc = start_app(port, pbi.app_env(), args.workers, args.app_log)
+        base = f"http://127.0.0.1:{port}"
+        print(f"App on {base} (workers={args.workers}); sheets={sheets.base_url} powerbi={pbi.base_url}")
+
+        # Dashboard flow: productivity comes from the sheet, then goes into compute payloads
+        values = requests.get(sheets.values_url(), timeout=10).json().get("values", [])
+        productivity = sheet_values_to_rows(values)
+        calls = build_requests(base, productivity, args.tests_per_request)
+
+        # Warm-up (config load, msal metadata, imports)
+        with requests.Session() as s:
+            for name, _ in mix:
+                calls[name](s)
+
+        results = []
+        for c in levels:
+            res = run_level(calls, mix, c, args.duration, proc.pid, args.seed)
+            print_level(res)
+            results.append(res)
+
+        summary = {
+            "mix": dict(mix),
+            "duration_s": args.duration,
+            "tests_per_request": args.tests_per_request,
+            "workers": args.workers,
+            "upstream_latency_ms": args.upstream_latency_ms,
+            "fake_requests": {"sheets": sheets.request_count, "powerbi": pbi.request_count},
+            "levels": results,
+        }
+        if args.json:
+            Path(args.json).write_text(json.dumps(summary, indent=2))
+            print(f"\nWrote {args.json}")
+        errors = sum(e["errors"] for r in results for e in r["endpoints"].values())
+        return 1 if errors else 0
+    finally:
+        if proc is not None:
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+        pbi.stop()
+        sheets.stop()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
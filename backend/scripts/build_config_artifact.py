@@ -0,0 +1,30 @@
+"""Precompile config/kpi_config.yaml into a JSON artifact (build step).
+
+Usage: python backend/scripts/build_config_artifact.py [--source PATH] [--dest PATH]
+
+The runtime loader uses the artifact only while its recorded hash matches the
+YAML, so a missing or stale artifact just falls back to parsing YAML.
+"""
+import argparse
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.insert(0, str(BACKEND_DIR))
+
+from app.kpi.config_loader import compile_config_artifact  # noqa: E402
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--source", type=Path, default=None, help="YAML config (default: resolved KPI config)")
+    ap.add_argument("--dest", type=Path, default=None, help="Output JSON (default: <source>.json)")
+    args = ap.parse_args()
+    out = compile_config_artifact(args.source, args.dest)
+    print(f"Wrote KPI config artifact: {out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""Cold-start budget check for the Vercel entrypoint (api/v1/index.py).
+
+Each measurement runs in a fresh interpreter:
+  1. import the entrypoint and answer GET /api/v1/health through the ASGI app;
+  2. import the full FastAPI app (what the first non-health request pays).
+
+Fails (exit 1) when a phase exceeds its time budget (best of --runs) or when
+the health path loads modules that must stay lazy.
+
+Usage: python backend/scripts/check_import_budget.py [--entry-budget-ms 75] [--app-budget-ms 1500]
+Budgets can also be set via IMPORT_BUDGET_ENTRY_MS / IMPORT_BUDGET_APP_MS.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[2]
+
+# Modules the health-only cold path must not import
+LAZY_MODULES = ["fastapi", "starlette", "pydantic", "yaml", "msal", "requests", "app.main", "app.integrations.powerbi"]
+
+_ENTRY_SNIPPET = r"""
+import asyncio, json, sys, time
+sys.path.insert(0, {api_dir!r})
+t0 = time.perf_counter()
+import index
+t_import = time.perf_counter() - t0
+
+sent = []
+async def _receive():
+    return {{"type": "http.request", "body": b"", "more_body": False}}
+async def _send(msg):
+    sent.append(msg)
+scope = {{"type": "http", "method": "GET", "path": "/health", "headers": [], "query_string": b""}}
+asyncio.run(index.app(scope, _receive, _send))
+t_total = time.perf_counter() - t0
+status = sent[0]["status"] if sent else None
+print(json.dumps({{"import_ms": t_import * 1000, "total_ms": t_total * 1000, "status": status,
+                  "loaded": [m for m in {lazy!r} if m in sys.modules]}}))
+"""
+
+_APP_SNIPPET = r"""
+import json, sys, time
+sys.path.insert(0, {backend_dir!r})
+t0 = time.perf_counter()
+import app.main
+print(json.dumps({{"import_ms": (time.perf_counter() - t0) * 1000}}))
+"""
+
+
+def _run(snippet: str) -> dict:
+    env = dict(os.environ)
+    env.setdefault("KPI_CONFIG_PATH", str(ROOT_DIR / "config" / "kpi_config.yaml"))
+    out = subprocess.run([sys.executable, "-c", snippet], capture_output=True, text=True, env=env, cwd=str(ROOT_DIR))
+    if out.returncode != 0:
+        raise RuntimeError(out.stderr.strip() or "subprocess failed")
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Cold-start import budget check")
+    ap.add_argument("--entry-budget-ms", type=float, default=float(os.getenv("IMPORT_BUDGET_ENTRY_MS", "75")))
+    ap.add_argument("--app-budget-ms", type=float, default=float(os.getenv("IMPORT_BUDGET_APP_MS", "1500")))
+    ap.add_argument("--runs", type=int, default=5, help="Fresh-interpreter runs per phase (best is compared)")
+    args = ap.parse_args()
+
+    entry_snippet = _ENTRY_SNIPPET.format(api_dir=str(ROOT_DIR / "api" / "v1"), lazy=LAZY_MODULES)
+    app_snippet = _APP_SNIPPET.format(backend_dir=str(ROOT_DIR / "backend"))
+
+    entry = [_run(entry_snippet) for _ in range(args.runs)]
+    app = [_run(app_snippet) for _ in range(args.runs)]
+    entry_ms = min(r["total_ms"] for r in entry)
+    app_ms = min(r["import_ms"] for r in app)
+
+    failures = []
+    if any(r["status"] != 200 for r in entry):
+        failures.append(f"health probe returned {entry[0]['status']}")
+    loaded = sorted({m for r in entry for m in r["loaded"]})
+    if loaded:
+        failures.append(f"health cold path imported lazy modules: {', '.join(loaded)}")
+    if entry_ms > args.entry_budget_ms:
+        failures.append(f"entrypoint + /health took {entry_ms:.1f} ms (budget {args.entry_budget_ms:.0f} ms)")
+    if app_ms > args.app_budget_ms:
+        failures.append(f"app.main import took {app_ms:.1f} ms (budget {args.app_budget_ms:.0f} ms)")
+
+    print(f"entrypoint + /health: {entry_ms:.1f} ms (budget {args.entry_budget_ms:.0f} ms)")
+    print(f"app.main import:      {app_ms:.1f} ms (budget {args.app_budget_ms:.0f} ms)")
+    if failures:
+        for f in failures:
+            print(f"FAIL: {f}")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -693,6 +693,10 @@ export default function App() {
         const idxAnalyzedAny = (idxAnalyzedBy !== -1) ? idxAnalyzedBy : idxAnalyzedLoose
         // QC performer column (e.g., "Do QC", "QC By", "Quality Control")
         let idxQCBy = findIdxContains(headers, ['do qc','qc by','quality control','doqc','qcby','qualitycontrol','qc'])
+        // Stage timestamps/durations for /kpi/stages: "QC By" is followed by its Date/Time like "Reviewed By"
+        const idxQcTat = indexOfHeader(headers, ['qc tat','qctat'])
+        const idxQCDt = (idxQCBy !== -1 && idxQCBy !== idxQcTat) ? idxQCBy + 1 : -1
+        const idxReviewTime = indexOfHeader(headers, ['review time','reviewtime'])
         // Also consider core Karyotyping columns as a strong signal of tests export
         const hasCaseNoHdr = indexOfHeader(headers, ['case','case#','caseno','case number','casenumber','caseid']) !== -1
         const hasAbnNormHdr = indexOfHeader(headers, ['abn/norm','abnnorm','abn_norm']) !== -1
@@ -773,6 +777,12 @@ export default function App() {
               reviewers: reviewers.length ? reviewers : undefined,
               qc_by: qcByRaw || undefined,
               qc_people: qcPeople.length ? qcPeople : undefined,
+              triaged_at: (idxTriage !== -1 && toISODatetime(arr[idxTriage])) || undefined,
+              analyzed_at: (idxAnalyzedDt !== -1 && toISODatetime(arr[idxAnalyzedDt])) || undefined,
+              reviewed_at: (idxReviewedDt !== -1 && toISODatetime(arr[idxReviewedDt])) || undefined,
+              qc_at: (idxQCDt !== -1 && toISODatetime(arr[idxQCDt])) || undefined,
+              review_time_hours: idxReviewTime !== -1 ? (parseTatToHours(arr[idxReviewTime]) ?? undefined) : undefined,
+              qc_tat_hours: idxQcTat !== -1 ? (parseTatToHours(arr[idxQcTat]) ?? undefined) : undefined,
               priority: priorityVal,
             })
           }